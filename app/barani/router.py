@@ -1,3 +1,5 @@
+from typing import Any, List
+
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -29,6 +31,34 @@ async def receive_wind_message(message: WindMessage, db: AsyncSession = Depends(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/helix/batch")
+async def receive_helix_batch(messages: List[Any], db: AsyncSession = Depends(get_db)):
+    """
+    Bulk ingest of buffered helix readings. Items are validated one by one against HelixMessage,
+    so an invalid item is counted as rejected instead of failing the whole batch.
+    """
+    try:
+        resp: dict = await barani_service.process_helix_batch(db, messages)
+        return resp
+    except Exception as e:
+        server_logger.error(f"ERROR CODE 500 - {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/wind/batch")
+async def receive_wind_batch(messages: List[Any], db: AsyncSession = Depends(get_db)):
+    """
+    Bulk ingest of buffered wind readings. Items are validated one by one against WindMessage,
+    so an invalid item is counted as rejected instead of failing the whole batch.
+    """
+    try:
+        resp: dict = await barani_service.process_wind_batch(db, messages)
+        return resp
+    except Exception as e:
+        server_logger.error(f"ERROR CODE 500 - {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/sensors/{serial_number}")
 async def get_sensor_by_serial_number(serial_number: str, db: AsyncSession = Depends(get_db)):
     try:
@@ -1,40 +1,101 @@
-from typing import Optional
+from typing import Any, List, Optional
 
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 import app.crud.barani_sensors as db_service
 from app.models.models import BaraniHelixSensors, BaraniWindSensors
 from app.barani.schemas import HelixMessage, WindMessage
 from app.logs.config_server_logs import server_logger
+from app.tasks.write_behind import helix_buffer, wind_buffer
 
 async def process_helix_message(db: AsyncSession, message: HelixMessage):
-    server_logger.info(f"HELIX -- Received message: {message}")
+    server_logger.debug("HELIX -- Received message: %s", message)
 
     message = normalize_helix_message(message)
 
+    if helix_buffer.running:
+        await helix_buffer.put(db_service.helix_reading_values(message))
+        return {"status": "success", "message": "helix reading queued."}
+
     resp: BaraniHelixSensors = await db_service.create_barani_helix_reading(db, message)
 
     response = {"status": "success", "message": "helix reading created.", "details": f"{resp.__dict__}"}
 
-    server_logger.info(response)
+    server_logger.debug("%s", response)
 
     return response
 
 
 async def process_wind_message(db: AsyncSession, message: WindMessage):
-    server_logger.info(f"WIND -- Received message: {message}")
+    server_logger.debug("WIND -- Received message: %s", message)
+
+    if wind_buffer.running:
+        await wind_buffer.put(db_service.wind_reading_values(message))
+        return {"status": "success", "message": "wind reading queued."}
 
     resp: BaraniWindSensors = await db_service.insert_barani_wind_reading(db, message)
 
     response = {"status": "success", "message": "wind reading created.", "details": f"{resp.__dict__}"}
 
+    server_logger.debug("%s", response)
+
+    return response
+
+
+async def process_helix_batch(db: AsyncSession, messages: List[Any]):
+    server_logger.info("HELIX -- Received batch of %d messages", len(messages))
+
+    rows, rejected = [], 0
+    for raw in messages:
+        try:
+            message = normalize_helix_message(HelixMessage.model_validate(raw))
+            rows.append(db_service.helix_reading_values(message))
+        except (ValidationError, ValueError, TypeError) as e:
+            rejected += 1
+            server_logger.warning("HELIX -- Rejected batch item: %s", e)
+
+    inserted = await db_service.bulk_insert_barani_helix_readings(db, rows) if rows else 0
+
+    response = build_batch_response("helix", inserted, len(rows) - inserted, rejected)
+
     server_logger.info(response)
 
     return response
 
 
+async def process_wind_batch(db: AsyncSession, messages: List[Any]):
+    server_logger.info("WIND -- Received batch of %d messages", len(messages))
+
+    rows, rejected = [], 0
+    for raw in messages:
+        try:
+            rows.append(db_service.wind_reading_values(WindMessage.model_validate(raw)))
+        except (ValidationError, ValueError, TypeError) as e:
+            rejected += 1
+            server_logger.warning("WIND -- Rejected batch item: %s", e)
+
+    inserted = await db_service.bulk_insert_barani_wind_readings(db, rows) if rows else 0
+
+    response = build_batch_response("wind", inserted, len(rows) - inserted, rejected)
+
+    server_logger.info(response)
+
+    return response
+
+
+def build_batch_response(kind: str, inserted: int, duplicates: int, rejected: int) -> dict:
+    return {
+        "status": "success",
+        "message": f"{kind} batch processed.",
+        "inserted": inserted,
+        "duplicates": duplicates,
+        "rejected": rejected,
+    }
+
+
 async def process_get_sensor_by_serial_number(db: AsyncSession, sn: str):
-    server_logger.info(f"HELIX -- GET Received, serial number: {sn}")
+    server_logger.info("HELIX -- GET Received, serial number: %s", sn)
 
     resp = await db_service.get_sensor_by_serial_number(db, sn)
 
@@ -49,18 +110,18 @@ def normalize_helix_message(message: HelixMessage)->HelixMessage:
 
     if  copied.temperature and 173.15 < copied.temperature < 373.15:
         copied.temperature = kelvin_to_celsius(message.temperature)
-        server_logger.info(f"HELIX -- Received message: Message.temperature modified to fix Kelvin values: "
-                      f"{message.temperature} -> {copied.temperature}")
+        server_logger.debug("HELIX -- Received message: Message.temperature modified to fix Kelvin values: %s -> %s",
+                            message.temperature, copied.temperature)
 
     if  copied.temperature_wetbulb and 173.15 < copied.temperature_wetbulb < 373.15:
         copied.temperature_wetbulb = kelvin_to_celsius(message.temperature_wetbulb)
-        server_logger.info(f"HELIX -- Received message: Message.temperature_wetbulb modified to fix Kelvin values: "
-                      f"{message.temperature_wetbulb} -> {copied.temperature_wetbulb}")
+        server_logger.debug("HELIX -- Received message: Message.temperature_wetbulb modified to fix Kelvin values: %s -> %s",
+                            message.temperature_wetbulb, copied.temperature_wetbulb)
 
     if  copied.dew_point and 173.15 < copied.dew_point < 373.15:
         copied.dew_point = kelvin_to_celsius(message.dew_point)
-        server_logger.info(f"HELIX -- Received message: Message.dew_point modified to fix Kelvin values: "
-                      f"{message.dew_point} -> {copied.dew_point}")
+        server_logger.debug("HELIX -- Received message: Message.dew_point modified to fix Kelvin values: %s -> %s",
+                            message.dew_point, copied.dew_point)
 
     return copied
 
@@ -0,0 +1,124 @@
+import time
+from typing import Optional
+
+from app.campbell.scraper_scripts.loginKonect import init_driver, login_to_konect
+from app.config import settings
+from app.logs.config_scraper_logs import scraper_logger
+
+
+class BrowserSession:
+    """A Chrome driver kept open between scrapes, with its usage counters."""
+
+    def __init__(self):
+        self.driver = init_driver(visibility=False)
+        self.created_at = time.monotonic()
+        self.uses = 0
+        self.logins = 0
+
+    def is_alive(self) -> bool:
+        try:
+            self.driver.window_handles
+            return True
+        except Exception:
+            return False
+
+    def heap_mb(self) -> Optional[float]:
+        """JS heap of the page in MB (Chrome only), None when it can't be read."""
+        try:
+            used = self.driver.execute_script("return performance.memory.usedJSHeapSize")
+            return used / (1024 * 1024)
+        except Exception:
+            return None
+
+    def ensure_logged_in(self):
+        """Opens the portal; logs in only when the site sends us back to the login form."""
+        self.driver.get(settings.KONECTGDS_URL)
+        if "login" not in self.driver.current_url.lower():
+            scraper_logger.info("✅ Session KonectGDS toujours active.")
+            return
+        driver = login_to_konect(
+            driver=self.driver,
+            username=settings.KONECTGDS_USERNAME,
+            password=settings.KONECTGDS_PASSWORD
+        )
+        if driver is None:
+            raise RuntimeError("KonectGDS login failed.")
+        self.logins += 1
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception as e:
+            scraper_logger.error(f"Error while quitting the driver: {e}")
+
+
+class DriverPool:
+    """
+    Keeps one authenticated browser for the scraper thread. Only the scraper executor touches it,
+    so no locking is needed. The session is recycled after SCRAPER_DRIVER_MAX_USES scrapes, when
+    its heap grows past SCRAPER_DRIVER_MAX_HEAP_MB, or as soon as a scrape fails.
+    """
+
+    def __init__(self):
+        self._session: Optional[BrowserSession] = None
+        self.created = 0
+        self.recycled = 0
+
+    def acquire(self):
+        session = self._session
+        if session is not None and self._should_recycle(session):
+            self._discard()
+            session = None
+        if session is None:
+            session = self._session = BrowserSession()
+            self.created += 1
+            scraper_logger.info("🆕 Nouveau navigateur pour le scraper.")
+        return session.driver
+
+    def ensure_logged_in(self):
+        self._session.ensure_logged_in()
+
+    def release(self, driver, healthy: bool=True):
+        session = self._session
+        if session is None or session.driver is not driver:
+            return
+        session.uses += 1
+        if not healthy:
+            # The page is in an unknown state (or the driver was quit by a cancel): start over next time
+            self._discard()
+
+    def close(self):
+        if self._session is not None:
+            self._session.quit()
+            self._session = None
+
+    def stats(self) -> dict:
+        session = self._session
+        return {
+            "created": self.created,
+            "recycled": self.recycled,
+            "uses": session.uses if session else 0,
+            "logins": session.logins if session else 0,
+            "age_s": round(time.monotonic() - session.created_at) if session else None,
+        }
+
+    def _should_recycle(self, session: BrowserSession) -> bool:
+        if not session.is_alive():
+            scraper_logger.info("♻️ Navigateur injoignable, recréation.")
+            return True
+        if session.uses >= settings.SCRAPER_DRIVER_MAX_USES:
+            scraper_logger.info(f"♻️ Navigateur recyclé après {session.uses} utilisations.")
+            return True
+        heap_mb = session.heap_mb()
+        if heap_mb is not None and heap_mb > settings.SCRAPER_DRIVER_MAX_HEAP_MB:
+            scraper_logger.info(f"♻️ Navigateur recyclé, mémoire JS {heap_mb:.0f} MB.")
+            return True
+        return False
+
+    def _discard(self):
+        self._session.quit()
+        self._session = None
+        self.recycled += 1
+
+
+driver_pool = DriverPool()
@@ -0,0 +1,233 @@
+import asyncio
+import csv
+import os
+import shutil
+import time
+import zipfile
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Set
+
+import asyncpg.exceptions
+from openpyxl.utils.exceptions import InvalidFileException
+from sqlalchemy.exc import DataError
+
+from app.campbell.scraper_scripts.download_file import WATCHFILES_AVAILABLE
+from app.campbell.service import process_campbell_file
+from app.config import settings
+from app.entities.file_type import FileType
+from app.logs.config_server_logs import server_logger
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+# The file itself is at fault (unreadable, malformed rows, values the table rejects): loading it
+# again would fail the same way. The rows are COPY'd through the raw asyncpg connection, so the
+# database's data exceptions (SQLSTATE class 22) come as asyncpg's DataError, the merge's as
+# SQLAlchemy's. Any other error is retried: database down, I/O, and integrity errors too, since
+# a missing campbell_station row is a problem of the environment, not of the file.
+INVALID_FILE_ERRORS = (
+    ValueError, TypeError, csv.Error, zipfile.BadZipFile, InvalidFileException, NotImplementedError,
+    asyncpg.exceptions.DataError, DataError,
+)
+
+
+def _resolve(path: str) -> Path:
+    """Relative folders are taken from the project root, like SCRAPER_FILE_DEST."""
+    return PROJECT_ROOT / path
+
+
+def inbox_file_type(path: Path) -> Optional[FileType]:
+    for file_type in FileType:
+        if path.suffix.lower() == file_type.value:
+            return file_type
+    return None
+
+
+class InboxWatcher:
+    """
+    Loads Campbell exports dropped in CAMPBELL_INBOX_DIR (field laptops, manual downloads).
+    Each new CSV/XLSX file goes through process_campbell_file, at most CAMPBELL_INBOX_CONCURRENCY
+    at a time, then is moved to the archive folder, or to the quarantine folder if it is invalid
+    (INVALID_FILE_ERRORS). Files that fail for another reason stay in the inbox and are retried
+    with exponential backoff.
+    """
+
+    def __init__(self, inbox_dir: Path, archive_dir: Path, quarantine_dir: Path, concurrency: int):
+        self.inbox_dir = inbox_dir
+        self.archive_dir = archive_dir
+        self.quarantine_dir = quarantine_dir
+        self._concurrency = concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Set[Path] = set()
+        self._ingests: Set[asyncio.Task] = set()
+        self._stopping: Optional[asyncio.Event] = None
+        # Files handled but that could not be moved out of the inbox, with their mtime
+        self._unmovable: Dict[Path, int] = {}
+
+        self.loaded = 0
+        self.quarantined = 0
+        self.retries = 0
+        self.last_file: Optional[str] = None
+        self.last_counts: Optional[dict] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+        for folder in (self.inbox_dir, self.archive_dir, self.quarantine_dir):
+            folder.mkdir(parents=True, exist_ok=True)
+        self._semaphore = asyncio.Semaphore(self._concurrency)
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="campbell-inbox")
+        mode = "notifications" if WATCHFILES_AVAILABLE else f"polling every {settings.CAMPBELL_INBOX_POLL_S}s"
+        server_logger.info(f"INBOX -- Watching {self.inbox_dir} ({mode}).")
+
+    async def stop(self):
+        """Stops watching and waits for the files being loaded. Files waiting for a retry stay in the inbox."""
+        if not self.running:
+            return
+        self._stopping.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        if self._ingests:
+            await asyncio.gather(*self._ingests, return_exceptions=True)
+        server_logger.info("INBOX -- Watcher stopped.")
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "inbox_dir": str(self.inbox_dir),
+            "notifications": WATCHFILES_AVAILABLE,
+            "pending": len(self._pending),
+            "loaded": self.loaded,
+            "quarantined": self.quarantined,
+            "retries": self.retries,
+            "unmovable": [str(path) for path in self._unmovable],
+            "last_file": self.last_file,
+            "last_counts": self.last_counts,
+        }
+
+    async def _run(self):
+        # Files dropped while the server was down
+        self._schedule(self._scan())
+        async for paths in self._changes():
+            self._schedule(paths)
+
+    def _scan(self) -> Set[Path]:
+        with os.scandir(self.inbox_dir) as entries:
+            return {Path(entry.path) for entry in entries if entry.is_file()}
+
+    async def _changes(self) -> AsyncIterator[Set[Path]]:
+        if WATCHFILES_AVAILABLE:
+            from watchfiles import awatch, Change
+
+            async for changes in awatch(self.inbox_dir, recursive=False):
+                yield {Path(path) for change, path in changes if change != Change.deleted}
+        else:
+            while True:
+                await asyncio.sleep(settings.CAMPBELL_INBOX_POLL_S)
+                yield self._scan()
+
+    def _schedule(self, paths: Set[Path]):
+        for path in paths:
+            if path in self._pending or inbox_file_type(path) is None or self._left_in_inbox(path):
+                continue
+            self._pending.add(path)
+            task = asyncio.create_task(self._ingest(path))
+            self._ingests.add(task)
+            task.add_done_callback(self._ingests.discard)
+
+    def _left_in_inbox(self, path: Path) -> bool:
+        """True for a file already handled but not moved away, until it is replaced or removed."""
+        if path not in self._unmovable:
+            return False
+        try:
+            if os.stat(path).st_mtime_ns == self._unmovable[path]:
+                return True
+        except FileNotFoundError:
+            pass
+        del self._unmovable[path]
+        return False
+
+    async def _ingest(self, path: Path):
+        try:
+            attempt = 0
+            while True:
+                async with self._semaphore:
+                    if not await self._wait_until_complete(path):
+                        return
+                    try:
+                        counts = await process_campbell_file(str(path), inbox_file_type(path))
+                    except INVALID_FILE_ERRORS as e:
+                        server_logger.error(f"INBOX -- Invalid file {path.name}, moved to quarantine: {e}")
+                        self.quarantined += 1
+                        await self._move_out(path, self.quarantine_dir)
+                        return
+                    except Exception as e:
+                        error = e
+                    else:
+                        self.loaded += 1
+                        self.last_file = path.name
+                        self.last_counts = counts
+                        server_logger.info(f"INBOX -- {path.name} loaded: {counts}")
+                        await self._move_out(path, self.archive_dir)
+                        return
+                # Retry outside of the semaphore, so other files keep loading meanwhile
+                delay = min(settings.CAMPBELL_INBOX_RETRY_BASE_S * 2 ** attempt, settings.CAMPBELL_INBOX_RETRY_MAX_S)
+                attempt += 1
+                self.retries += 1
+                server_logger.warning("INBOX -- Failed to load %s, left in the inbox, retry %d in %.0fs: %s",
+                                      path.name, attempt, delay, error)
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=delay)
+                    return
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._pending.discard(path)
+
+    async def _move_out(self, path: Path, folder: Path):
+        try:
+            await asyncio.to_thread(self._move, path, folder)
+        except OSError as e:
+            # Keep it out of the next scans, or polling would load it again every cycle
+            try:
+                self._unmovable[path] = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                pass
+            server_logger.error(f"INBOX -- Could not move {path.name} to {folder}, left in the inbox: {e}")
+
+    async def _wait_until_complete(self, path: Path) -> bool:
+        """Waits until the file stops growing, so a copy still in progress is not read half-written."""
+        previous = None
+        while True:
+            try:
+                stat = await asyncio.to_thread(os.stat, path)
+            except FileNotFoundError:
+                return False
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current == previous and time.time() - stat.st_mtime >= settings.CAMPBELL_INBOX_SETTLE_S:
+                return True
+            previous = current
+            await asyncio.sleep(settings.CAMPBELL_INBOX_SETTLE_S)
+
+    @staticmethod
+    def _move(path: Path, folder: Path):
+        target = folder / path.name
+        if target.exists():
+            target = folder / f"{path.stem}_{time.strftime('%Y-%m-%d_%H-%M-%S')}{path.suffix}"
+        shutil.move(str(path), str(target))
+
+
+inbox_watcher = InboxWatcher(
+    inbox_dir=_resolve(settings.CAMPBELL_INBOX_DIR),
+    archive_dir=_resolve(settings.CAMPBELL_ARCHIVE_DIR),
+    quarantine_dir=_resolve(settings.CAMPBELL_QUARANTINE_DIR),
+    concurrency=settings.CAMPBELL_INBOX_CONCURRENCY,
+)
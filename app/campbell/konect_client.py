@@ -0,0 +1,96 @@
+import asyncio
+from datetime import datetime
+from typing import Optional
+
+import httpx
+
+from app.campbell.scraper_scripts.download_file import campbell_file_path
+from app.campbell.scraper_scripts.task_query import format_query_date
+from app.config import settings
+from app.entities.file_type import FileType
+from app.http_clients import get_http_client, KONECTGDS
+from app.logs.config_scraper_logs import scraper_logger
+
+# Table queries defined on KonectGDS for the station (see open_task_query)
+FULL_QUERY = "CapuDiMuru_Data"
+HOURLY_QUERY = "CapuDiMuru_Data_horaire"
+
+
+class KonectLoginError(Exception):
+    pass
+
+
+def _is_login_page(response: httpx.Response) -> bool:
+    return "login" in str(response.url).lower()
+
+
+def _sent_to_login(response: httpx.Response) -> bool:
+    """True when the request was redirected through the login form at any point."""
+    return any(_is_login_page(r) for r in (*response.history, response))
+
+
+async def login(client: httpx.AsyncClient):
+    """
+    Logs in with the same form fields as the browser flow. The session cookie stays in the
+    shared client's cookie jar, so later exports reuse it until it expires.
+
+    :param client:
+    """
+    scraper_logger.info("🌐 Connexion HTTP à KonectGDS...")
+    response = await client.post(
+        f"{settings.KONECTGDS_URL}{settings.KONECTGDS_LOGIN_PATH}",
+        data={"PassportID": settings.KONECTGDS_USERNAME, "Password": settings.KONECTGDS_PASSWORD},
+        follow_redirects=True,
+    )
+    response.raise_for_status()
+    # A successful login redirects away from the form; a rejected one lands back on it
+    if response.history and _is_login_page(response):
+        raise KonectLoginError("KonectGDS authentication failed.")
+    scraper_logger.info("✅ Connexion réussie.")
+
+
+def _export_params(hourly: bool, file_type: FileType, since: Optional[datetime] = None) -> dict:
+    params = {
+        "query": HOURLY_QUERY if hourly else FULL_QUERY,
+        "format": file_type.value.lstrip("."),
+    }
+    if not hourly or since is not None:
+        # Same date range as modify_query_date sets in the browser
+        params["to"] = format_query_date(datetime.now())
+    if since is not None:
+        params["from"] = format_query_date(since)
+    return params
+
+
+async def download_campbell_export(hourly: bool, file_type: FileType, since: Optional[datetime] = None) -> str:
+    """
+    Requests the table query export over HTTP and writes it straight to SCRAPER_FILE_DEST,
+    without going through the browser download folder.
+
+    :param hourly: export the hourly query instead of the full one
+    :param file_type:
+    :param since: only export rows after this timestamp (the station watermark)
+    :return: path of the written file
+    """
+    client = get_http_client(KONECTGDS)
+    export_uri = f"{settings.KONECTGDS_URL}{settings.KONECTGDS_EXPORT_PATH}"
+    params = _export_params(hourly, file_type, since)
+
+    response = await client.get(export_uri, params=params, follow_redirects=True)
+    if _sent_to_login(response):
+        # No session yet, or it expired: log in once and retry
+        await login(client)
+        response = await client.get(export_uri, params=params, follow_redirects=True)
+        if _sent_to_login(response):
+            raise KonectLoginError("KonectGDS session rejected right after login.")
+    response.raise_for_status()
+
+    new_path = campbell_file_path(settings.SCRAPER_FILE_DEST, file_type)
+    await asyncio.to_thread(_write_file, new_path, response.content)
+    scraper_logger.info(f"✅ Export {params['query']} écrit vers : {new_path} ({len(response.content)} octets)")
+    return new_path
+
+
+def _write_file(path: str, content: bytes):
+    with open(path, "wb") as f:
+        f.write(content)
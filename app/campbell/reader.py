@@ -0,0 +1,161 @@
+import asyncio
+import csv
+import threading
+from datetime import datetime
+from typing import AsyncIterator, Iterator, List, Optional
+
+from openpyxl import load_workbook
+
+from app.entities.file_type import FileType
+
+CHUNK_SIZE = 1000
+# Parsed chunks waiting for the DB writer; bounds memory when the DB is slower than the parser
+MAX_PENDING_CHUNKS = 4
+
+XLSX_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S'
+CSV_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M'
+
+_DONE = object()
+
+
+def _to_float(value) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+def _to_str(value) -> Optional[str]:
+    if value is None or value == "":
+        return None
+    return str(value)
+
+
+def campbell_record(row, timestamp_format: str, station_id: str, created_at: datetime) -> tuple:
+    """Converts a raw export row to a record ordered as CAMPBELL_COPY_COLUMNS."""
+    timestamp_str, air_temp_avg, batt_voltage_avg, bp_mbar_avg, dew_point_avg, met_sens_status, \
+        ms60_irradiance_avg, p_temp_avg, rain_mm_tot, humidity, wind_dir, wind_speed = row
+
+    if isinstance(timestamp_str, datetime):
+        timestamp = timestamp_str.replace(tzinfo=None)
+    else:
+        timestamp = datetime.strptime(timestamp_str, timestamp_format)
+
+    return (
+        timestamp,
+        station_id,
+        _to_float(air_temp_avg),
+        _to_float(batt_voltage_avg),
+        _to_float(bp_mbar_avg),
+        _to_float(dew_point_avg),
+        _to_str(met_sens_status),
+        _to_float(ms60_irradiance_avg),
+        _to_float(p_temp_avg),
+        _to_float(rain_mm_tot),
+        _to_float(humidity),
+        _to_float(wind_dir),
+        _to_float(wind_speed),
+        created_at,
+    )
+
+
+def _iter_xlsx_rows(file: str) -> Iterator[tuple]:
+    # read_only streams the sheet XML instead of building every cell object up front
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        sheet = wb.active
+        for row in sheet.iter_rows(min_row=2, values_only=True):
+            if any(cell is not None for cell in row):
+                yield row
+    finally:
+        wb.close()
+
+
+def _iter_csv_rows(file: str) -> Iterator[list]:
+    with open(file, newline='', encoding='utf-8') as csvfile:
+        reader = csv.reader(csvfile)
+        next(reader, None)  # Skip header
+        for row in reader:
+            if row:
+                yield row
+
+
+def iter_campbell_chunks(file: str, file_type: FileType, station_id: str,
+                         chunk_size: int = CHUNK_SIZE, after: Optional[datetime] = None) -> Iterator[List[tuple]]:
+    """
+    Reads a Campbell export and yields typed records in lists of at most `chunk_size`.
+    Only one chunk is held in memory at a time.
+
+    :param file:
+    :param file_type:
+    :param station_id:
+    :param chunk_size:
+    :param after: drop records at or before this timestamp (the station watermark)
+    :return:
+    """
+    if file_type == FileType.XLSX:
+        rows, timestamp_format = _iter_xlsx_rows(file), XLSX_TIMESTAMP_FORMAT
+    elif file_type == FileType.CSV:
+        rows, timestamp_format = _iter_csv_rows(file), CSV_TIMESTAMP_FORMAT
+    else:
+        raise NotImplementedError
+
+    created_at = datetime.now()
+    chunk = []
+    for row in rows:
+        record = campbell_record(row, timestamp_format, station_id, created_at)
+        if after is not None and record[0] <= after:
+            continue
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _ParserFailure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+async def stream_campbell_chunks(file: str, file_type: FileType, station_id: str,
+                                 chunk_size: int = CHUNK_SIZE,
+                                 after: Optional[datetime] = None) -> AsyncIterator[List[tuple]]:
+    """
+    Async view of iter_campbell_chunks. Parsing runs in a worker thread and hands chunks over a
+    bounded queue, so the event loop stays free and the DB write of one chunk overlaps the
+    parsing of the next. Use with contextlib.aclosing so the worker stops if the consumer fails.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=MAX_PENDING_CHUNKS)
+    stop = threading.Event()
+
+    def put(item):
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def produce():
+        try:
+            for chunk in iter_campbell_chunks(file, file_type, station_id, chunk_size, after):
+                if stop.is_set():
+                    return
+                put(chunk)
+        except BaseException as e:
+            put(_ParserFailure(e))
+        else:
+            put(_DONE)
+
+    producer = loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _ParserFailure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        # Free the queue so a producer blocked on put() can see the stop flag
+        while not queue.empty():
+            queue.get_nowait()
+        await producer
@@ -1,4 +1,6 @@
 from fastapi import APIRouter
+from app.campbell.driver_pool import driver_pool
+from app.campbell.inbox import inbox_watcher
 from app.campbell.service import run_campbell_scraper
 from app.config import settings
 
@@ -9,4 +11,15 @@ async def scrape_data():
     """Manually triggers the scraper."""
     # TODO: Make this endpoint secure!
     data = await run_campbell_scraper(hourly=settings.SCRAPER_HOURLY)
-    return {"status": "success", "data": data}
\ No newline at end of file
+    return {"status": "success", "data": data}
+
+@router.get("/scrape/stats")
+async def scrape_stats():
+    """Usage counters of the pooled scraper browser."""
+    return driver_pool.stats()
+
+
+@router.get("/inbox/stats")
+async def inbox_stats():
+    """Files loaded from and quarantined by the Campbell drop folder watcher."""
+    return inbox_watcher.stats()
@@ -1,3 +1,4 @@
+import importlib.util
 import os
 import shutil
 import time
@@ -12,6 +13,9 @@ from app.entities.file_type import FileType
 from app.logs.config_scraper_logs import scraper_logger
 from app.logs.config_server_logs import server_logger
 
+# inotify/FSEvents notifications come from the optional watchfiles package (installed with uvicorn[standard])
+WATCHFILES_AVAILABLE = importlib.util.find_spec("watchfiles") is not None
+
 
 def click_download_button(driver, file_type: FileType):
     """Clique sur le bouton 'EXCEL' pour télécharger le fichier."""
@@ -39,37 +43,61 @@ def click_download_button(driver, file_type: FileType):
     time.sleep(5)
 
 
+def campbell_file_path(dest_path: str, file_type: FileType) -> str:
+    """Chemin horodaté du fichier Campbell dans le dossier de destination."""
+    project_root = Path(__file__).resolve().parent.parent.parent.parent
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    return os.path.join(project_root / dest_path, f"CapuDiMuru_{timestamp}{file_type.value}")
+
+
+def _latest_download(downloads_path: str, file_type: FileType) -> str | None:
+    """Fichier le plus récent du type demandé (les .crdownload en cours sont ignorés)."""
+    download_files = [f for f in os.listdir(downloads_path) if f.endswith(file_type.value)]
+    if not download_files:
+        return None
+    return max(download_files, key=lambda f: os.path.getctime(os.path.join(downloads_path, f)))
+
+
+def wait_for_download(downloads_path: str, file_type: FileType, timeout: float) -> str | None:
+    """
+    Attend l'apparition du fichier téléchargé. Avec watchfiles, on est réveillé par les notifications
+    du système de fichiers (Chrome renomme le .crdownload une fois terminé) au lieu de scruter le dossier.
+    """
+    downloaded_file = _latest_download(downloads_path, file_type)
+    if downloaded_file or timeout <= 0:
+        return downloaded_file
+
+    deadline = time.monotonic() + timeout
+    if WATCHFILES_AVAILABLE:
+        from watchfiles import watch
+
+        for _ in watch(downloads_path, recursive=False, yield_on_timeout=True,
+                       rust_timeout=int(timeout * 1000), debounce=200):
+            downloaded_file = _latest_download(downloads_path, file_type)
+            if downloaded_file or time.monotonic() >= deadline:
+                return downloaded_file
+    else:
+        while time.monotonic() < deadline:
+            time.sleep(1)
+            downloaded_file = _latest_download(downloads_path, file_type)
+            if downloaded_file:
+                return downloaded_file
+    return None
+
+
 def move_and_rename_file(download_path: str, dest_path: str, file_type: FileType) -> str | None:
     """Attente, vérification, renommage et déplacement du fichier téléchargé."""
     downloads_path = download_path
 
-    project_root = Path(__file__).resolve().parent.parent.parent.parent
-
-    destination_path = project_root / dest_path
-
     # 🔹 Attendre que le fichier soit téléchargé
     scraper_logger.info("⏳ Attente du fichier téléchargé...")
-    timeout = 30  # Temps maximum d'attente (secondes)
-    elapsed_time = 0
-    downloaded_file = None
-
-    while elapsed_time < timeout:
-        # Liste des fichiers .xlsx triés par date de création
-        if file_type == FileType.XLSX:
-            download_files = [f for f in os.listdir(downloads_path) if f.endswith(".xlsx")]
-        elif file_type == FileType.CSV:
-            download_files = [f for f in os.listdir(downloads_path) if f.endswith(".csv")]
-        else:
-            server_logger.error(f" File type not supported.")
-            raise NotImplementedError
-
-        if download_files:
-            downloaded_file = max(download_files, key=lambda f: os.path.getctime(os.path.join(downloads_path, f)))
-            scraper_logger.info(f"✅ Fichier détecté : {downloaded_file}")
-            break  # Sortir de la boucle dès qu'un fichier est détecté
-
-        time.sleep(1)
-        elapsed_time += 1
+    if file_type not in (FileType.XLSX, FileType.CSV):
+        server_logger.error(f" File type not supported.")
+        raise NotImplementedError
+
+    downloaded_file = wait_for_download(downloads_path, file_type, timeout=30)
+    if downloaded_file:
+        scraper_logger.info(f"✅ Fichier détecté : {downloaded_file}")
 
     if not downloaded_file:
         scraper_logger.info("❌ ERREUR : Aucun fichier téléchargé après l'attente.")
@@ -77,9 +105,7 @@ def move_and_rename_file(download_path: str, dest_path: str, file_type: FileType
     downloaded_file_path = os.path.join(downloads_path, downloaded_file)
 
     # 🔹 Générer un nouveau nom avec la date et l'heure
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    new_filename = f"CapuDiMuru_{timestamp}{file_type.value}"
-    new_path = os.path.join(destination_path, new_filename)
+    new_path = campbell_file_path(dest_path, file_type)
 
     # 🔹 Renommer et déplacer le fichier
     try:
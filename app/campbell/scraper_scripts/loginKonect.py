@@ -31,7 +31,7 @@ def init_driver(visibility: bool = True):
 
     # Set viewport
     driver = webdriver.Chrome(options=options)
-    scraper_logger.info(" Driver window size: ", driver.get_window_rect())  # Should show {'width': 1920, 'height': 1080}
+    scraper_logger.info(" Driver window size: %s", driver.get_window_rect())  # Should show {'width': 1920, 'height': 1080}
     return driver
 
 
@@ -1,5 +1,6 @@
 import time
 from datetime import datetime
+from typing import Optional
 import sys
 
 from selenium.common import TimeoutException
@@ -51,10 +52,21 @@ def open_task_query(driver, hourly: bool=True):
         scraper_logger.info("✅ Requête 'CapuDiMuru_Data_horaire' sélectionnée.")
 
 
-def modify_query_date(driver, hourly: bool=True):
-    """Modifie la date 'To' avec la date et heure actuelles après ouverture du menu déroulant."""
+def format_query_date(date: datetime) -> str:
+    """Format des champs de date de Table Query, ex. '7 Mar 2025 14:00'."""
+    if sys.platform == "win32":
+        return date.strftime("%#d %b %Y %H:%M")  # Windows
+    return date.strftime("%-d %b %Y %H:%M")  # Linux/Mac
+
+
+def modify_query_date(driver, hourly: bool=True, since: Optional[datetime]=None):
+    """
+    Modifie la plage de dates après ouverture du menu déroulant : 'To' à la date et heure actuelles,
+    et 'From' au dernier horodatage déjà chargé (`since`) pour ne télécharger que les nouvelles données.
+    Sans `since`, la requête horaire garde sa plage par défaut.
+    """
     wait = WebDriverWait(driver, 20)  # Augmentation du temps d'attente
-    if not hourly:
+    if not hourly or since is not None:
         try:
             # 🔹 Vérifier la présence du bouton du menu
             scraper_logger.info("🖱 Vérification de la présence du menu déroulant...")
@@ -89,11 +101,7 @@ def modify_query_date(driver, hourly: bool=True):
             to_date_field = wait.until(EC.presence_of_element_located((By.XPATH, "//*[@id='to']")))
 
             # 🔹 Générer la date et l'heure actuelles au format demandé
-            now = datetime.now()
-            if sys.platform == "win32":
-                formatted_date = now.strftime("%#d %b %Y %H:%M")  # Windows
-            else:
-                formatted_date = now.strftime("%-d %b %Y %H:%M")  # Linux/Mac
+            formatted_date = format_query_date(datetime.now())
 
             # 🔹 Effacer et modifier la date
             scraper_logger.info(f"📝 Modification de la date 'To' en : {formatted_date}")
@@ -102,6 +110,14 @@ def modify_query_date(driver, hourly: bool=True):
 
             scraper_logger.info("✅ Date 'To' mise à jour avec succès.")
 
+            # 🔹 Reprendre à partir du dernier horodatage chargé
+            if since is not None:
+                from_date_field = wait.until(EC.presence_of_element_located((By.XPATH, "//*[@id='from']")))
+                formatted_since = format_query_date(since)
+                scraper_logger.info(f"📝 Modification de la date 'From' en : {formatted_since}")
+                from_date_field.clear()
+                from_date_field.send_keys(formatted_since)
+
             time.sleep(2)
 
 
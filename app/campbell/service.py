@@ -1,75 +1,185 @@
-import csv
+import asyncio
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Tuple
 
 from sqlalchemy.exc import IntegrityError
-from openpyxl import load_workbook
 
-from app.campbell.schemas import CampbellMessage
-from app.campbell.scraper_scripts.loginKonect import init_driver, login_to_konect
+import app.crud.campbell_sensors as db_service
+import app.campbell.konect_client as konect_client
+import app.campbell.watermark as watermark
+from app.campbell.reader import stream_campbell_chunks
+from app.campbell.driver_pool import driver_pool
 from app.campbell.scraper_scripts.task_query import open_task_query, modify_query_date
 from app.campbell.scraper_scripts.download_file import click_download_button, move_and_rename_file
 from app.config import settings
 from app.entities.file_type import FileType
 from app.logs.config_scraper_logs import scraper_logger
-from app.models.models import CampbellSensors
 from app.logs.config_server_logs import server_logger
 from app.db.session import AsyncSessionLocal
 
 
-async def run_campbell_scraper(hourly: bool=True, station_name: Optional[str]=None):
-    """Programme principal qui gère la connexion et les tâches d'automatisation."""
-    driver = init_driver(visibility=False)
+# Selenium is fully blocking: scrapes run one at a time on this thread, never on the event loop
+_scraper_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="campbell-scraper")
+
+
+class ScraperCancelled(Exception):
+    pass
+
+
+class ScraperRun:
+    """Handle of a scrape running in the worker thread, used to cancel it from the event loop."""
+
+    def __init__(self):
+        self.driver = None
+        self.cancelled = threading.Event()
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise ScraperCancelled("Campbell scrape cancelled.")
+
+    def cancel(self):
+        """Flags the run and quits its browser so the blocking Selenium call in progress fails fast."""
+        self.cancelled.set()
+        driver = self.driver
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception as e:
+                scraper_logger.error(f"Error while quitting a cancelled driver: {e}")
+
+
+def scraper_file_type() -> FileType:
+    if settings.SCRAPER_DOWNLOAD_FILE_TYPE == '.csv':
+        scraper_logger.info("File type csv")
+        return FileType.CSV
+    elif settings.SCRAPER_DOWNLOAD_FILE_TYPE == '.xlsx':
+        scraper_logger.info("File type xlsx")
+        return FileType.XLSX
+    server_logger.error('Unsupported file type in .env!')
+    raise NotImplementedError
+
+
+def scrape_campbell_file(run: ScraperRun, hourly: bool=True, since: Optional[datetime]=None) -> Tuple[str, FileType]:
+    """Partie bloquante (Selenium) du scraper, exécutée dans le thread du scraper."""
+    file_type = scraper_file_type()
+
+    run.check()
+    run.driver = driver_pool.acquire()
+    healthy = False
 
     try:
-        # **Se connecter à KonectGDS**
-        driver = login_to_konect(
-            driver=driver,
-            username=settings.KONECTGDS_USERNAME,
-            password=settings.KONECTGDS_PASSWORD
-        )
+        # **Se connecter à KonectGDS** (seulement si la session du navigateur a expiré)
+        driver_pool.ensure_logged_in()
+        run.check()
 
         # **Ouvrir Table Query et modifier la date**
-        open_task_query(driver, hourly)
-        modify_query_date(driver, hourly)
-
-        if settings.SCRAPER_DOWNLOAD_FILE_TYPE == '.csv':
-            file_type = FileType.CSV
-            scraper_logger.info("File type csv")
-        elif settings.SCRAPER_DOWNLOAD_FILE_TYPE == '.xlsx':
-            file_type = FileType.XLSX
-            scraper_logger.info("File type xlsx")
-        else:
-            server_logger.error('Unsupported file type in .env!')
-            raise NotImplementedError
+        open_task_query(run.driver, hourly)
+        run.check()
+        modify_query_date(run.driver, hourly, since)
+        run.check()
 
         # **Télécharger et déplacer le fichier**
         try:
-            click_download_button(driver=driver, file_type=file_type)
+            click_download_button(driver=run.driver, file_type=file_type)
         except Exception as e:
             scraper_logger.error(e)
             raise e
+        run.check()
         new_file = move_and_rename_file(
             settings.SCRAPER_DOWNLOAD_ABS_PATH,
             settings.SCRAPER_FILE_DEST,
             file_type
         )
+        if new_file is None:
+            raise FileNotFoundError("No downloaded Campbell file to ingest.")
 
         scraper_logger.info("✅ Processus terminé avec succès !")
+        healthy = True
+        return new_file, file_type
+    except SystemExit as e:
+        # The scraper scripts sys.exit() on failure; never let that escape the worker thread
+        raise RuntimeError(f"Campbell scraper aborted (exit code {e.code}).") from e
+    finally:
+        # The browser stays open for the next run unless this one failed or was cancelled
+        driver_pool.release(run.driver, healthy=healthy and not run.cancelled.is_set())
+
+
+async def download_with_browser(hourly: bool=True, since: Optional[datetime]=None) -> Tuple[str, FileType]:
+    """Runs the Selenium backend on the scraper thread; cancels the browser if the wait is interrupted."""
+    run = ScraperRun()
+    loop = asyncio.get_running_loop()
+    scrape = loop.run_in_executor(_scraper_executor, scrape_campbell_file, run, hourly, since)
+    try:
+        return await asyncio.wait_for(scrape, timeout=settings.SCRAPER_TIMEOUT_S)
+    except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+        scraper_logger.error(f"❌ Scraper interrompu ({type(e).__name__}), fermeture du navigateur.")
+        await asyncio.to_thread(run.cancel)
+        raise
 
-        message = await process_campbell_file(new_file, file_type)
 
-        server_logger.info(message)
+async def close_scraper_browser():
+    """Quits the pooled browser on the scraper thread, after any scrape in progress."""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_scraper_executor, driver_pool.close)
+    scraper_logger.info("🔒 Fermeture du navigateur.")
 
-        return "Campbell Scraping Process terminated with success!"
+
+async def download_with_http(hourly: bool=True, since: Optional[datetime]=None) -> Tuple[str, FileType]:
+    """Requests the export directly from KonectGDS, without a browser."""
+    file_type = scraper_file_type()
+    new_file = await asyncio.wait_for(
+        konect_client.download_campbell_export(hourly, file_type, since), timeout=settings.SCRAPER_TIMEOUT_S
+    )
+    return new_file, file_type
+
+
+async def run_campbell_scraper(hourly: bool=True, station_name: Optional[str]=None):
+    """Programme principal qui gère la connexion et les tâches d'automatisation."""
+    if settings.SCRAPER_BACKEND == "http":
+        download = download_with_http
+    elif settings.SCRAPER_BACKEND == "selenium":
+        download = download_with_browser
+    else:
+        server_logger.error(f"Unsupported scraper backend in .env: {settings.SCRAPER_BACKEND}")
+        raise NotImplementedError
+
+    station_id = settings.SCRAPER_STATION
+    try:
+        # Only ask KonectGDS for rows newer than what is already loaded; a missed run catches up here
+        since = await watermark.get_watermark(station_id)
+        new_file, file_type = await download(hourly, since)
+    except asyncio.TimeoutError:
+        scraper_logger.error(f"❌ Scraper arrêté après {settings.SCRAPER_TIMEOUT_S} s.")
+        return None
     except Exception as e:
-        scraper_logger.error("❌ Fermeture du Scraper avec erreur: ", e)
-    finally:
-        driver.quit()
-        scraper_logger.info("🔒 Fermeture du navigateur.")
+        scraper_logger.error(f"❌ Fermeture du Scraper avec erreur: {e}")
+        return None
 
-async def process_campbell_file(file: str, file_type: FileType, station_name: Optional[str]=None):
+    try:
+        message = await process_campbell_file(new_file, file_type, incremental=True)
+    except Exception as e:
+        scraper_logger.error(f"❌ Erreur lors de l'ingestion du fichier: {e}")
+        return None
+
+    server_logger.info(message)
+
+    return "Campbell Scraping Process terminated with success!"
+
+async def process_campbell_file(file: str, file_type: FileType, station_name: Optional[str]=None,
+                                incremental: bool=False):
+    """
+    Loads a Campbell export into the database.
+
+    :param file:
+    :param file_type:
+    :param station_name:
+    :param incremental: skip rows at or before the station watermark before they reach the DB
+    :return: staged/inserted/duplicate counts
+    """
     if station_name is None:
         station_id = settings.SCRAPER_STATION
     elif station_name == settings.SCRAPER_STATION:
@@ -78,123 +188,17 @@ async def process_campbell_file(file: str, file_type: FileType, station_name: Op
         raise Exception("Unsupported station name!")
 
     try:
-        async with AsyncSessionLocal() as db:
-            if file_type == FileType.XLSX:
-                wb = load_workbook(file, data_only=True)
-                sheet = wb.active
-                server_logger.info(f"Reading File at {file} for loading to the DB.")
-                # Skip the header row (start from row 2)
-
-                row_count = 0  # Counter to track how many rows have been processed
-
-                for row in sheet.iter_rows(min_row=2, values_only=True):
-                    timestamp_str, air_temp_avg, batt_voltage_avg, bp_mbar_avg, dew_point_avg, met_sens_status, \
-                        ms60_irradiance_avg, p_temp_avg, rain_mm_tot, humidity, wind_dir, wind_speed = row
-
-                    timestamp = datetime.strptime(timestamp_str, '%Y-%m-%dT%H:%M:%S')
-
-                    sensor_data = CampbellMessage(
-                        timestamp=timestamp.replace(tzinfo=None),
-                        air_temp_avg=air_temp_avg,
-                        batt_voltage_avg=batt_voltage_avg,
-                        bp_mbar_avg=bp_mbar_avg,
-                        dew_point_avg=dew_point_avg,
-                        met_sens_status=met_sens_status,
-                        ms60_irradiance_avg=ms60_irradiance_avg,
-                        p_temp_avg=p_temp_avg,
-                        rain_mm_tot=rain_mm_tot,
-                        humidity=humidity,
-                        wind_dir=wind_dir,
-                        wind_speed=wind_speed
-                    )
-
-                    new_sensor = CampbellSensors(
-                        timestamp=sensor_data.timestamp,
-                        station_name=station_id,
-                        air_temp_avg=sensor_data.air_temp_avg,
-                        batt_voltage_avg=sensor_data.batt_voltage_avg,
-                        bp_mbar_avg=sensor_data.bp_mbar_avg,
-                        dew_point_avg=sensor_data.dew_point_avg,
-                        met_sens_status=sensor_data.met_sens_status,
-                        ms60_irradiance_avg=sensor_data.ms60_irradiance_avg,
-                        p_temp_avg=sensor_data.p_temp_avg,
-                        rain_mm_tot=sensor_data.rain_mm_tot,
-                        humidity=sensor_data.humidity,
-                        wind_dir=sensor_data.wind_dir,
-                        wind_speed=sensor_data.wind_speed,
-                        created_at=datetime.now()  # Use the current timestamp for creation
-                    )
-                    db.add(new_sensor)
-                    row_count += 1
-                    server_logger.info(f"New Campbell sensor added to DB. Created Entity: \n{new_sensor.__dict__}")
-
-                    if row_count % 100 == 0:  # Commit every 100 rows
-                        await db.flush()  # Flush to ensure data is sent to the DB
-                        await db.commit()  # Commit the transaction to the DB
-                        server_logger.info(f"Committed {row_count} rows to DB.")
-
-            if file_type == FileType.CSV:
-                server_logger.info(f"Reading CSV file at {file} for loading to the DB.")
-
-                with open(file, newline='', encoding='utf-8') as csvfile:
-                    reader = csv.reader(csvfile)
-                    header = next(reader)  # Skip header
-
-                    row_count = 0  # Counter to track how many rows have been processed
-
-                    for row in reader:
-                        timestamp_str, air_temp_avg, batt_voltage_avg, bp_mbar_avg, dew_point_avg, met_sens_status, \
-                            ms60_irradiance_avg, p_temp_avg, rain_mm_tot, humidity, wind_dir, wind_speed = row
-
-                        timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M')
-
-                        sensor_data = CampbellMessage(
-                            timestamp=timestamp.replace(tzinfo=None),
-                            air_temp_avg=float(air_temp_avg) if air_temp_avg else None,
-                            batt_voltage_avg=float(batt_voltage_avg) if batt_voltage_avg else None,
-                            bp_mbar_avg=float(bp_mbar_avg) if bp_mbar_avg else None,
-                            dew_point_avg=float(dew_point_avg) if dew_point_avg else None,
-                            met_sens_status=met_sens_status,
-                            ms60_irradiance_avg=float(ms60_irradiance_avg) if ms60_irradiance_avg else None,
-                            p_temp_avg=float(p_temp_avg) if p_temp_avg else None,
-                            rain_mm_tot=float(rain_mm_tot) if rain_mm_tot else None,
-                            humidity=float(humidity) if humidity else None,
-                            wind_dir=float(wind_dir) if wind_dir else None,
-                            wind_speed=float(wind_speed) if wind_speed else None
-                        )
-
-                        new_sensor = CampbellSensors(
-                            timestamp=sensor_data.timestamp,
-                            station_name=station_id,
-                            air_temp_avg=sensor_data.air_temp_avg,
-                            batt_voltage_avg=sensor_data.batt_voltage_avg,
-                            bp_mbar_avg=sensor_data.bp_mbar_avg,
-                            dew_point_avg=sensor_data.dew_point_avg,
-                            met_sens_status=sensor_data.met_sens_status,
-                            ms60_irradiance_avg=sensor_data.ms60_irradiance_avg,
-                            p_temp_avg=sensor_data.p_temp_avg,
-                            rain_mm_tot=sensor_data.rain_mm_tot,
-                            humidity=sensor_data.humidity,
-                            wind_dir=sensor_data.wind_dir,
-                            wind_speed=sensor_data.wind_speed,
-                            created_at=datetime.now()
-                        )
-                        db.add(new_sensor)
-                        row_count += 1
-                        server_logger.info(f"New Campbell sensor added to DB. Created Entity: \n{new_sensor.__dict__}")
-
-                        if row_count % 100 == 0:  # Commit every 100 rows
-                            await db.flush()  # Flush to ensure data is sent to the DB
-                            await db.commit()  # Commit the transaction to the DB
-                            server_logger.info(f"Committed {row_count} rows to DB.")
-
-                    else:
-                        await db.commit()  # Commit the remaining rows after finishing processing
-                        server_logger.info("Commit successful!")
+        after = await watermark.get_watermark(station_id) if incremental else None
+        server_logger.info(f"Reading File at {file} for loading to the DB (after {after}).")
+        async with AsyncSessionLocal() as db, \
+                aclosing(stream_campbell_chunks(file, file_type, station_id, after=after)) as chunks:
+            counts = await db_service.copy_campbell_readings(db, chunks)
+        watermark.advance_watermark(station_id, counts["latest"])
+        server_logger.info(f"Campbell file loaded: {counts}")
 
     except IntegrityError as e1:
         server_logger.error(f"Error processing Campbell file: {e1}")
-        server_logger.error(f"IntegrityError -- Please check if the inserted data already exists.")
+        server_logger.error(f"IntegrityError -- Please check the station of the inserted data exists.")
         raise e1
     except Exception as e:
         # Log the error and traceback for better diagnosis
@@ -202,8 +206,4 @@ async def process_campbell_file(file: str, file_type: FileType, station_name: Op
         server_logger.error("Stack trace: %s", traceback.format_exc())
         raise e
 
-    return {"message": "File processed and saved to database."}
-
-
-
-
+    return {"message": "File processed and saved to database.", **counts}
@@ -0,0 +1,30 @@
+from datetime import datetime
+from typing import Dict, Optional
+
+import app.crud.campbell_sensors as db_service
+from app.db.session import AsyncSessionLocal
+from app.logs.config_server_logs import server_logger
+
+# Latest loaded timestamp per station. Read from the table once, then advanced after each load
+_watermarks: Dict[str, Optional[datetime]] = {}
+
+
+async def get_watermark(station_name: str) -> Optional[datetime]:
+    """
+    Latest Campbell timestamp already stored for the station, None when the station has no data.
+
+    :param station_name:
+    :return:
+    """
+    if station_name not in _watermarks:
+        async with AsyncSessionLocal() as db:
+            _watermarks[station_name] = await db_service.get_latest_campbell_timestamp(db, station_name)
+        server_logger.info(f"Campbell watermark for {station_name}: {_watermarks[station_name]}")
+    return _watermarks[station_name]
+
+
+def advance_watermark(station_name: str, latest: Optional[datetime]):
+    current = _watermarks.get(station_name)
+    if latest is not None and (current is None or latest > current):
+        _watermarks[station_name] = latest
+
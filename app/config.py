@@ -5,6 +5,13 @@ from pydantic import Field
 class Settings(BaseSettings):
     DATABASE_URL: str
     DB_DEBUG: bool = Field(default=False)
+    LOG_LEVEL: str = Field(default="INFO")
+    LOG_JSON: bool = Field(default=True)  # JSON lines; False keeps the plain text format
+    LOG_MAX_BYTES: int = Field(default=50 * 1024 * 1024)
+    LOG_ROTATE_WHEN: str = Field(default="midnight")
+    LOG_BACKUP_COUNT: int = Field(default=14)
+    LOG_BODY_MAX_BYTES: int = Field(default=2048)
+    LOG_REQUEST_SAMPLE_RATE: float = Field(default=0.1)  # Share of successful requests logged; failures always are
     INTERNAL_API_KEY: str
     SCRAPER_DOWNLOAD_ABS_PATH: str
     SCRAPER_FILE_DEST: str
@@ -12,9 +19,26 @@ class Settings(BaseSettings):
     SCRAPER_FREQ: int
     SCRAPER_HOURLY: bool = Field(default=False)
     SCRAPER_STATION: str
+    SCRAPER_TIMEOUT_S: int = Field(default=300)
+    SCRAPER_BACKEND: str = Field(default="selenium")  # "selenium" or "http"
+    SCRAPER_DRIVER_MAX_USES: int = Field(default=24)
+    SCRAPER_DRIVER_MAX_HEAP_MB: int = Field(default=512)
+    CAMPBELL_INBOX_ENABLED: bool = Field(default=False)
+    CAMPBELL_INBOX_DIR: str = Field(default="data/inbox")
+    CAMPBELL_ARCHIVE_DIR: str = Field(default="data/archive")
+    CAMPBELL_QUARANTINE_DIR: str = Field(default="data/quarantine")
+    CAMPBELL_INBOX_CONCURRENCY: int = Field(default=2)
+    CAMPBELL_INBOX_POLL_S: float = Field(default=2.0)
+    CAMPBELL_INBOX_SETTLE_S: float = Field(default=1.0)
+    CAMPBELL_INBOX_RETRY_BASE_S: float = Field(default=5.0)  # Backoff of files that failed on a DB or I/O error
+    CAMPBELL_INBOX_RETRY_MAX_S: float = Field(default=300.0)
     KONECTGDS_USERNAME: str
     KONECTGDS_PASSWORD: str
     KONECTGDS_URL: str
+    # Endpoints of the "http" scraper backend, not yet checked against the live KonectGDS:
+    # keep SCRAPER_BACKEND on "selenium" until benchmarks/bench_campbell_export.py --live passes
+    KONECTGDS_LOGIN_PATH: str = Field(default="/Account/Login")
+    KONECTGDS_EXPORT_PATH: str = Field(default="/TableQuery/Export")
     DAVIS_EXTERNAL_API_URI: str
     DAVIS_EXTERNAL_API_SECRET: str
     DAVIS_EXTERNAL_API_KEY: str
@@ -22,10 +46,37 @@ class Settings(BaseSettings):
     DAVIS_TRIGGER_FREQ: int
     DAVIS_HISTORIC_API_URI: str
     DAVIS_IS_HISTORIC: bool = Field(default=False)
+    DAVIS_BACKFILL_CONCURRENCY: int = Field(default=4)
+    DAVIS_BACKFILL_RETRIES: int = Field(default=3)
     METEOFRANCE_API_KEY: str
     METEOFRANCE_URL: str
     METEOFRANCE_OBS_INFRAHORAIRE: str
     METEOFRANCE_OPTJSON: str
+    METEOFRANCE_STATIONS: str = Field(default="")  # Comma separated station ids polled by the scheduler
+    METEOFRANCE_TICK_S: int = Field(default=15)
+    METEOFRANCE_PUBLICATION_MARGIN_S: int = Field(default=20)
+    METEOFRANCE_RETRY_S: int = Field(default=30)
+    METEOFRANCE_UPSERT_UPDATE: bool = Field(default=False)  # Overwrite observations republished with a newer insert_time
+    METEOFRANCE_CONCURRENCY: int = Field(default=5)
+    METEOFRANCE_RATE_PER_MIN: int = Field(default=50)
+    METEOFRANCE_RATE_BURST: int = Field(default=5)
+    HTTP_MAX_CONNECTIONS: int = Field(default=20)
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = Field(default=10)
+    HTTP_KEEPALIVE_EXPIRY: float = Field(default=60.0)
+    HTTP_CONNECT_TIMEOUT: float = Field(default=5.0)
+    HTTP_READ_TIMEOUT: float = Field(default=30.0)
+    HTTP_CONNECT_RETRIES: int = Field(default=1)
+    WRITE_BEHIND_ENABLED: bool = Field(default=False)
+    WRITE_BEHIND_FLUSH_MS: int = Field(default=500)
+    WRITE_BEHIND_FLUSH_ROWS: int = Field(default=500)
+    WRITE_BEHIND_QUEUE_SIZE: int = Field(default=10000)
+    WRITE_BEHIND_RETRIES: int = Field(default=5)  # Failed flushes retried before the batch is spilled to disk
+    WRITE_BEHIND_RETRY_BASE_MS: int = Field(default=500)
+    WRITE_BEHIND_RETRY_MAX_MS: int = Field(default=30000)
+    WRITE_BEHIND_DEAD_LETTER_DIR: str = Field(default="data/dead_letter")
+    ROLLUPS_ENABLED: bool = Field(default=False)  # Needs the reading_rollup_* tables
+    ROLLUP_REFRESH_S: int = Field(default=60)
+    ROLLUP_BATCH_HOURS: int = Field(default=1000)
     class Config:
         env_file = ".env"
 
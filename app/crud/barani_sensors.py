@@ -1,10 +1,17 @@
 from datetime import datetime
+from typing import List, Optional, Union
 
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.crud.rollups import mark_rollups_dirty
 from app.models.models import BaraniHelixSensors, BaraniWindSensors
 from app.barani.schemas import HelixMessage, WindMessage
 
+# asyncpg caps a statement at 32767 bind parameters, so very large batches are split
+BULK_INSERT_CHUNK_SIZE = 1000
+
 
 async def get_sensor_by_serial_number(db: AsyncSession, serial_number: str):
     result = await db.execute(
@@ -13,28 +20,28 @@ async def get_sensor_by_serial_number(db: AsyncSession, serial_number: str):
     return result.scalars().first()
 
 
-async def create_barani_helix_reading(db: AsyncSession, sensor_reading: HelixMessage):
-
-    timestamp = sensor_reading.timestamp
+def normalize_timestamp(timestamp: Union[str, datetime]) -> datetime:
     if isinstance(timestamp, datetime):
-        timestamp = timestamp.replace(tzinfo=None)
-    else:
-        timestamp = datetime.fromisoformat(timestamp).replace(
-            tzinfo=None)
+        return timestamp.replace(tzinfo=None)
+    return datetime.fromisoformat(timestamp).replace(tzinfo=None)
+
+
+def normalize_pressure(pressure: Optional[float]) -> Optional[float]:
     # Pour changemenet de Pa a hPa
-    if sensor_reading.pressure > 10000 :
-        pressure = float(sensor_reading.pressure / 100)
-    else:
-        pressure = sensor_reading.pressure
+    if pressure is not None and pressure > 10000:
+        return float(pressure / 100)
+    return pressure
+
 
-    new_reading = BaraniHelixSensors(
-        timestamp=timestamp,
+def helix_reading_values(sensor_reading: HelixMessage) -> dict:
+    return dict(
+        timestamp=normalize_timestamp(sensor_reading.timestamp),
         serial_number=sensor_reading.serial_number,
         rain=sensor_reading.rain,
         battery=sensor_reading.battery,
         dew_point=sensor_reading.dew_point,
         humidity=sensor_reading.humidity,
-        pressure=pressure,
+        pressure=normalize_pressure(sensor_reading.pressure),
         irradiation=sensor_reading.irradiation,
         temperature=sensor_reading.temperature,
         rainfall_rate_max=sensor_reading.rainfall_rate_max,
@@ -42,22 +49,10 @@ async def create_barani_helix_reading(db: AsyncSession, sensor_reading: HelixMes
         created_at=datetime.now()
     )
 
-    db.add(new_reading)
-    await db.commit()
-    await db.refresh(new_reading)
-    return new_reading
-
-
-async def insert_barani_wind_reading(db: AsyncSession, wind_reading: WindMessage):
-    timestamp = wind_reading.timestamp
-    if isinstance(timestamp, datetime):
-        timestamp = timestamp.replace(tzinfo=None)
-    else:
-        timestamp = datetime.fromisoformat(timestamp).replace(
-            tzinfo=None)
 
-    new_reading = BaraniWindSensors(
-        timestamp=timestamp,
+def wind_reading_values(wind_reading: WindMessage) -> dict:
+    return dict(
+        timestamp=normalize_timestamp(wind_reading.timestamp),
         serial_number=wind_reading.serial_number,
         battery=wind_reading.battery,
 
@@ -76,7 +71,60 @@ async def insert_barani_wind_reading(db: AsyncSession, wind_reading: WindMessage
         created_at=datetime.utcnow(),
     )
 
+
+async def create_barani_helix_reading(db: AsyncSession, sensor_reading: HelixMessage):
+    new_reading = BaraniHelixSensors(**helix_reading_values(sensor_reading))
+
+    db.add(new_reading)
+    if settings.ROLLUPS_ENABLED:
+        await mark_rollups_dirty(db, "barani_helix", [(new_reading.serial_number, new_reading.timestamp)])
+    await db.commit()
+    await db.refresh(new_reading)
+    return new_reading
+
+
+async def insert_barani_wind_reading(db: AsyncSession, wind_reading: WindMessage):
+    new_reading = BaraniWindSensors(**wind_reading_values(wind_reading))
+
     db.add(new_reading)
+    if settings.ROLLUPS_ENABLED:
+        await mark_rollups_dirty(db, "barani_wind", [(new_reading.serial_number, new_reading.timestamp)])
     await db.commit()
     await db.refresh(new_reading)
     return new_reading
+
+
+async def bulk_insert_barani_rows(db: AsyncSession, model, rows: List[dict], source: str) -> int:
+    """
+    Inserts already normalized rows into a Barani table with multi-row INSERT statements.
+    Rows whose (serial_number, timestamp) key already exists are skipped by the database.
+
+    :param db:
+    :param model: BaraniHelixSensors or BaraniWindSensors
+    :param rows: column values as built by helix_reading_values / wind_reading_values
+    :param source: readings source name of the table, for the rollups
+    :return: number of rows actually inserted
+    """
+    inserted = 0
+    for start in range(0, len(rows), BULK_INSERT_CHUNK_SIZE):
+        stmt = (
+            insert(model)
+            .values(rows[start:start + BULK_INSERT_CHUNK_SIZE])
+            .on_conflict_do_nothing(index_elements=[model.serial_number, model.timestamp])
+            .returning(model.serial_number, model.timestamp)
+        )
+        result = await db.execute(stmt)
+        new_keys = result.all()
+        inserted += len(new_keys)
+        if settings.ROLLUPS_ENABLED:
+            await mark_rollups_dirty(db, source, new_keys)
+    await db.commit()
+    return inserted
+
+
+async def bulk_insert_barani_helix_readings(db: AsyncSession, rows: List[dict]) -> int:
+    return await bulk_insert_barani_rows(db, BaraniHelixSensors, rows, "barani_helix")
+
+
+async def bulk_insert_barani_wind_readings(db: AsyncSession, rows: List[dict]) -> int:
+    return await bulk_insert_barani_rows(db, BaraniWindSensors, rows, "barani_wind")
@@ -1,28 +1,100 @@
 from datetime import datetime
+from typing import AsyncIterable, List, Optional, Tuple
 
+from sqlalchemy import text, select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.campbell.schemas import CampbellMessage
-from app.models.models import CampbellSensors
-
-
-async def create_campbell_reading(db: AsyncSession, sensor_reading: CampbellMessage):
-    
-    new_sensor = CampbellSensors(
-        timestamp=sensor_reading.timestamp,
-        air_temp_avg=sensor_reading.air_temp_avg,
-        batt_voltage_avg=sensor_reading.batt_voltage_avg,
-        bp_mbar_avg=sensor_reading.bp_mbar_avg,
-        dew_point_avg=sensor_reading.dew_point_avg,
-        met_sens_status=sensor_reading.met_sens_status,
-        ms60_irradiance_avg=sensor_reading.ms60_irradiance_avg,
-        p_temp_avg=sensor_reading.p_temp_avg,
-        rain_mm_tot=sensor_reading.rain_mm_tot,
-        humidity=sensor_reading.humidity,
-        wind_dir=sensor_reading.wind_dir,
-        wind_speed=sensor_reading.wind_speed,
-        created_at=datetime.now()  # Use the current timestamp for creation
+from app.config import settings
+from app.models.models import CampbellSensors, ReadingRollupDirty
+
+CAMPBELL_TABLE = CampbellSensors.__tablename__
+CAMPBELL_STAGING_TABLE = f"{CAMPBELL_TABLE}_staging"
+
+# Column order of the records handed to copy_campbell_readings
+CAMPBELL_COPY_COLUMNS = (
+    "timestamp",
+    "station_name",
+    "air_temp_avg",
+    "batt_voltage_avg",
+    "bp_mbar_avg",
+    "dew_point_avg",
+    "met_sens_status",
+    "ms60_irradiance_avg",
+    "p_temp_avg",
+    "rain_mm_tot",
+    "humidity",
+    "wind_dir",
+    "wind_speed",
+    "created_at",
+)
+
+_COLUMN_LIST = ", ".join(f'"{column}"' for column in CAMPBELL_COPY_COLUMNS)
+
+_CREATE_STAGING_SQL = text(
+    f"CREATE TEMP TABLE IF NOT EXISTS {CAMPBELL_STAGING_TABLE} "
+    f"(LIKE {CAMPBELL_TABLE} INCLUDING DEFAULTS) ON COMMIT DROP"
+)
+
+# DISTINCT ON keeps a single row per timestamp when the file itself repeats one
+_MERGE_STAGING_SQL = text(
+    f"INSERT INTO {CAMPBELL_TABLE} ({_COLUMN_LIST}) "
+    f'SELECT DISTINCT ON ("timestamp") {_COLUMN_LIST} FROM {CAMPBELL_STAGING_TABLE} '
+    f'ORDER BY "timestamp" '
+    f'ON CONFLICT ("timestamp") DO NOTHING'
+)
+
+# Same merge, also marking the hours of the inserted rows for the rollups
+_MERGE_STAGING_MARK_DIRTY_SQL = text(
+    f"WITH inserted AS ({_MERGE_STAGING_SQL.text} RETURNING \"timestamp\", station_name), "
+    f"dirty AS (INSERT INTO {ReadingRollupDirty.__tablename__} (source, station, bucket, marked_at) "
+    f"SELECT DISTINCT 'campbell', station_name, date_trunc('hour', \"timestamp\"), now() FROM inserted "
+    f"WHERE station_name IS NOT NULL ON CONFLICT DO NOTHING) "
+    f"SELECT count(*) FROM inserted"
+)
+
+_STAGED_LATEST_SQL = text(f'SELECT max("timestamp") FROM {CAMPBELL_STAGING_TABLE}')
+
+
+async def get_latest_campbell_timestamp(db: AsyncSession, station_name: str) -> Optional[datetime]:
+    result = await db.execute(
+        select(func.max(CampbellSensors.timestamp)).where(CampbellSensors.station_name == station_name)
     )
-    db.add(new_sensor)
+    return result.scalar_one_or_none()
+
+
+async def copy_campbell_readings(db: AsyncSession, chunks: AsyncIterable[List[Tuple]]) -> dict:
+    """
+    Bulk loads Campbell readings with COPY into a temporary staging table, then merges the
+    staging table into campbell_capu_di_muru in one statement. Timestamps that are already
+    loaded are skipped instead of failing the whole file.
+    Everything runs in a single transaction, so a failure leaves the table untouched.
+
+    :param db:
+    :param chunks: lists of records ordered as CAMPBELL_COPY_COLUMNS
+    :return: staged, inserted and duplicate row counts, and the latest staged timestamp
+    """
+    # Executing through the session opens the transaction the temp table lives in
+    await db.execute(_CREATE_STAGING_SQL)
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    asyncpg_connection = raw_connection.driver_connection
+
+    staged = 0
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        await asyncpg_connection.copy_records_to_table(
+            CAMPBELL_STAGING_TABLE,
+            records=chunk,
+            columns=CAMPBELL_COPY_COLUMNS,
+        )
+        staged += len(chunk)
+
+    latest = (await db.execute(_STAGED_LATEST_SQL)).scalar_one_or_none() if staged else None
+    if settings.ROLLUPS_ENABLED:
+        inserted = (await db.execute(_MERGE_STAGING_MARK_DIRTY_SQL)).scalar_one()
+    else:
+        inserted = (await db.execute(_MERGE_STAGING_SQL)).rowcount
+    await db.commit()
 
-    await db.commit()
\ No newline at end of file
+    return {"staged": staged, "inserted": inserted, "duplicates": staged - inserted, "latest": latest}
@@ -1,201 +1,243 @@
 import traceback
 import uuid
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
 
-from sqlalchemy.future import select
+from pydantic import BaseModel
+from sqlalchemy import exists, func, literal, select, text
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
+from app.crud.rollups import mark_rollups_dirty
 from app.davis.schemas import DavisMessage
-from app.models.models import DavisStation, DavisBarometer, DavisVantagePro2, DavisGatewayQuectel
+from app.models.models import DavisStation, DavisBarometer, DavisVantagePro2, DavisGatewayQuectel, \
+    DavisBackfillWindow
 from app.logs.config_server_logs import server_logger as logger
 
-
-async def create_davis_sensors(db: AsyncSession, message: DavisMessage) -> Optional[DavisStation]:
-    barometer_id = uuid.uuid4()
-    gateway_id = uuid.uuid4()
-    vantage_id = uuid.uuid4()
-
-    gateway_existing = await get_existing_gateway(db, message)
-    ts_check = await check_existing_ts(db, message)
-    if ts_check:
-        new_vantagePro = DavisVantagePro2(
-            id=vantage_id,
-            lsid=message.vantagePro_msg.lsid,
-            ts=message.vantagePro_msg.ts,
-            tz_offset=message.vantagePro_msg.tz_offset,
-            date=datetime.fromtimestamp(message.vantagePro_msg.ts),
-            sensor_data_structure_id=f"{message.vantagePro_msg.sensor_type}_{message.vantagePro_msg.data_structure_type}",
-            bar=message.vantagePro_msg.bar,
-            bar_absolute=message.vantagePro_msg.bar_absolute,
-            bar_trend=message.vantagePro_msg.bar_trend,
-            dew_point=message.vantagePro_msg.dew_point,
-            et_day=message.vantagePro_msg.et_day,
-            forecast_rule=message.vantagePro_msg.forecast_rule,
-            forecast_desc=message.vantagePro_msg.forecast_desc,
-            heat_index=message.vantagePro_msg.heat_index,
-            hum_out=message.vantagePro_msg.hum_out,
-            rain_15_min_clicks=message.vantagePro_msg.rain_15_min_clicks,
-            rain_15_min_in=message.vantagePro_msg.rain_15_min_in,
-            rain_15_min_mm=message.vantagePro_msg.rain_15_min_mm,
-            rain_60_min_clicks=message.vantagePro_msg.rain_60_min_clicks,
-            rain_60_min_in=message.vantagePro_msg.rain_60_min_in,
-            rain_60_min_mm=message.vantagePro_msg.rain_60_min_mm,
-            rain_24_hr_clicks=message.vantagePro_msg.rain_24_hr_clicks,
-            rain_24_hr_in=message.vantagePro_msg.rain_24_hr_in,
-            rain_24_hr_mm=message.vantagePro_msg.rain_24_hr_mm,
-            rain_day_clicks=message.vantagePro_msg.rain_day_clicks,
-            rain_day_in=message.vantagePro_msg.rain_day_in,
-            rain_day_mm=message.vantagePro_msg.rain_day_mm,
-            rain_rate_clicks=message.vantagePro_msg.rain_rate_clicks,
-            rain_rate_in=message.vantagePro_msg.rain_rate_in,
-            rain_rate_mm=message.vantagePro_msg.rain_rate_mm,
-            rain_storm_clicks=message.vantagePro_msg.rain_storm_clicks,
-            rain_storm_in=message.vantagePro_msg.rain_storm_in,
-            rain_storm_mm=message.vantagePro_msg.rain_storm_mm,
-            rain_storm_start_date=message.vantagePro_msg.rain_storm_start_date,
-            solar_rad=message.vantagePro_msg.solar_rad,
-            temp_out=message.vantagePro_msg.temp_out,
-            thsw_index=message.vantagePro_msg.thsw_index,
-            uv=message.vantagePro_msg.uv,
-            wind_chill=message.vantagePro_msg.wind_chill,
-            wind_dir=message.vantagePro_msg.wind_dir,
-            wind_dir_of_gust_10_min=message.vantagePro_msg.wind_dir_of_gust_10_min,
-            wind_gust_10_min=message.vantagePro_msg.wind_gust_10_min,
-            wind_speed=message.vantagePro_msg.wind_speed,
-            wind_speed_2_min=message.vantagePro_msg.wind_speed_2_min,
-            wind_speed_10_min=message.vantagePro_msg.wind_speed_10_min,
-            wet_bulb=message.vantagePro_msg.wet_bulb
-        )
-        if gateway_existing:
-            gateway_id = gateway_existing.id
-        else:
-            new_gateway = DavisGatewayQuectel(
-                id=gateway_id,
-                lsid=message.gateway_msg.lsid,
-                ts=message.gateway_msg.ts,
-                tz_offset=message.gateway_msg.tz_offset,
-                date=datetime.fromtimestamp(message.gateway_msg.ts),
-                sensor_data_structure_id=f"{message.gateway_msg.sensor_type}_{message.gateway_msg.data_structure_type}",
-                iss_solar_panel_voltage=message.gateway_msg.iss_solar_panel_voltage,
-                last_gps_reading_timestamp=message.gateway_msg.last_gps_reading_timestamp,
-                resyncs=message.gateway_msg.resyncs,
-                transmitter_battery_state=message.gateway_msg.transmitter_battery_state,
-                crc_errors=message.gateway_msg.crc_errors,
-                tiva_application_firmware_version=message.gateway_msg.tiva_application_firmware_version,
-                lead_acid_battery_voltage=message.gateway_msg.lead_acid_battery_voltage,
-                iss_transmitter_battery_voltage=message.gateway_msg.iss_transmitter_battery_voltage,
-                beacon_interval=message.gateway_msg.beacon_interval,
-                davistalk_rssi=message.gateway_msg.davistalk_rssi,
-                solar_panel_voltage=message.gateway_msg.solar_panel_voltage,
-                rank=message.gateway_msg.rank,
-                false_wakeup_rssi=message.gateway_msg.false_wakeup_rssi,
-                cell_id=message.gateway_msg.cell_id,
-                longitude=message.gateway_msg.longitude,
-                power_percentage_mcu=message.gateway_msg.power_percentage_mcu,
-                mcc_mnc=message.gateway_msg.mcc_mnc,
-                iss_super_cap_voltage=message.gateway_msg.iss_super_cap_voltage,
-                false_wakeup_count=message.gateway_msg.false_wakeup_count,
-                etx=message.gateway_msg.etx,
-                number_of_neighbors=message.gateway_msg.number_of_neighbors,
-                last_parent_rtt_ping=message.gateway_msg.last_parent_rtt_ping,
-                bootloader_version=message.gateway_msg.bootloader_version,
-                cme=message.gateway_msg.cme,
-                cc1310_firmware_version=message.gateway_msg.cc1310_firmware_version,
-                power_percentage_rx=message.gateway_msg.power_percentage_rx,
-                good_packet_streak=message.gateway_msg.good_packet_streak,
-                rpl_parent_node_id=message.gateway_msg.rpl_parent_node_id,
-                afc_setting=message.gateway_msg.afc_setting,
-                overall_access_technology=message.gateway_msg.overall_access_technology,
-                cell_channel=message.gateway_msg.cell_channel,
-                noise_floor_rssi=message.gateway_msg.noise_floor_rssi,
-                latitude=message.gateway_msg.latitude,
-                cereg=message.gateway_msg.cereg,
-                last_cme_error_timestamp=message.gateway_msg.last_cme_error_timestamp,
-                bluetooth_firmware_version=message.gateway_msg.bluetooth_firmware_version,
-                location_area_code=message.gateway_msg.location_area_code,
-                link_layer_packets_received=message.gateway_msg.link_layer_packets_received,
-                reception_percent=message.gateway_msg.reception_percent,
-                rx_bytes=message.gateway_msg.rx_bytes,
-                link_uptime=message.gateway_msg.link_uptime,
-                creg_cgreg=message.gateway_msg.creg_cgreg,
-                health_version=message.gateway_msg.health_version,
-                inside_box_temp=message.gateway_msg.inside_box_temp,
-                tx_bytes=message.gateway_msg.tx_bytes,
-                elevation=message.gateway_msg.elevation,
-                power_percentage_tx=message.gateway_msg.power_percentage_tx,
-                rssi=message.gateway_msg.rssi,
-                last_rx_rssi=message.gateway_msg.last_rx_rssi,
-                rpl_mode=message.gateway_msg.rpl_mode,
-                uptime=message.gateway_msg.uptime,
-                platform_id=message.gateway_msg.platform_id
-            )
-            db.add(new_gateway)
-
-        new_barometer = DavisBarometer(
-            id=barometer_id,
-            lsid=message.barometer_msg.lsid,
-            ts=message.barometer_msg.ts,
-            tz_offset=message.barometer_msg.tz_offset,
-            date=datetime.fromtimestamp(message.barometer_msg.ts),
-            sensor_data_structure_id=f"{message.barometer_msg.sensor_type}_{message.barometer_msg.data_structure_type}",
-            pressure_last=message.barometer_msg.pressure_last,
-            bar_trend_3_hr=message.barometer_msg.bar_trend_3_hr
+# Keeps the widest table (davis_gatewayquectel) under asyncpg's 32767 bind parameters per statement
+DAVIS_BULK_CHUNK_SIZE = 500
+
+
+def sensor_row_values(sensor_msg: BaseModel, sensor_id: uuid.UUID) -> dict:
+    """
+    Column values of a Davis sensor table row. The sensor messages use the column names
+    of their table, apart from sensor_type/data_structure_type which make up the data structure id.
+    """
+    values = sensor_msg.model_dump(exclude={"sensor_type", "data_structure_type"})
+    values.update(
+        id=sensor_id,
+        date=datetime.fromtimestamp(sensor_msg.ts),
+        sensor_data_structure_id=f"{sensor_msg.sensor_type}_{sensor_msg.data_structure_type}",
+    )
+    return values
+
+
+def _insert_if_new_observation(model, values: dict, vantage_cte, name: str):
+    """INSERT ... SELECT of literal values, run only when the VantagePro2 row was inserted."""
+    table = model.__table__
+    row = select(*[literal(value, type_=table.c[key].type) for key, value in values.items()]) \
+        .where(exists(select(vantage_cte.c.id)))
+    return (
+        insert(model)
+        .from_select(list(values), row)
+        .on_conflict_do_nothing(index_elements=[model.ts])
+        .returning(model.id)
+        .cte(name)
+    )
+
+
+def _inserted_or_existing_id(model, new_cte, ts: int):
+    # The statement snapshot doesn't see rows inserted by its own CTEs, hence the two lookups
+    return func.coalesce(
+        select(new_cte.c.id).scalar_subquery(),
+        select(model.id).where(model.ts == ts).limit(1).scalar_subquery(),
+    )
+
+
+def davis_observation_statement(message: DavisMessage):
+    """
+    Single INSERT statement that writes one Davis observation.
+    The VantagePro2 insert is deduplicated on ts by the database; when it conflicts nothing else
+    is written and the statement returns no row. Barometer and gateway rows reuse the existing
+    row of the same ts if there is one; a missing one leaves the station row's link NULL.
+    """
+    vantage_id, barometer_id, gateway_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+
+    new_vantage = (
+        insert(DavisVantagePro2)
+        .values(**sensor_row_values(message.vantagePro_msg, vantage_id))
+        .on_conflict_do_nothing(index_elements=[DavisVantagePro2.ts])
+        .returning(DavisVantagePro2.id)
+        .cte("new_vantagepro2")
+    )
+    sensor_ids = []
+    for model, sensor_msg, sensor_id, name in (
+        (DavisBarometer, message.barometer_msg, barometer_id, "new_barometer"),
+        (DavisGatewayQuectel, message.gateway_msg, gateway_id, "new_gateway"),
+    ):
+        if sensor_msg is None:
+            sensor_ids.append(literal(None, type_=DavisStation.id.type))
+            continue
+        new_row = _insert_if_new_observation(model, sensor_row_values(sensor_msg, sensor_id), new_vantage, name)
+        sensor_ids.append(_inserted_or_existing_id(model, new_row, sensor_msg.ts))
+
+    station_row = select(
+        literal(uuid.uuid4(), type_=DavisStation.id.type),
+        literal(message.station_id, type_=DavisStation.station_id.type),
+        literal(message.station_id_uuid, type_=DavisStation.station_id_uuid.type),
+        *sensor_ids,
+        new_vantage.c.id,
+    )
+    return (
+        insert(DavisStation)
+        .from_select(
+            ["id", "station_id", "station_id_uuid",
+             "barometer_reading", "gatewayquectel_reading", "vantagepro2_reading"],
+            station_row,
         )
-
-        new_station = DavisStation(
+        .returning(DavisStation.id)
+    )
+
+
+def _rollup_key(message: DavisMessage) -> Tuple[int, datetime]:
+    # Rollup hours are in UTC, unlike the VantagePro2 date column
+    return message.station_id, datetime.fromtimestamp(message.vantagePro_msg.ts, timezone.utc).replace(tzinfo=None)
+
+
+async def create_davis_sensors(db: AsyncSession, message: DavisMessage) -> Optional[uuid.UUID]:
+    """
+    Writes the VantagePro2, barometer, gateway and station rows of one observation
+    in one round trip and one transaction.
+
+    :return: id of the new station row, None if the observation was already inserted
+    """
+    try:
+        result = await db.execute(davis_observation_statement(message))
+        station_id = result.scalar_one_or_none()
+        if station_id is not None and settings.ROLLUPS_ENABLED:
+            await mark_rollups_dirty(db, "davis", [_rollup_key(message)])
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.error("".join(traceback.format_exception(None, e, e.__traceback__)))
+        logger.error(f"Error during Davis insert: {e}")
+        raise e
+
+    return station_id
+
+
+async def _insert_sensor_rows(db: AsyncSession, model, sensor_msgs: List[Optional[BaseModel]]) -> Dict[int, uuid.UUID]:
+    """
+    Inserts the sensor rows that don't exist yet and returns the id of the row for every ts,
+    whether it was inserted now or already there. None messages (no aligned record) are skipped.
+    """
+    by_ts = {}
+    for sensor_msg in sensor_msgs:
+        if sensor_msg is not None:
+            by_ts.setdefault(sensor_msg.ts, sensor_msg)
+    if not by_ts:
+        return {}
+
+    await db.execute(
+        insert(model)
+        .values([sensor_row_values(sensor_msg, uuid.uuid4()) for sensor_msg in by_ts.values()])
+        .on_conflict_do_nothing(index_elements=[model.ts])
+    )
+    result = await db.execute(select(model.id, model.ts).where(model.ts.in_(list(by_ts))))
+    return {ts: row_id for row_id, ts in result.all()}
+
+
+async def _bulk_create_chunk(db: AsyncSession, messages: List[DavisMessage]) -> int:
+    by_ts = {}
+    for message in messages:
+        by_ts.setdefault(message.vantagePro_msg.ts, message)
+
+    result = await db.execute(
+        insert(DavisVantagePro2)
+        .values([sensor_row_values(message.vantagePro_msg, uuid.uuid4()) for message in by_ts.values()])
+        .on_conflict_do_nothing(index_elements=[DavisVantagePro2.ts])
+        .returning(DavisVantagePro2.id, DavisVantagePro2.ts)
+    )
+    vantage_ids = {ts: row_id for row_id, ts in result.all()}
+    if not vantage_ids:
+        return 0
+
+    new_messages = [by_ts[ts] for ts in vantage_ids]
+    barometer_ids = await _insert_sensor_rows(db, DavisBarometer, [m.barometer_msg for m in new_messages])
+    gateway_ids = await _insert_sensor_rows(db, DavisGatewayQuectel, [m.gateway_msg for m in new_messages])
+
+    await db.execute(insert(DavisStation).values([
+        dict(
+            id=uuid.uuid4(),
             station_id=message.station_id,
             station_id_uuid=message.station_id_uuid,
-
-            barometer_reading=barometer_id,
-            gatewayquectel_reading=gateway_id,
-            vantagepro2_reading=vantage_id,
+            barometer_reading=barometer_ids.get(message.barometer_msg.ts) if message.barometer_msg else None,
+            gatewayquectel_reading=gateway_ids.get(message.gateway_msg.ts) if message.gateway_msg else None,
+            vantagepro2_reading=vantage_ids[message.vantagePro_msg.ts],
         )
+        for message in new_messages
+    ]))
+    if settings.ROLLUPS_ENABLED:
+        await mark_rollups_dirty(db, "davis", [_rollup_key(message) for message in new_messages])
+    return len(new_messages)
+
+
+async def bulk_create_davis_sensors(db: AsyncSession, messages: List[DavisMessage]) -> int:
+    """
+    Multi-row version of create_davis_sensors for backfills: a handful of statements per
+    DAVIS_BULK_CHUNK_SIZE observations instead of one per observation, all in one transaction.
+    Observations whose VantagePro2 ts already exists are skipped.
+
+    :return: number of observations inserted
+    """
+    inserted = 0
+    try:
+        for start in range(0, len(messages), DAVIS_BULK_CHUNK_SIZE):
+            inserted += await _bulk_create_chunk(db, messages[start:start + DAVIS_BULK_CHUNK_SIZE])
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.error("".join(traceback.format_exception(None, e, e.__traceback__)))
+        logger.error(f"Error during Davis bulk insert: {e}")
+        raise e
+
+    return inserted
+
+
+_TABLE_COLUMNS_SQL = text("SELECT column_name FROM information_schema.columns WHERE table_name = :table_name")
+
+
+async def backfill_window_table_ready(db: AsyncSession) -> bool:
+    """
+    Whether davis_backfill_window exists with every column of DavisBackfillWindow. The table is
+    optional: without it, backfills run without recording or skipping completed windows.
+    """
+    table = DavisBackfillWindow.__table__
+    result = await db.execute(_TABLE_COLUMNS_SQL, {"table_name": table.name})
+    return set(table.columns.keys()) <= set(result.scalars().all())
+
+
+async def get_completed_backfill_windows(db: AsyncSession, start_ts: int, end_ts: int) -> List[Tuple[int, int]]:
+    """Completed windows overlapping [start_ts, end_ts), ordered by start."""
+    result = await db.execute(
+        select(DavisBackfillWindow.start_ts, DavisBackfillWindow.end_ts)
+        .where(DavisBackfillWindow.start_ts < end_ts, DavisBackfillWindow.end_ts > start_ts)
+        .order_by(DavisBackfillWindow.start_ts)
+    )
+    return [(start, end) for start, end in result.all()]
+
+
+async def mark_backfill_window_completed(db: AsyncSession, start_ts: int, end_ts: int, counts: dict):
+    """
+    :param counts: the counts of ingest_davis_historic: rows inserted and samples stored without a
+        gateway or barometer match
+    """
+    await db.execute(
+        insert(DavisBackfillWindow)
+        .values(start_ts=start_ts, end_ts=end_ts, rows_inserted=counts["inserted"],
+                missing_gateway=counts["missing_gateway"], missing_barometer=counts["missing_barometer"])
+        .on_conflict_do_nothing(index_elements=[DavisBackfillWindow.start_ts, DavisBackfillWindow.end_ts])
+    )
+    await db.commit()
 
-        db.add(new_vantagePro)
-        db.add(new_barometer)
-        try:
-            await db.commit()
-            await db.refresh(new_vantagePro)
-            if not gateway_existing:
-                await db.refresh(new_gateway)
-            await db.refresh(new_barometer)
-        except Exception as e:
-            logger.error(e)
-            raise e
-        try:
-            db.add(new_station)
-            await db.commit()
-        except Exception as e:
-            logger.error("".join(traceback.format_exception(None, e, e.__traceback__)))
-            logger.error(f"Error during Davis scheduled task: {e}")
-            raise e
-
-        await db.refresh(new_station)
-
-        return new_station
-    else:
-        return None
-
-
-async def check_existing_ts(db: AsyncSession, message: DavisMessage):
-    result_vantage = await db.execute(select(DavisVantagePro2).filter(DavisVantagePro2.ts == message.vantagePro_msg.ts))
-    result_baro = await db.execute(select(DavisBarometer).filter(DavisBarometer.ts == message.barometer_msg.ts))
-    existing_vantage = result_vantage.scalars().first()
-    existing_baro = result_baro.scalars().first()
-
-    if existing_vantage or existing_baro:
-        print("Record with the same timestamp already exists. Skipping insertion.")
-        return False
-    else:
-        return True
-
-async def get_existing_gateway(db: AsyncSession, message: DavisMessage) -> Optional[DavisGatewayQuectel]:
-    result = await db.execute(select(DavisGatewayQuectel).filter(DavisGatewayQuectel.ts == message.gateway_msg.ts))
-    existing_entry = result.scalars().first()
-
-    if existing_entry:
-        logger.info(f"Gateway exists, using existing Gateway entry with id: {existing_entry.id}")
-        return existing_entry
-    else:
-        return None
\ No newline at end of file
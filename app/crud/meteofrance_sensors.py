@@ -1,19 +1,91 @@
-from typing import List
+from datetime import datetime
+from typing import Dict, List, Tuple
 
+from sqlalchemy import literal_column
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
+from app.crud.rollups import mark_rollups_dirty
 from app.meteofrance.schemas import MeteoFranceInfrahoraireMessage
 from app.models.models import MeteoFranceData
-from app.logs.config_server_logs import server_logger as logger
-
-async def create_meteofrance_sensor(db: AsyncSession, message: List[MeteoFranceInfrahoraireMessage]):
-    for data in message:
-        meteo_france_data: MeteoFranceData = MeteoFranceData.from_dict(data.model_dump())
-        db.add(meteo_france_data)
-    try:
-        await db.commit()
-        await db.refresh(meteo_france_data)
-    except Exception as e:
-        logger.error(e)
-        raise e
-    return {"message": "Weather data uploaded successfully", "geo_id_insee": meteo_france_data.geo_id_insee}
\ No newline at end of file
+
+# 25 columns per row, well under the 32767 bind parameters of a statement
+BULK_INSERT_CHUNK_SIZE = 1000
+
+_CONFLICT_KEY = [MeteoFranceData.geo_id_insee, MeteoFranceData.reference_time]
+# Everything but the key and the row's own creation time
+_UPDATE_COLUMNS = [
+    column.name for column in MeteoFranceData.__table__.columns
+    if column.name not in ("geo_id_insee", "reference_time", "created_at")
+]
+
+
+def _naive(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=None) if dt is not None and dt.tzinfo else dt
+
+
+def meteofrance_row_values(data: MeteoFranceInfrahoraireMessage) -> dict:
+    """Column values of a reading, with naive datetimes like MeteoFranceData.from_dict."""
+    values = data.model_dump()
+    for key in ("reference_time", "insert_time", "validity_time"):
+        values[key] = _naive(values[key])
+    return values
+
+
+def _unique_rows(messages: List[MeteoFranceInfrahoraireMessage]) -> List[dict]:
+    """
+    One row per (geo_id_insee, reference_time), keeping the latest insert_time.
+    ON CONFLICT DO UPDATE cannot touch the same row twice in one statement.
+    """
+    rows: Dict[Tuple[str, datetime], dict] = {}
+    for data in messages:
+        values = meteofrance_row_values(data)
+        key = (values["geo_id_insee"], values["reference_time"])
+        current = rows.get(key)
+        if current is None or (values["insert_time"] or datetime.min) > (current["insert_time"] or datetime.min):
+            rows[key] = values
+    return list(rows.values())
+
+
+async def bulk_upsert_meteofrance(db: AsyncSession, messages: List[MeteoFranceInfrahoraireMessage],
+                                  update: bool = False) -> dict:
+    """
+    Writes readings of any number of stations with multi-row INSERT ... ON CONFLICT statements
+    keyed on (geo_id_insee, reference_time), so overlapping or repeated polls are harmless.
+
+    :param db:
+    :param messages:
+    :param update: overwrite an existing observation when MeteoFrance republished it with a newer
+        insert_time, instead of keeping the first version
+    :return: inserted, updated and duplicate row counts
+    """
+    rows = _unique_rows(messages)
+    inserted = updated = 0
+    for start in range(0, len(rows), BULK_INSERT_CHUNK_SIZE):
+        stmt = insert(MeteoFranceData).values(rows[start:start + BULK_INSERT_CHUNK_SIZE])
+        if update:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=_CONFLICT_KEY,
+                set_={column: stmt.excluded[column] for column in _UPDATE_COLUMNS},
+                where=stmt.excluded.insert_time > MeteoFranceData.insert_time,
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=_CONFLICT_KEY)
+        # xmax is 0 only for freshly inserted tuples, which tells inserts from updates apart
+        result = await db.execute(stmt.returning(
+            literal_column("xmax = 0"), MeteoFranceData.geo_id_insee, MeteoFranceData.reference_time
+        ))
+        written = result.all()
+        chunk_inserted = sum(1 for is_insert, _, _ in written if is_insert)
+        inserted += chunk_inserted
+        updated += len(written) - chunk_inserted
+        if settings.ROLLUPS_ENABLED:
+            await mark_rollups_dirty(db, "meteofrance", [(station, time) for _, station, time in written])
+    await db.commit()
+    return {
+        "received": len(messages),
+        "inserted": inserted,
+        "updated": updated,
+        "duplicates": len(messages) - inserted - updated,
+    }
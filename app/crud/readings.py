@@ -0,0 +1,79 @@
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Union
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.readings.buckets import Bucket, aggregate_expressions, rollup_aggregate_expressions
+from app.readings.sources import ReadingSource
+
+# Rows fetched per round trip from the server-side cursor when streaming
+STREAM_BATCH_SIZE = 1000
+
+
+def readings_query(source: ReadingSource, station: str, start: datetime, end: datetime,
+                   after: Optional[Union[datetime, int]] = None) -> Select:
+    """
+    Readings of one station in [start, end), ordered by time. `after` is the keyset cursor:
+    the keyset value (see ReadingSource.keyset) of the last row already returned.
+    """
+    stmt = (
+        select(*source.columns)
+        .where(source.station_filter(station), *source.time_range(start, end))
+        .order_by(source.keyset)
+    )
+    if after is not None:
+        stmt = stmt.where(source.keyset > after)
+    return stmt
+
+
+async def get_readings_page(db: AsyncSession, source: ReadingSource, station: str, start: datetime,
+                            end: datetime, limit: int, after: Optional[Union[datetime, int]] = None) -> List[dict]:
+    result = await db.execute(readings_query(source, station, start, end, after).limit(limit))
+    return [dict(row) for row in result.mappings()]
+
+
+async def stream_readings(db: AsyncSession, source: ReadingSource, station: str, start: datetime,
+                          end: datetime) -> AsyncIterator[List[dict]]:
+    """
+    Yields the readings in batches from a server-side cursor, so memory stays constant
+    whatever the size of the range.
+    """
+    stmt = readings_query(source, station, start, end).execution_options(yield_per=STREAM_BATCH_SIZE)
+    result = await db.stream(stmt)
+    async for partition in result.mappings().partitions():
+        yield [dict(row) for row in partition]
+
+
+async def get_bucket_aggregates(db: AsyncSession, source: ReadingSource, station: str, metric: str,
+                                bucket: Bucket, aggregates, start: datetime, end: datetime) -> List[dict]:
+    """
+    Aggregates of one metric per time bucket, computed by the database. Buckets without
+    readings are not returned.
+    """
+    bucket_start = bucket.expression(source.utc_time).label("bucket")
+    metric_column = source.model.__table__.columns[metric]
+    stmt = (
+        select(bucket_start, *aggregate_expressions(metric_column, aggregates))
+        .where(source.station_filter(station), *source.time_range(start, end))
+        .group_by(bucket_start)
+        .order_by(bucket_start)
+    )
+    result = await db.execute(stmt)
+    return [dict(row) for row in result.mappings()]
+
+
+async def get_rollup_aggregates(db: AsyncSession, model, name: str, source: ReadingSource, station: str,
+                                metric: str, bucket: Bucket, aggregates, start: datetime, end: datetime) -> List[dict]:
+    """Same as get_bucket_aggregates, from a rollup table (ReadingRollupHourly or ReadingRollupDaily)."""
+    bucket_start = bucket.expression(model.bucket).label("bucket")
+    metric_type = source.model.__table__.columns[metric].type
+    stmt = (
+        select(bucket_start, *rollup_aggregate_expressions(model, aggregates, metric_type))
+        .where(model.source == name, model.station == station, model.metric == metric,
+               model.bucket >= start, model.bucket < end)
+        .group_by(bucket_start)
+        .order_by(bucket_start)
+    )
+    result = await db.execute(stmt)
+    return [dict(row) for row in result.mappings()]
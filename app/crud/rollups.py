@@ -0,0 +1,180 @@
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import Float, cast, delete, func, literal, or_, select, true, tuple_
+from sqlalchemy.dialects.postgresql import array, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import ReadingRollupDaily, ReadingRollupDirty, ReadingRollupHourly, ReadingRollupRebuild
+from app.readings.buckets import Bucket
+from app.readings.sources import ReadingSource
+
+# 3 columns per row, well under the 32767 bind parameters of a statement
+DIRTY_INSERT_CHUNK_SIZE = 5000
+
+HOUR = Bucket(spec="hour", unit="hour")
+DAY = Bucket(spec="day", unit="day")
+
+_DIRTY_KEY = [ReadingRollupDirty.source, ReadingRollupDirty.station, ReadingRollupDirty.bucket]
+_ROLLUP_COLUMNS = ["source", "station", "metric", "bucket", "min", "max", "sum", "count"]
+
+
+def hour_of(timestamp: datetime) -> datetime:
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+async def mark_rollups_dirty(db: AsyncSession, source: str, readings: Iterable[Tuple[str, datetime]]):
+    """
+    Records the hours touched by a write so that their rollups get recomputed. Runs in the
+    caller's transaction and does not commit: the marks are committed with the readings.
+
+    :param db:
+    :param source: name of the source in app.readings.sources.SOURCES
+    :param readings: (station, timestamp) of the readings written
+    """
+    rows = [
+        dict(source=source, station=str(station), bucket=hour)
+        for station, hour in {(station, hour_of(timestamp)) for station, timestamp in readings if station is not None}
+    ]
+    for start in range(0, len(rows), DIRTY_INSERT_CHUNK_SIZE):
+        await db.execute(
+            insert(ReadingRollupDirty)
+            .values(rows[start:start + DIRTY_INSERT_CHUNK_SIZE])
+            .on_conflict_do_nothing(index_elements=_DIRTY_KEY)
+        )
+
+
+async def mark_range_dirty(db: AsyncSession, name: str, source: ReadingSource,
+                           start: Optional[datetime] = None, end: Optional[datetime] = None) -> int:
+    """
+    Marks every hour with readings in [start, end) as dirty, for all the stations of a source.
+
+    :return: number of hours marked
+    """
+    hour = HOUR.expression(source.utc_time)
+    hours = source.select_with_station(literal(name).label("source"), hour.label("bucket")).distinct()
+    hours = hours.where(*source.time_range(start, end))
+    result = await db.execute(
+        insert(ReadingRollupDirty)
+        .from_select(["station", "source", "bucket"], hours)
+        .on_conflict_do_nothing(index_elements=_DIRTY_KEY)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def count_dirty_hours(db: AsyncSession, source: Optional[str] = None, station: Optional[str] = None,
+                            start: Optional[datetime] = None, end: Optional[datetime] = None) -> int:
+    """Dirty hours waiting for a refresh, all of them or those of one station in [start, end)."""
+    stmt = select(func.count()).select_from(ReadingRollupDirty)
+    if source is not None:
+        stmt = stmt.where(ReadingRollupDirty.source == source)
+    if station is not None:
+        stmt = stmt.where(ReadingRollupDirty.station == station)
+    if start is not None:
+        stmt = stmt.where(ReadingRollupDirty.bucket >= hour_of(start))
+    if end is not None:
+        stmt = stmt.where(ReadingRollupDirty.bucket < end)
+    return (await db.execute(stmt)).scalar_one()
+
+
+async def record_rebuild(db: AsyncSession, job_id, sources: List[str], start: Optional[datetime],
+                         end: Optional[datetime], finished_at: datetime):
+    """Records a rebuild that ran to completion, once per source."""
+    await db.execute(insert(ReadingRollupRebuild).values([
+        dict(job_id=job_id, source=source, start_time=start, end_time=end, finished_at=finished_at)
+        for source in sources
+    ]))
+    await db.commit()
+
+
+async def last_rebuild_covering(db: AsyncSession, source: str, start: datetime, end: datetime) -> Optional[datetime]:
+    """
+    When the last completed rebuild of `source` spanning [start, end) finished, None if no rebuild
+    covers the range: its rollups may then be missing the readings written before rollups were kept.
+    """
+    rebuild = ReadingRollupRebuild
+    stmt = select(func.max(rebuild.finished_at)).where(
+        rebuild.source == source,
+        or_(rebuild.start_time.is_(None), rebuild.start_time <= start),
+        or_(rebuild.end_time.is_(None), rebuild.end_time >= end),
+    )
+    return (await db.execute(stmt)).scalar_one()
+
+
+async def take_dirty_hours(db: AsyncSession, limit: int) -> List[Tuple[str, str, datetime]]:
+    """
+    Removes up to `limit` dirty hours and returns them, oldest first. The rows stay locked until the
+    transaction ends, so concurrent refreshes skip them, and a rollback puts them back.
+    """
+    claimed = (
+        select(*_DIRTY_KEY)
+        .order_by(ReadingRollupDirty.bucket)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        delete(ReadingRollupDirty)
+        .where(tuple_(*_DIRTY_KEY).in_(claimed))
+        .returning(*_DIRTY_KEY)
+    )
+    return sorted(result.all(), key=lambda row: row[2])
+
+
+def _bucket_range(bucket_column, expression, buckets: List[datetime], width: timedelta):
+    # The range lets the time index narrow the scan, the list skips the clean buckets inside it
+    return bucket_column >= min(buckets), bucket_column < max(buckets) + width, expression.in_(buckets)
+
+
+async def refresh_hourly_rollups(db: AsyncSession, name: str, source: ReadingSource, station: str,
+                                 hours: List[datetime]):
+    """
+    Recomputes the hourly rollups of every metric of one station for the given hours, from the raw
+    readings, in a single scan: the metric columns are unpivoted with unnest. Does not commit.
+    """
+    metrics = source.metrics
+    table = source.model.__table__
+    unpivoted = (
+        func.unnest(array([literal(metric) for metric in metrics]),
+                    array([cast(table.columns[metric], Float) for metric in metrics]))
+        .table_valued("metric", "value")
+        .render_derived(name="metric_values")
+    )
+    hour = HOUR.expression(source.utc_time)
+    rows = (
+        select(
+            literal(name), literal(station), unpivoted.c.metric, hour,
+            func.min(unpivoted.c.value), func.max(unpivoted.c.value),
+            func.sum(unpivoted.c.value), func.count(unpivoted.c.value),
+        )
+        .select_from(source.model)
+        .join(unpivoted, true())
+        .where(source.station_filter(station), unpivoted.c.value.is_not(None),
+               *source.time_range(min(hours), max(hours) + timedelta(hours=1)), hour.in_(hours))
+        .group_by(unpivoted.c.metric, hour)
+    )
+    await _replace_rollups(db, ReadingRollupHourly, name, station, hours, rows)
+
+
+async def refresh_daily_rollups(db: AsyncSession, name: str, station: str, days: List[datetime]):
+    """Recomputes the daily rollups of one station for the given days from its hourly rollups. Does not commit."""
+    hourly = ReadingRollupHourly
+    day = DAY.expression(hourly.bucket)
+    rows = (
+        select(
+            hourly.source, hourly.station, hourly.metric, day,
+            func.min(hourly.min), func.max(hourly.max), func.sum(hourly.sum), func.sum(hourly.count),
+        )
+        .where(hourly.source == name, hourly.station == station,
+               *_bucket_range(hourly.bucket, day, days, timedelta(days=1)))
+        .group_by(hourly.source, hourly.station, hourly.metric, day)
+    )
+    await _replace_rollups(db, ReadingRollupDaily, name, station, days, rows)
+
+
+async def _replace_rollups(db: AsyncSession, model, name: str, station: str, buckets: List[datetime], rows):
+    # Delete then insert rather than upsert, so metrics that have no value anymore don't keep a stale row
+    await db.execute(
+        delete(model).where(model.source == name, model.station == station, model.bucket.in_(buckets))
+    )
+    await db.execute(insert(model).from_select(_ROLLUP_COLUMNS, rows))
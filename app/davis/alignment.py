@@ -0,0 +1,75 @@
+from typing import List, NamedTuple, Optional
+
+# Largest gap (seconds) between a VantagePro2 sample and the barometer sample paired with it
+BAROMETER_TOLERANCE_S = 300
+
+
+class AlignedSample(NamedTuple):
+    vantagepro2: dict
+    gateway: Optional[dict]
+    barometer: Optional[dict]
+
+
+class AlignmentResult(NamedTuple):
+    samples: List[AlignedSample]
+    missing_gateway: int
+    missing_barometer: int
+
+
+def _sorted_by_ts(records: Optional[List[dict]]) -> List[dict]:
+    return sorted((r for r in records or [] if r.get("ts") is not None), key=lambda r: r["ts"])
+
+
+def align_historic_sensors(vantagepro2_list: List[dict], gateway_list: List[dict], barometer_list: List[dict],
+                           barometer_tolerance: int = BAROMETER_TOLERANCE_S) -> AlignmentResult:
+    """
+    Joins the three sensor streams of a Davis historic response on ts with a single forward pass
+    over each sorted list (merge join), in O(n + m + k) after sorting.
+
+    - gateway: health records are sparse, so a sample takes the latest gateway record at or before
+      its ts, or the first one when the sample is older than every gateway record.
+    - barometer: a sample takes the barometer record closest to its ts, as long as it is at most
+      `barometer_tolerance` seconds away.
+
+    The VantagePro2 record is the observation: a sample without a gateway or barometer match is kept
+    with None in its place, and counted, instead of being paired with an unrelated record.
+
+    :param vantagepro2_list:
+    :param gateway_list:
+    :param barometer_list:
+    :param barometer_tolerance:
+    :return:
+    """
+    vantages = _sorted_by_ts(vantagepro2_list)
+    gateways = _sorted_by_ts(gateway_list)
+    barometers = _sorted_by_ts(barometer_list)
+
+    samples = []
+    missing_gateway = missing_barometer = 0
+    g = b = 0
+
+    for vantage in vantages:
+        ts = vantage["ts"]
+
+        gateway = None
+        if gateways:
+            while g + 1 < len(gateways) and gateways[g + 1]["ts"] <= ts:
+                g += 1
+            gateway = gateways[g]
+        else:
+            missing_gateway += 1
+
+        # b ends on the last barometer record at or before ts; b + 1 is the first one after it
+        while b + 1 < len(barometers) and barometers[b + 1]["ts"] <= ts:
+            b += 1
+        barometer = None
+        for candidate in barometers[b:b + 2]:
+            gap = abs(candidate["ts"] - ts)
+            if gap <= barometer_tolerance and (barometer is None or gap < abs(barometer["ts"] - ts)):
+                barometer = candidate
+        if barometer is None:
+            missing_barometer += 1
+
+        samples.append(AlignedSample(vantage, gateway, barometer))
+
+    return AlignmentResult(samples, missing_gateway, missing_barometer)
@@ -0,0 +1,170 @@
+import asyncio
+import time
+import traceback
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+import app.crud.davis_sensors as db_service
+import app.davis.service as davis_service
+from app.config import settings
+from app.db.session import AsyncSessionLocal
+from app.http_clients import get_http_client, DAVIS
+from app.logs.config_server_logs import server_logger
+
+# The historic API refuses ranges longer than 24 hours
+WINDOW_SECONDS = 86400
+
+
+def split_windows(start_time: int, end_time: int, window: int = WINDOW_SECONDS) -> List[Tuple[int, int]]:
+    """
+    Splits [start_time, end_time) on fixed `window` boundaries (UTC days), so that jobs over
+    different ranges produce the same windows and can resume each other's work. Only the first
+    and last windows can be partial.
+    """
+    boundaries = range((start_time // window + 1) * window, end_time, window)
+    starts = [start_time, *boundaries]
+    return list(zip(starts, [*boundaries, end_time]))
+
+
+def is_covered(start: int, end: int, completed: List[Tuple[int, int]]) -> bool:
+    """
+    Whether [start, end) is covered by the union of the completed windows, sorted by start. Windows
+    recorded by older jobs need not be aligned with the current ones.
+    """
+    for completed_start, completed_end in completed:
+        if completed_start > start:
+            return False
+        if completed_end > start:
+            start = completed_end
+            if start >= end:
+                return True
+    return False
+
+
+class BackfillJob:
+    """Progress of a windowed historic backfill; jobs live in process memory only."""
+
+    def __init__(self, start_time: int, end_time: int):
+        self.job_id = str(uuid.uuid4())
+        self.start_time = start_time
+        self.end_time = end_time
+        self.windows = split_windows(start_time, end_time)
+        self.state = "pending"
+        self.windows_done = 0
+        self.windows_skipped = 0
+        self.windows_failed = 0
+        self.rows_inserted = 0
+        self.missing_gateway = 0
+        self.missing_barometer = 0
+        # Whether completed windows are skipped and recorded, see backfill_window_table_ready
+        self.resume_tracking: Optional[bool] = None
+        self.errors: List[str] = []
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._started_monotonic: Optional[float] = None
+        self._finished_monotonic: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def status(self) -> dict:
+        elapsed = 0.0
+        if self._started_monotonic is not None:
+            elapsed = (self._finished_monotonic or time.monotonic()) - self._started_monotonic
+        return {
+            "job_id": self.job_id,
+            "status": self.state,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "windows_total": len(self.windows),
+            "windows_done": self.windows_done,
+            "windows_skipped": self.windows_skipped,
+            "windows_failed": self.windows_failed,
+            "resume_tracking": self.resume_tracking,
+            "rows_inserted": self.rows_inserted,
+            "missing_gateway": self.missing_gateway,
+            "missing_barometer": self.missing_barometer,
+            "rows_per_sec": round(self.rows_inserted / elapsed, 2) if elapsed > 0 else 0.0,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "errors": self.errors,
+        }
+
+
+_jobs: Dict[str, BackfillJob] = {}
+
+
+def get_backfill_job(job_id: str) -> Optional[BackfillJob]:
+    return _jobs.get(job_id)
+
+
+def start_backfill_job(start_time: int, end_time: int) -> BackfillJob:
+    job = BackfillJob(start_time, end_time)
+    _jobs[job.job_id] = job
+    job.task = asyncio.create_task(run_backfill_job(job), name=f"davis-backfill-{job.job_id}")
+    server_logger.info(f"DAVIS -- Backfill job {job.job_id} started for {len(job.windows)} windows "
+                       f"[{start_time}, {end_time}).")
+    return job
+
+
+async def run_backfill_job(job: BackfillJob):
+    job.state = "running"
+    job.started_at = datetime.now()
+    job._started_monotonic = time.monotonic()
+
+    try:
+        async with AsyncSessionLocal() as db:
+            job.resume_tracking = await db_service.backfill_window_table_ready(db)
+            completed = []
+            if job.resume_tracking:
+                completed = await db_service.get_completed_backfill_windows(db, job.start_time, job.end_time)
+        if not job.resume_tracking:
+            server_logger.warning("DAVIS -- davis_backfill_window is missing or lacks columns (see "
+                                  "DavisBackfillWindow): every window is fetched and none is recorded.")
+
+        semaphore = asyncio.Semaphore(settings.DAVIS_BACKFILL_CONCURRENCY)
+        client = get_http_client(DAVIS)
+        await asyncio.gather(*[
+            _run_window(job, client, semaphore, start, end, completed)
+            for start, end in job.windows
+        ])
+        job.state = "failed" if job.windows_failed else "completed"
+    except Exception as e:
+        server_logger.error("".join(traceback.format_exception(None, e, e.__traceback__)))
+        job.errors.append(str(e))
+        job.state = "failed"
+    finally:
+        job._finished_monotonic = time.monotonic()
+        job.finished_at = datetime.now()
+    server_logger.info(f"DAVIS -- Backfill job {job.job_id} {job.state}: {job.status()}")
+
+
+async def _run_window(job: BackfillJob, client: httpx.AsyncClient, semaphore: asyncio.Semaphore,
+                      start: int, end: int, completed: List[Tuple[int, int]]):
+    if is_covered(start, end, completed):
+        job.windows_skipped += 1
+        return
+
+    async with semaphore:
+        for attempt in range(1, settings.DAVIS_BACKFILL_RETRIES + 1):
+            try:
+                response_data = await davis_service.fetch_davis_historic(client, start, end)
+                async with AsyncSessionLocal() as db:
+                    counts = await davis_service.ingest_davis_historic(db, response_data)
+                    # Only past windows are final; a window reaching into the future is fetched again next time
+                    if job.resume_tracking and end <= time.time():
+                        await db_service.mark_backfill_window_completed(db, start, end, counts)
+                job.rows_inserted += counts["inserted"]
+                job.missing_gateway += counts["missing_gateway"]
+                job.missing_barometer += counts["missing_barometer"]
+                job.windows_done += 1
+                return
+            except Exception as e:
+                server_logger.error(f"DAVIS -- Backfill window [{start}, {end}) attempt {attempt} failed: {e}")
+                if attempt == settings.DAVIS_BACKFILL_RETRIES:
+                    server_logger.error("".join(traceback.format_exception(None, e, e.__traceback__)))
+                    job.windows_failed += 1
+                    job.errors.append(f"[{start}, {end}): {e}")
+                    return
+                await asyncio.sleep(2 ** attempt)
@@ -0,0 +1,204 @@
+"""
+Unit conversions used by the Davis parsers, in plain arithmetic instead of pint quantities.
+
+The constants reproduce pint's own conversion factors, so results are bit-for-bit equal to the
+former `(value * units.x).to(units.y).magnitude` calls, including the rounding rules.
+Each scalar function has a NumPy `*_array` counterpart that converts a whole column at once
+and returns a list with the same values (None where the scalar version returns None).
+"""
+from functools import partial
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+# pint: degF -> K is value * scale + offset, K -> degC is value - 273.15
+_DEGF_SCALE = 0.5555555555555556
+_DEGF_OFFSET = 255.37222222222223
+_DEGC_OFFSET = 273.15
+
+INHG_TO_MMHG_FACTOR = 25.4
+MPH_TO_KMH_FACTOR = 1.609344
+INCH_TO_MM_FACTOR = 25.4
+
+COMPASS_ANGLES = {
+    "N": 0, "NNE": 22.5, "NE": 45, "ENE": 67.5,
+    "E": 90, "ESE": 112.5, "SE": 135, "SSE": 157.5,
+    "S": 180, "SSW": 202.5, "SW": 225, "WSW": 247.5,
+    "W": 270, "WNW": 292.5, "NW": 315, "NNW": 337.5,
+}
+# Rounded once here, with the same (half to even) rule as round() on the metpy result
+_ROUNDED_COMPASS_ANGLES = {direction: round(angle) for direction, angle in COMPASS_ANGLES.items()}
+
+# WeatherLink wind direction codes, 0 = N to 15 = NNW
+DIRECTION_CODES = {code: direction for code, direction in enumerate(COMPASS_ANGLES)}
+
+
+def inhg_to_mmhg(pressure_in: Optional[float], to_round: bool = False) -> Optional[float]:
+    """
+    Get pressure in inch - Hg and turn into mm - Hg
+    1 mmHg = 133.322 pascals (Pa)
+    1 inHg = 3386.39 pascals (Pa)
+    mmHg value x 133.322 Pa = inHg value x 3386.39 Pa
+    mmHg value = inHg value x 25.4
+
+    :param to_round:
+    :param pressure_in:
+    :return:
+    """
+    if pressure_in:
+        if to_round:
+            return round(float(pressure_in * INHG_TO_MMHG_FACTOR))
+        else:
+            return float(pressure_in * INHG_TO_MMHG_FACTOR)
+    else:
+        return None
+
+
+def fahrenheit_to_celsius(temperature_f: Optional[Union[float, int]], to_round: bool = False) -> Optional[Union[float, int]]:
+    """
+    Get temperature in Fahrenheit (°F) and
+    convert to Celsius (°C)
+    °C = (°F - 32) ÷ (9/5) or °C = (°F - 32) ÷ (1.8)
+
+    :param to_round:
+    :param temperature_f:
+    :return:
+    """
+    if temperature_f is None:
+        return None
+    celsius = (temperature_f * _DEGF_SCALE + _DEGF_OFFSET) - _DEGC_OFFSET
+    if to_round:
+        return round(celsius)
+    elif type(temperature_f) is float:
+        return float(celsius)
+    elif type(temperature_f) is int:
+        return round(celsius)
+
+
+def direction_to_angle(wind_dir_d: Optional[Union[str, int]]) -> Optional[int]:
+    """
+    Converts compass to degrees unit. Compass can be NNE, WSW, SSE etc.
+    Numbers are rounded to integer for consistency. If the value received is in integer,
+    the absolute number is uploaded. See COMPASS_ANGLES for the reference values.
+    Strings outside the 16 compass points fall back to metpy's parser.
+
+    :param wind_dir_d:
+    :return:
+    """
+    if type(wind_dir_d) is int:
+        return wind_dir_d
+    elif type(wind_dir_d) is str:
+        angle = _ROUNDED_COMPASS_ANGLES.get(wind_dir_d)
+        if angle is not None:
+            return angle
+        import metpy.calc as mpcalc
+        return round(mpcalc.parse_angle(wind_dir_d).magnitude)
+    if wind_dir_d is None:
+        return None
+
+
+def integer_to_angle(wind_dir: Optional[int]) -> Optional[int]:
+    """
+    Converts wind direction in WeatherLink format to regular angle value.
+
+    :param wind_dir:
+    :return:
+    """
+    if wind_dir is None:
+        return None
+    else:
+        return direction_to_angle(DIRECTION_CODES[wind_dir])
+
+
+def mph_to_kmh(mph_val: Optional[int]) -> Optional[int]:
+    """
+    Convert mph (miles per hour) to km/h (kilometers per hour)
+    1 mile per hour = 1.609344 kilometers per hour
+
+    :param mph_val:
+    :return:
+    """
+    if mph_val:
+        return round(mph_val * MPH_TO_KMH_FACTOR)
+    else:
+        return None
+
+
+def in_to_mm(in_val: Optional[float]) -> Optional[float]:
+    """
+    Convert inch to mm.
+
+    :param in_val:
+    :return:
+    """
+    if in_val:
+        return in_val * INCH_TO_MM_FACTOR
+    else:
+        return None
+
+
+def _to_array(values: Sequence, valid: List[bool]) -> np.ndarray:
+    return np.array([value if ok else np.nan for value, ok in zip(values, valid)], dtype=np.float64)
+
+
+def inhg_to_mmhg_array(values: Sequence[Optional[float]], to_round: bool = False) -> List[Optional[float]]:
+    valid = [bool(value) for value in values]
+    converted = _to_array(values, valid) * INHG_TO_MMHG_FACTOR
+    if to_round:
+        return [int(v) if ok else None for v, ok in zip(np.rint(converted), valid)]
+    return [float(v) if ok else None for v, ok in zip(converted, valid)]
+
+
+def fahrenheit_to_celsius_array(values: Sequence[Optional[Union[float, int]]],
+                                to_round: bool = False) -> List[Optional[Union[float, int]]]:
+    valid = [value is not None for value in values]
+    converted = (_to_array(values, valid) * _DEGF_SCALE + _DEGF_OFFSET) - _DEGC_OFFSET
+    rounded = np.rint(converted)
+    result = []
+    for value, celsius, celsius_rounded, ok in zip(values, converted, rounded, valid):
+        if not ok:
+            result.append(None)
+        elif to_round or type(value) is int:
+            result.append(int(celsius_rounded))
+        elif type(value) is float:
+            result.append(float(celsius))
+        else:
+            result.append(None)
+    return result
+
+
+def mph_to_kmh_array(values: Sequence[Optional[int]]) -> List[Optional[int]]:
+    valid = [bool(value) for value in values]
+    converted = np.rint(_to_array(values, valid) * MPH_TO_KMH_FACTOR)
+    return [int(v) if ok else None for v, ok in zip(converted, valid)]
+
+
+def in_to_mm_array(values: Sequence[Optional[float]]) -> List[Optional[float]]:
+    valid = [bool(value) for value in values]
+    converted = _to_array(values, valid) * INCH_TO_MM_FACTOR
+    return [float(v) if ok else None for v, ok in zip(converted, valid)]
+
+
+def integer_to_angle_array(values: Sequence[Optional[int]]) -> List[Optional[int]]:
+    return [integer_to_angle(value) for value in values]
+
+
+def direction_to_angle_array(values: Sequence[Optional[Union[str, int]]]) -> List[Optional[int]]:
+    return [direction_to_angle(value) for value in values]
+
+
+class Converter(NamedTuple):
+    """A conversion in its scalar and column (list in, list out) forms."""
+    scalar: Callable[[Any], Any]
+    column: Callable[[Sequence], List]
+
+
+INHG_TO_MMHG = Converter(inhg_to_mmhg, inhg_to_mmhg_array)
+INHG_TO_MMHG_ROUNDED = Converter(partial(inhg_to_mmhg, to_round=True), partial(inhg_to_mmhg_array, to_round=True))
+FAHRENHEIT_TO_CELSIUS = Converter(fahrenheit_to_celsius, fahrenheit_to_celsius_array)
+FAHRENHEIT_TO_CELSIUS_ROUNDED = Converter(partial(fahrenheit_to_celsius, to_round=True),
+                                          partial(fahrenheit_to_celsius_array, to_round=True))
+MPH_TO_KMH = Converter(mph_to_kmh, mph_to_kmh_array)
+IN_TO_MM = Converter(in_to_mm, in_to_mm_array)
+DIRECTION_TO_ANGLE = Converter(direction_to_angle, direction_to_angle_array)
+INTEGER_TO_ANGLE = Converter(integer_to_angle, integer_to_angle_array)
@@ -0,0 +1,224 @@
+"""
+Declarative mapping from WeatherLink API responses to the Davis message models.
+
+Each data structure type (current conditions, historic archive) is described by one
+SensorMapping per sensor block. A field entry is either a source key copied as is, or a
+(source key, Converter) pair. Mappings are compiled once at import; supporting a new sensor
+data structure means adding a mapping here.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Type, Union
+
+from pydantic import BaseModel
+
+from app.davis.conversions import Converter, INHG_TO_MMHG, INHG_TO_MMHG_ROUNDED, FAHRENHEIT_TO_CELSIUS, \
+    FAHRENHEIT_TO_CELSIUS_ROUNDED, MPH_TO_KMH, IN_TO_MM, DIRECTION_TO_ANGLE, INTEGER_TO_ANGLE
+from app.davis.schemas import DavisMessage, BarometerMessage, GatewayQuectelHealthMessage, VantageProV2Message
+
+FieldSource = Union[str, Tuple[str, Converter]]
+
+# Read from the sensor block itself rather than from its data records
+HEADER_FIELDS = ("lsid", "sensor_type", "data_structure_type")
+
+
+class SensorMapping(NamedTuple):
+    model: Type[BaseModel]
+    sensor_index: int
+    fields: Dict[str, FieldSource]
+    # Model fields not listed are copied from the same-named key, or left to the model default
+    copy_unlisted: bool = False
+    constants: Dict[str, Any] = {}
+    defaults: Dict[str, Any] = {}
+
+
+class CompiledSensorMapping:
+    """Flattened form of a SensorMapping, split by kind of field once instead of per record."""
+
+    def __init__(self, mapping: SensorMapping):
+        self.model = mapping.model
+        self.sensor_index = mapping.sensor_index
+        self.constants = dict(mapping.constants)
+        self.header = tuple(f for f in HEADER_FIELDS if f not in self.constants)
+
+        fields = dict(mapping.fields)
+        if mapping.copy_unlisted:
+            for name in self.model.model_fields:
+                if name not in fields and name not in HEADER_FIELDS and name not in self.constants:
+                    fields[name] = name
+
+        self.plain: List[Tuple[str, str, Any]] = []
+        self.converted: List[Tuple[str, str, Any, Converter]] = []
+        for target, source in fields.items():
+            default = mapping.defaults.get(target)
+            if isinstance(source, str):
+                self.plain.append((target, source, default))
+            else:
+                source_key, converter = source
+                self.converted.append((target, source_key, default, converter))
+
+    def _base_values(self, sensor: dict) -> dict:
+        values = {name: sensor[name] for name in self.header}
+        values.update(self.constants)
+        return values
+
+    def extract(self, sensor: dict, record: dict) -> BaseModel:
+        get = record.get
+        values = self._base_values(sensor)
+        for target, source, default in self.plain:
+            values[target] = get(source, default)
+        for target, source, default, converter in self.converted:
+            values[target] = converter.scalar(get(source, default))
+        return self.model(**values)
+
+    def extract_many(self, sensor: dict, records: Sequence[Optional[dict]]) -> List[Optional[BaseModel]]:
+        """
+        Same as extract for every record, with each converted field converted as one column.
+        A None record (no aligned record for that sample) gives a None model.
+        """
+        present = [record for record in records if record is not None]
+        base = self._base_values(sensor)
+        columns = [
+            (target, converter.column([record.get(source, default) for record in present]))
+            for target, source, default, converter in self.converted
+        ]
+        models = []
+        i = 0
+        for record in records:
+            if record is None:
+                models.append(None)
+                continue
+            get = record.get
+            values = dict(base)
+            for target, source, default in self.plain:
+                values[target] = get(source, default)
+            for target, column in columns:
+                values[target] = column[i]
+            models.append(self.model(**values))
+            i += 1
+        return models
+
+
+class MessageMapping:
+    """Compiled mappings of the three sensor blocks of one WeatherLink data structure type."""
+
+    def __init__(self, vantagepro2: SensorMapping, gateway: SensorMapping, barometer: SensorMapping):
+        self.vantagepro2 = CompiledSensorMapping(vantagepro2)
+        self.gateway = CompiledSensorMapping(gateway)
+        self.barometer = CompiledSensorMapping(barometer)
+
+    def _sensors(self, message: dict) -> Tuple[dict, dict, dict]:
+        sensors = message['sensors']
+        return (sensors[self.vantagepro2.sensor_index],
+                sensors[self.gateway.sensor_index],
+                sensors[self.barometer.sensor_index])
+
+    def consume(self, message: dict) -> DavisMessage:
+        """Builds the DavisMessage of the first record of every sensor block."""
+        vantage, gateway, barometer = self._sensors(message)
+        return DavisMessage(
+            station_id_uuid=message['station_id_uuid'],
+            generated_at=message['generated_at'],
+            station_id=message['station_id'],
+            barometer_msg=self.barometer.extract(barometer, barometer['data'][0]),
+            gateway_msg=self.gateway.extract(gateway, gateway['data'][0]),
+            vantagePro_msg=self.vantagepro2.extract(vantage, vantage['data'][0]),
+        )
+
+    def consume_many(self, message: dict, vantage_records: Sequence[dict], gateway_records: Sequence[Optional[dict]],
+                     barometer_records: Sequence[Optional[dict]]) -> List[DavisMessage]:
+        """
+        Builds one DavisMessage per position of the three aligned record lists. Gateway and barometer
+        records may be None, the message then has no such reading.
+        """
+        vantage, gateway, barometer = self._sensors(message)
+        vantage_msgs = self.vantagepro2.extract_many(vantage, vantage_records)
+        gateway_msgs = self.gateway.extract_many(gateway, gateway_records)
+        barometer_msgs = self.barometer.extract_many(barometer, barometer_records)
+        return [
+            DavisMessage(
+                station_id_uuid=message['station_id_uuid'],
+                generated_at=message['generated_at'],
+                station_id=message['station_id'],
+                barometer_msg=barometer_msg,
+                gateway_msg=gateway_msg,
+                vantagePro_msg=vantage_msg,
+            )
+            for vantage_msg, gateway_msg, barometer_msg in zip(vantage_msgs, gateway_msgs, barometer_msgs)
+        ]
+
+
+BAROMETER = SensorMapping(
+    model=BarometerMessage,
+    sensor_index=2,
+    fields={
+        "bar_trend_3_hr": ("bar_trend_3_hr", INHG_TO_MMHG),
+        "pressure_last": ("pressure_last", INHG_TO_MMHG),
+    },
+    copy_unlisted=True,
+)
+
+GATEWAY_QUECTEL = SensorMapping(
+    model=GatewayQuectelHealthMessage,
+    sensor_index=1,
+    fields={
+        "inside_box_temp": ("inside_box_temp", FAHRENHEIT_TO_CELSIUS),
+    },
+    copy_unlisted=True,
+)
+
+VANTAGEPRO2_CURRENT = SensorMapping(
+    model=VantageProV2Message,
+    sensor_index=0,
+    fields={
+        "bar": ("bar", INHG_TO_MMHG),
+        "bar_absolute": ("bar_absolute", INHG_TO_MMHG),
+        "bar_trend": ("bar_trend", INHG_TO_MMHG_ROUNDED),
+        "dew_point": ("dew_point", FAHRENHEIT_TO_CELSIUS),
+        "et_day": ("et_day", IN_TO_MM),
+        "heat_index": ("heat_index", FAHRENHEIT_TO_CELSIUS),
+        "temp_out": ("temp_out", FAHRENHEIT_TO_CELSIUS),
+        "thsw_index": ("thsw_index", FAHRENHEIT_TO_CELSIUS),
+        "wind_chill": ("wind_chill", FAHRENHEIT_TO_CELSIUS),
+        "wind_dir": ("wind_dir", DIRECTION_TO_ANGLE),
+        "wind_gust_10_min": ("wind_gust_10_min", MPH_TO_KMH),
+        "wind_speed": ("wind_speed", MPH_TO_KMH),
+        "wind_speed_2_min": ("wind_speed_2_min", MPH_TO_KMH),
+        "wind_speed_10_min": ("wind_speed_10_min", MPH_TO_KMH),
+        "wet_bulb": ("wet_bulb", FAHRENHEIT_TO_CELSIUS),
+    },
+    copy_unlisted=True,
+)
+
+# Archive records: fields without an archive equivalent stay None
+VANTAGEPRO2_HISTORIC = SensorMapping(
+    model=VantageProV2Message,
+    sensor_index=0,
+    fields={
+        "ts": "ts",
+        "tz_offset": "tz_offset",
+        "bar": ("bar", INHG_TO_MMHG),
+        "bar_absolute": ("abs_press", INHG_TO_MMHG),
+        "dew_point": ("dew_point_out", FAHRENHEIT_TO_CELSIUS_ROUNDED),
+        "et_day": ("et", IN_TO_MM),
+        "heat_index": ("heat_index_out", FAHRENHEIT_TO_CELSIUS_ROUNDED),
+        "hum_out": "hum_out",
+        "rain_15_min_clicks": "rainfall_clicks",
+        "rain_15_min_in": "rainfall_in",
+        "rain_15_min_mm": "rainfall_mm",
+        "rain_rate_clicks": "rain_rate_hi_clicks",
+        "rain_rate_in": "rain_rate_hi_in",
+        "rain_rate_mm": "rain_rate_hi_mm",
+        "solar_rad": "solar_rad_avg",
+        "temp_out": ("temp_out", FAHRENHEIT_TO_CELSIUS),
+        "thsw_index": ("thsw_index", FAHRENHEIT_TO_CELSIUS),
+        "uv": "uv_index_avg",
+        "wind_chill": ("wind_chill", FAHRENHEIT_TO_CELSIUS_ROUNDED),
+        "wind_dir": ("wind_dir_of_hi", INTEGER_TO_ANGLE),
+        "wind_speed": ("wind_speed_avg", MPH_TO_KMH),
+        "wet_bulb": ("wet_bulb", FAHRENHEIT_TO_CELSIUS),
+    },
+    constants={"data_structure_type": 6},
+    defaults={"tz_offset": 3600},
+)
+
+CURRENT_MAPPING = MessageMapping(VANTAGEPRO2_CURRENT, GATEWAY_QUECTEL, BAROMETER)
+HISTORIC_MAPPING = MessageMapping(VANTAGEPRO2_HISTORIC, GATEWAY_QUECTEL, BAROMETER)
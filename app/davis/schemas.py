@@ -128,8 +128,9 @@ class DavisMessage(BaseModel):
     generated_at: int
     station_id: int
 
-    barometer_msg: BarometerMessage
-    gateway_msg: GatewayQuectelHealthMessage
+    # None when a historic sample has no barometer or gateway record close enough to pair with
+    barometer_msg: Optional[BarometerMessage] = None
+    gateway_msg: Optional[GatewayQuectelHealthMessage] = None
     vantagePro_msg: VantageProV2Message
 
 
@@ -143,3 +144,14 @@ class HistoricMessage(BaseModel):
             raise RequestValidationError("Timestamps cannot be more than 24 hours apart.")
         return self
 
+
+class BackfillRequest(BaseModel):
+    start_time: int = Field(..., description="Unix timestamp (seconds)")
+    end_time: int = Field(..., description="Unix timestamp (seconds)")
+
+    @model_validator(mode='after')
+    def check_time_order(self) -> Self:
+        if self.end_time <= self.start_time:
+            raise ValueError("end_time must be after start_time.")
+        return self
+
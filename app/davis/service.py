@@ -1,26 +1,146 @@
+import time
 import traceback
+from datetime import datetime
 
+import httpx
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
+
 from app.davis.schemas import DavisMessage
+from app.davis.utils import build_historic_messages, consume_current_msg
+from app.http_clients import get_http_client, DAVIS
 from app.logs.config_server_logs import server_logger
 import app.crud.davis_sensors as db_service
+from app.tasks.write_behind import davis_buffer
 
 
 async def process_davis_message(db: AsyncSession, message: DavisMessage):
-    server_logger.info(f"DAVIS -- Received message: {message}")
+    server_logger.debug("DAVIS -- Received message: %s", message)
+
+    if davis_buffer.running:
+        await davis_buffer.put(message)
+        return message
 
     resp = await db_service.create_davis_sensors(db, message)
 
     if resp is None:
         try:
-            server_logger.info(f"DAVIS -- Station data already inserted for ts : {message.vantagePro_msg.ts}")
+            server_logger.info("DAVIS -- Station data already inserted for ts : %s", message.vantagePro_msg.ts)
         except Exception as e:
             server_logger.error("".join(traceback.format_exception(None, e, e.__traceback__)))
             server_logger.error(f"Error during Davis scheduled task: {e}")
     else:
-        response = {"status": "success", "message": "Davis reading created.", "details": f"{resp.__dict__}"}
+        response = {"status": "success", "message": "Davis reading created.", "details": f"station row {resp}"}
         server_logger.info(response)
     return message
 
 
+# Timing of the current conditions poller, shared by the scheduler job and the router
+_poll_stats = {
+    "runs": 0,
+    "failures": 0,
+    "last_run_at": None,
+    "last_status": None,
+    "last_error": None,
+    "last_fetch_ms": None,
+    "last_store_ms": None,
+    "last_total_ms": None,
+    "max_total_ms": 0.0,
+}
+
+
+async def poll_davis_current(db: AsyncSession) -> DavisMessage:
+    """
+    Fetches the current conditions of the station, parses them and stores them.
+    Called directly by the scheduler and by the receive_message route.
+
+    :param db:
+    :return: the parsed Davis message
+    """
+    started = time.perf_counter()
+    _poll_stats["runs"] += 1
+    _poll_stats["last_run_at"] = datetime.now().isoformat()
+    _poll_stats["last_fetch_ms"] = _poll_stats["last_store_ms"] = None
+    stage = "fetch"
+    try:
+        response_data = await fetch_davis_current(get_http_client(DAVIS))
+        fetched = time.perf_counter()
+        _poll_stats["last_fetch_ms"] = round((fetched - started) * 1000, 1)
+
+        stage = "parse"
+        message: DavisMessage = consume_current_msg(response_data)
+        server_logger.info("Received message with station_id: %s and UUID: %s", message.station_id, message.station_id_uuid)
+
+        stage = "store"
+        await process_davis_message(db, message)
+        _poll_stats["last_store_ms"] = round((time.perf_counter() - fetched) * 1000, 1)
+    except Exception as e:
+        _poll_stats["failures"] += 1
+        _poll_stats["last_status"] = "failed"
+        _poll_stats["last_error"] = f"{stage}: {e}"
+        server_logger.error(f"DAVIS -- Poll failed during {stage}: {e}")
+        raise
+    finally:
+        total_ms = round((time.perf_counter() - started) * 1000, 1)
+        _poll_stats["last_total_ms"] = total_ms
+        _poll_stats["max_total_ms"] = max(_poll_stats["max_total_ms"], total_ms)
+
+    _poll_stats["last_status"] = "success"
+    _poll_stats["last_error"] = None
+    server_logger.info(f"DAVIS -- Poll done in {_poll_stats['last_total_ms']} ms "
+                       f"(fetch {_poll_stats['last_fetch_ms']} ms, store {_poll_stats['last_store_ms']} ms)")
+    return message
+
+
+def davis_poll_stats() -> dict:
+    return dict(_poll_stats)
+
+
+async def ingest_davis_historic(db: AsyncSession, response_data: dict) -> dict:
+    """
+    Aligns a historic API response and writes it through the bulk insert path.
+
+    :param db:
+    :param response_data: decoded body of the historic API
+    :return: inserted/duplicate counts and the samples dropped by the alignment
+    """
+    messages, alignment = build_historic_messages(response_data)
+    server_logger.info(f"DAVIS -- Historic window aligned: {len(messages)} samples, "
+                       f"{alignment.missing_gateway} without gateway, "
+                       f"{alignment.missing_barometer} without barometer.")
+
+    inserted = await db_service.bulk_create_davis_sensors(db, messages) if messages else 0
+
+    counts = {
+        "inserted": inserted,
+        "duplicates": len(messages) - inserted,
+        "missing_gateway": alignment.missing_gateway,
+        "missing_barometer": alignment.missing_barometer,
+    }
+    server_logger.info(f"DAVIS -- Historic upload: {counts}")
+    return counts
+
+
+async def fetch_davis_current(client: httpx.AsyncClient) -> dict:
+    external_api_uri = (f"https://{settings.DAVIS_EXTERNAL_API_URI}{settings.DAVIS_STATION_ID}"
+                        f"?station-id={settings.DAVIS_STATION_ID}&api-key={settings.DAVIS_EXTERNAL_API_KEY}")
+    response = await client.get(external_api_uri, headers=_davis_headers())
+    response.raise_for_status()
+    return response.json()
+
+
+async def fetch_davis_historic(client: httpx.AsyncClient, start_time: int, end_time: int) -> dict:
+    external_api_uri = (f"https://{settings.DAVIS_HISTORIC_API_URI}{settings.DAVIS_STATION_ID}"
+                        f"?station-id={settings.DAVIS_STATION_ID}&api-key={settings.DAVIS_EXTERNAL_API_KEY}"
+                        f"&start-timestamp={start_time}&end-timestamp={end_time}")
+    response = await client.get(external_api_uri, headers=_davis_headers())
+    response.raise_for_status()
+    return response.json()
+
+
+def _davis_headers() -> dict:
+    return {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36',
+        'x-api-secret': f"{settings.DAVIS_EXTERNAL_API_SECRET}",
+    }
@@ -0,0 +1,32 @@
+from typing import List, Tuple
+
+from app.davis.alignment import AlignmentResult, align_historic_sensors
+from app.davis.mapping import CURRENT_MAPPING, HISTORIC_MAPPING
+from app.davis.schemas import DavisMessage
+
+
+def build_historic_messages(response_data: dict) -> Tuple[List[DavisMessage], AlignmentResult]:
+    """
+    Aligns the sensor streams of a historic API response and converts every aligned sample
+    to a DavisMessage.
+
+    :param response_data:
+    :return: the messages and the alignment they were built from
+    """
+    sensors = response_data.get("sensors")
+    alignment = align_historic_sensors(
+        sensors[0].get("data"),
+        sensors[1].get("data"),
+        sensors[2].get("data"),
+    )
+    messages = HISTORIC_MAPPING.consume_many(
+        response_data,
+        [sample.vantagepro2 for sample in alignment.samples],
+        [sample.gateway for sample in alignment.samples],
+        [sample.barometer for sample in alignment.samples],
+    )
+    return messages, alignment
+
+
+def consume_current_msg(message) -> DavisMessage:
+    return CURRENT_MAPPING.consume(message)
@@ -0,0 +1,95 @@
+import importlib.util
+from typing import Dict
+
+import httpx
+
+from app.config import settings
+from app.logs.config_server_logs import server_logger
+
+# One long-lived client per upstream so connections (and TLS sessions) are reused between polls
+DAVIS = "davis"
+METEOFRANCE = "meteofrance"
+KONECTGDS = "konectgds"
+UPSTREAMS = (DAVIS, METEOFRANCE, KONECTGDS)
+
+# HTTP/2 needs the optional h2 package (httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+_transports: Dict[str, "CountingTransport"] = {}
+
+
+class CountingTransport(httpx.AsyncHTTPTransport):
+    """Connection pooling transport that keeps request and pool usage counters."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return await super().handle_async_request(request)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        connections = getattr(self._pool, "connections", [])
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "pool_connections": len(connections),
+            "pool_idle_connections": sum(1 for connection in connections if connection.is_idle()),
+        }
+
+
+def _build_client(name: str) -> httpx.AsyncClient:
+    transport = CountingTransport(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        retries=settings.HTTP_CONNECT_RETRIES,
+    )
+    _transports[name] = transport
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(settings.HTTP_READ_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+    )
+
+
+def get_http_client(name: str) -> httpx.AsyncClient:
+    """Shared client of an upstream. Created by the lifespan, or on first use outside of it."""
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _clients[name] = _build_client(name)
+    return client
+
+
+def start_http_clients():
+    for name in UPSTREAMS:
+        get_http_client(name)
+    server_logger.info(f"HTTP clients started for {', '.join(UPSTREAMS)} (HTTP/2: {HTTP2_AVAILABLE}).")
+
+
+async def close_http_clients():
+    for name, client in list(_clients.items()):
+        await client.aclose()
+        del _clients[name]
+    server_logger.info("HTTP clients closed.")
+
+
+def http_client_stats() -> dict:
+    return {name: transport.stats() for name, transport in _transports.items() if name in _clients}
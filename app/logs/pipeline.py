@@ -0,0 +1,141 @@
+import atexit
+import json
+import logging
+import os
+import queue
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from enum import Enum
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from pathlib import Path
+from uuid import UUID
+
+from app.config import settings
+
+log_dir = Path(__file__).resolve().parent
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and is kept in the JSON line
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listeners = []
+
+
+class JsonLineFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, extra fields and the traceback if any."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SizedTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """Rotates on a time schedule like TimedRotatingFileHandler, and also as soon as the file reaches max_bytes."""
+
+    def __init__(self, filename, max_bytes: int, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.max_bytes = max_bytes
+
+    def rotation_filename(self, default_name: str) -> str:
+        # Several size rollovers can happen within one period: number them instead of overwriting
+        name, index = default_name, 0
+        while os.path.exists(name):
+            index += 1
+            name = f"{default_name}.{index}"
+        return name
+
+    def shouldRollover(self, record: logging.LogRecord) -> int:
+        if super().shouldRollover(record):
+            return 1
+        if self.max_bytes > 0 and self.stream is not None:
+            if self.stream.tell() + len(self.format(record)) + 1 >= self.max_bytes:
+                return 1
+        return 0
+
+
+def _file_handler(file_name: str) -> logging.Handler:
+    handler = SizedTimedRotatingFileHandler(
+        os.path.join(log_dir, file_name),
+        max_bytes=settings.LOG_MAX_BYTES,
+        when=settings.LOG_ROTATE_WHEN,
+        backupCount=settings.LOG_BACKUP_COUNT,
+        encoding="utf-8",
+    )
+    if settings.LOG_JSON:
+        handler.setFormatter(JsonLineFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(
+            "%(asctime)s - %(levelname)s - %(name)s - %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S"
+        ))
+    return handler
+
+
+# Argument types whose value cannot change between the logging call and the write
+_IMMUTABLE_ARG_TYPES = (str, bytes, int, float, complex, type(None), date, time, timedelta, Decimal, UUID, Enum)
+
+
+def _is_immutable(value) -> bool:
+    if isinstance(value, tuple):
+        return all(_is_immutable(item) for item in value)
+    return isinstance(value, _IMMUTABLE_ARG_TYPES)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    The stock QueueHandler formats the message in the caller's thread. Here, when every %-style
+    argument is immutable, they are merged by the writer thread, so the event loop only pays for the
+    put. Any other argument (a list, a dict, a model) could be changed by the caller before the
+    writer gets to it: such records are formatted at enqueue time, like the stock handler does.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args and not (isinstance(record.msg, str) and _is_immutable(record.args)):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            # Tracebacks hold frames that may change before the writer gets to them
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def queued_logger(name: str, file_name: str) -> logging.Logger:
+    """
+    Logger whose records are written by a background thread to a rotating file in app/logs.
+
+    :param name: logger name
+    :param file_name: log file name
+    :return:
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(settings.LOG_LEVEL)
+    if logger.handlers:
+        return logger
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, _file_handler(file_name), respect_handler_level=True)
+    logger.addHandler(_DeferredQueueHandler(log_queue))
+    logger.propagate = False
+    listener.start()
+    _listeners.append(listener)
+    return logger
+
+
+@atexit.register
+def stop_log_listeners():
+    """Writes out the records still queued. Safe to call more than once."""
+    for listener in _listeners:
+        if listener._thread is not None:
+            listener.stop()
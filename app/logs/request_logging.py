@@ -0,0 +1,67 @@
+import logging
+import random
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.logs.config_server_logs import server_logger
+
+
+class RequestLogMiddleware:
+    """
+    Pure ASGI request logging. The body is copied as the application reads it (up to
+    LOG_BODY_MAX_BYTES), so it is neither buffered twice nor delayed. Failed requests are
+    always logged; successful ones are sampled with LOG_REQUEST_SAMPLE_RATE.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes = settings.LOG_BODY_MAX_BYTES
+        body = bytearray()
+        body_size = 0
+        status_code = 500
+        started = time.perf_counter()
+
+        async def tee_receive() -> Message:
+            nonlocal body_size
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                body_size += len(chunk)
+                if len(body) < max_bytes:
+                    body.extend(chunk[:max_bytes - len(body)])
+            return message
+
+        async def capture_send(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, tee_receive, capture_send)
+        finally:
+            failed = status_code >= 400
+            if failed or random.random() < settings.LOG_REQUEST_SAMPLE_RATE:
+                self._log(scope, status_code, started, body, body_size, failed)
+
+    @staticmethod
+    def _log(scope: Scope, status_code: int, started: float, body: bytearray, body_size: int, failed: bool):
+        level = logging.WARNING if failed else logging.INFO
+        if not server_logger.isEnabledFor(level):
+            return
+        duration_ms = (time.perf_counter() - started) * 1000
+        truncated = "..." if body_size > len(body) else ""
+        server_logger.log(
+            level,
+            "%s %s -> %d in %.1f ms, body %d bytes: %s%s",
+            scope["method"], scope["path"], status_code, duration_ms, body_size,
+            body.decode(errors="replace"), truncated,
+        )
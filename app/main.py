@@ -3,53 +3,64 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
 
 from app.barani.router import router as barani_router
 from app.campbell.router import router as campbell_router
+from app.campbell.service import close_scraper_browser
+from app.campbell.inbox import inbox_watcher
+from app.config import settings
 from app.davis.router import router as davis_router
 from app.meteofrance.router import router as meteofrance_router
+from app.readings.router import router as readings_router
+from app.http_clients import start_http_clients, close_http_clients, http_client_stats
 from app.tasks.scheduler import start_scheduler, shutdown_scheduler
+from app.tasks.write_behind import start_write_behind, stop_write_behind, write_behind_stats
 from app.logs.config_server_logs import server_logger
+from app.logs.request_logging import RequestLogMiddleware
 
 
-class LogRequestMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # Read the body and store it in request.state
-        body = await request.body()
-
-        if body:
-            server_logger.info(f"Incoming request body: {body.decode(errors='ignore')}")
-        else:
-            server_logger.info("Incoming request with no body.")
-
-        # Store body in request.state for access in the route handler if necessary
-        request.state.body = body
-
-        response = await call_next(request)
-        return response
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Lifespan event handler to start the scheduler."""
+    """Lifespan event handler to start the HTTP clients, the scheduler and the write-behind buffers."""
+    start_http_clients()
+    start_write_behind()
     start_scheduler()
+    if settings.CAMPBELL_INBOX_ENABLED:
+        inbox_watcher.start()
     yield  # Keep FastAPI running
     shutdown_scheduler()
+    await inbox_watcher.stop()
+    await close_scraper_browser()
+    await stop_write_behind()  # Drain queued readings before the process exits
+    await close_http_clients()
 
 app = FastAPI(lifespan=lifespan)
 
-app.add_middleware(LogRequestMiddleware)
+app.add_middleware(RequestLogMiddleware)
 
 app.include_router(barani_router, prefix="/messages")
 app.include_router(campbell_router)
 app.include_router(davis_router, prefix="/davis")
 app.include_router(meteofrance_router, prefix="/meteofrance")
+app.include_router(readings_router, prefix="/readings")
 @app.get("/")
 def health_check():
     return {"status": "running"}
 
 
+@app.get("/ingest/stats")
+def ingest_stats():
+    """Queue depth, flush size and flush latency of the write-behind buffers."""
+    return write_behind_stats()
+
+
+@app.get("/http/stats")
+def http_stats():
+    """Request and connection pool counters of the shared outbound HTTP clients."""
+    return http_client_stats()
+
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     error_details = exc.errors()
@@ -0,0 +1,218 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+import app.meteofrance.service as meteofrance_service
+from app.config import settings
+from app.db.session import AsyncSessionLocal
+from app.http_clients import get_http_client, METEOFRANCE
+from app.logs.config_server_logs import server_logger
+from app.meteofrance.schemas import MeteoFranceInfrahoraireMessage
+import app.meteofrance.utils as utils
+
+
+class TokenBucket:
+    """Async token bucket: `rate` calls per second on average, bursts of at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+# Shared by the poller and the manual route: the quota is per API key, not per caller
+meteofrance_quota = TokenBucket(
+    rate=settings.METEOFRANCE_RATE_PER_MIN / 60,
+    capacity=settings.METEOFRANCE_RATE_BURST,
+)
+
+# infrahoraire-6m publishes one observation per station every 6 minutes
+PUBLICATION_CADENCE = timedelta(minutes=6)
+# Weight of the newest sample in the publication lag moving average
+LAG_SMOOTHING = 0.3
+
+
+def _utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+class StationSchedule:
+    """
+    When to poll a station next. Learns the usual lag between an observation's validity_time and
+    its insert_time, and fires just after the next observation should be published. Polls that
+    bring nothing newer back off exponentially, up to one cadence.
+    """
+
+    def __init__(self, station_id: str):
+        self.station_id = station_id
+        self.next_due: Optional[datetime] = None
+        self.latest_reference_time: Optional[datetime] = None
+        self.lag_s: Optional[float] = None
+        self.misses = 0
+        self.polls = 0
+        self.empty_polls = 0
+
+    def is_due(self, now: datetime) -> bool:
+        return self.next_due is None or self.next_due <= now
+
+    def record(self, messages: Optional[List[MeteoFranceInfrahoraireMessage]], now: datetime):
+        """Updates the lag estimate and the next due time after a poll (None when it failed)."""
+        self.polls += 1
+        newest = max(messages, key=lambda m: m.reference_time) if messages else None
+        if newest is None or (self.latest_reference_time is not None
+                              and _utc(newest.reference_time) <= self.latest_reference_time):
+            self.empty_polls += 1
+            self._back_off(now)
+            return
+
+        self.latest_reference_time = _utc(newest.reference_time)
+        lag_s = (_utc(newest.insert_time) - _utc(newest.validity_time)).total_seconds()
+        self.lag_s = lag_s if self.lag_s is None else (1 - LAG_SMOOTHING) * self.lag_s + LAG_SMOOTHING * lag_s
+        self.misses = 0
+
+        expected = (self.latest_reference_time + PUBLICATION_CADENCE
+                    + timedelta(seconds=max(self.lag_s, 0) + settings.METEOFRANCE_PUBLICATION_MARGIN_S))
+        if expected <= now:
+            # We are behind the expected publication already: retry soon rather than wait a full cadence
+            self._back_off(now)
+        else:
+            self.next_due = expected
+
+    def _back_off(self, now: datetime):
+        delay = min(settings.METEOFRANCE_RETRY_S * 2 ** self.misses, PUBLICATION_CADENCE.total_seconds())
+        self.misses += 1
+        self.next_due = now + timedelta(seconds=delay)
+
+    def status(self) -> dict:
+        return {
+            "next_due": self.next_due.isoformat() if self.next_due else None,
+            "latest_reference_time": self.latest_reference_time.isoformat() if self.latest_reference_time else None,
+            "publication_lag_s": round(self.lag_s, 1) if self.lag_s is not None else None,
+            "misses": self.misses,
+            "polls": self.polls,
+            "empty_polls": self.empty_polls,
+        }
+
+
+_schedules: Dict[str, StationSchedule] = {}
+
+_poll_stats = {
+    "cycles": 0,
+    "last_run_at": None,
+    "last_duration_ms": None,
+    "last_stations": 0,
+    "last_failed_stations": [],
+    "last_rows": 0,
+    "last_inserted": 0,
+    "last_updated": 0,
+    "last_duplicates": 0,
+}
+
+
+def station_ids() -> List[str]:
+    """Station registry, from the comma separated METEOFRANCE_STATIONS setting."""
+    return [station.strip() for station in settings.METEOFRANCE_STATIONS.split(",") if station.strip()]
+
+
+async def fetch_meteofrance_station(client: httpx.AsyncClient, station_id: str) -> List[MeteoFranceInfrahoraireMessage]:
+    """
+    Fetches the infrahoraire-6m observations of one station, within the API quota.
+
+    :param client:
+    :param station_id:
+    :return:
+    """
+    await meteofrance_quota.acquire()
+    response = await client.get(
+        f"{settings.METEOFRANCE_URL}{settings.METEOFRANCE_OBS_INFRAHORAIRE}",
+        headers={"apikey": settings.METEOFRANCE_API_KEY},
+        params={
+            "id_station": station_id,
+            "format": settings.METEOFRANCE_OPTJSON,
+        },
+    )
+    response.raise_for_status()
+    return utils.consume_meteofrance_message(response.content)
+
+
+async def _poll_station(client: httpx.AsyncClient, station_id: str,
+                        semaphore: asyncio.Semaphore) -> Optional[List[MeteoFranceInfrahoraireMessage]]:
+    async with semaphore:
+        try:
+            return await fetch_meteofrance_station(client, station_id)
+        except Exception as e:
+            server_logger.error(f"METEO-FR -- Failed to poll station {station_id}: {e}")
+            return None
+
+
+async def poll_meteofrance_stations(due_only: bool=False) -> dict:
+    """
+    Polls the registered stations concurrently (at most METEOFRANCE_CONCURRENCY requests in flight)
+    and writes the whole cycle with one bulk insert.
+
+    :param due_only: only poll the stations whose next observation should be published by now
+    :return: cycle summary
+    """
+    now = datetime.now(timezone.utc)
+    schedules = [_schedules.setdefault(station_id, StationSchedule(station_id)) for station_id in station_ids()]
+    if due_only:
+        schedules = [schedule for schedule in schedules if schedule.is_due(now)]
+        if not schedules:
+            return dict(_poll_stats)
+    stations = [schedule.station_id for schedule in schedules]
+
+    started = time.perf_counter()
+    _poll_stats["last_run_at"] = datetime.now().isoformat()
+
+    client = get_http_client(METEOFRANCE)
+    semaphore = asyncio.Semaphore(settings.METEOFRANCE_CONCURRENCY)
+    results = await asyncio.gather(*(_poll_station(client, station_id, semaphore) for station_id in stations))
+
+    polled_at = datetime.now(timezone.utc)
+    for schedule, result in zip(schedules, results):
+        schedule.record(result, polled_at)
+
+    messages = [message for result in results if result for message in result]
+    failed = [station_id for station_id, result in zip(stations, results) if result is None]
+
+    counts = {"inserted": 0, "updated": 0, "duplicates": 0}
+    if messages:
+        async with AsyncSessionLocal() as db:
+            counts = await meteofrance_service.process_meteofrance_infrahoraire(db, messages)
+
+    _poll_stats.update({
+        "cycles": _poll_stats["cycles"] + 1,
+        "last_duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "last_stations": len(stations),
+        "last_failed_stations": failed,
+        "last_rows": len(messages),
+        "last_inserted": counts["inserted"],
+        "last_updated": counts["updated"],
+        "last_duplicates": counts["duplicates"],
+    })
+    server_logger.info(f"METEO-FR -- Poll cycle: {len(stations)} stations ({len(failed)} failed), "
+                       f"{len(messages)} rows, {counts['inserted']} inserted in {_poll_stats['last_duration_ms']} ms")
+    return dict(_poll_stats)
+
+
+def meteofrance_poll_stats() -> dict:
+    return {
+        **_poll_stats,
+        "stations": {station_id: schedule.status() for station_id, schedule in _schedules.items()},
+    }
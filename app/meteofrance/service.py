@@ -2,20 +2,22 @@ from typing import List
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.crud.meteofrance_sensors import create_meteofrance_sensor
+import app.crud.meteofrance_sensors as db_service
+from app.config import settings
+from app.logs.config_server_logs import server_logger
 from app.meteofrance.schemas import MeteoFranceInfrahoraireMessage
 
 
 async def process_meteofrance_infrahoraire(db: AsyncSession,
-                                           message: List[MeteoFranceInfrahoraireMessage]):
+                                           message: List[MeteoFranceInfrahoraireMessage]) -> dict:
     """
     Process "infrahoraire-6m" messages from MeteoFrance.
     These messages contain information for the last reading of the sensor.
 
     :param db:
     :param message:
-    :return:
+    :return: inserted, updated and duplicate row counts
     """
-    resp = await create_meteofrance_sensor(db, message)
-    print(resp)
-    pass
+    counts = await db_service.bulk_upsert_meteofrance(db, message, update=settings.METEOFRANCE_UPSERT_UPDATE)
+    server_logger.info(f"METEO-FR -- Observations stored: {counts}")
+    return counts
@@ -230,6 +230,18 @@ class DavisBarometer(Base):
     pressure_last = Column(Float)
     bar_trend_3_hr = Column(Float)
 
+class DavisBackfillWindow(Base):
+    __tablename__ = 'davis_backfill_window'
+
+    # Historic API window [start_ts, end_ts) already fetched and stored, within one UTC day
+    start_ts = Column(BigInteger, primary_key=True)
+    end_ts = Column(BigInteger, primary_key=True)
+    rows_inserted = Column(Integer)
+    # Samples stored without a gateway or barometer match by the alignment
+    missing_gateway = Column(Integer)
+    missing_barometer = Column(Integer)
+    completed_at = Column(DateTime, default=func.now())
+
 class DavisSensorDataStructure(Base):
     __tablename__ = 'davis_sensor_data_structure'
 
@@ -311,4 +323,71 @@ class MeteoFranceData(Base):
             ray_glo01=data["ray_glo01"],
             pres=data["pres"],
             pmer=data["pmer"]
-        )
\ No newline at end of file
+        )
+
+class ReadingRollupHourly(Base):
+    __tablename__ = 'reading_rollup_hourly'
+
+    # One row per source, station, metric and hour; avg is sum / count
+    source = Column(String, nullable=False)
+    station = Column(String, nullable=False)
+    metric = Column(String, nullable=False)
+    bucket = Column(DateTime, nullable=False)
+    min = Column(Float)
+    max = Column(Float)
+    sum = Column(Float)
+    count = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, default=func.now())
+
+    __table_args__ = (
+        PrimaryKeyConstraint('source', 'station', 'metric', 'bucket'),
+    )
+
+
+class ReadingRollupDaily(Base):
+    __tablename__ = 'reading_rollup_daily'
+
+    # Same as reading_rollup_hourly, one row per day, computed from the hourly rollups
+    source = Column(String, nullable=False)
+    station = Column(String, nullable=False)
+    metric = Column(String, nullable=False)
+    bucket = Column(DateTime, nullable=False)
+    min = Column(Float)
+    max = Column(Float)
+    sum = Column(Float)
+    count = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, default=func.now())
+
+    __table_args__ = (
+        PrimaryKeyConstraint('source', 'station', 'metric', 'bucket'),
+    )
+
+
+class ReadingRollupDirty(Base):
+    __tablename__ = 'reading_rollup_dirty'
+
+    # Hours of raw readings written since their rollups were last computed
+    source = Column(String, nullable=False)
+    station = Column(String, nullable=False)
+    bucket = Column(DateTime, nullable=False)
+    marked_at = Column(DateTime, default=func.now())
+
+    __table_args__ = (
+        PrimaryKeyConstraint('source', 'station', 'bucket'),
+    )
+
+
+class ReadingRollupRebuild(Base):
+    __tablename__ = 'reading_rollup_rebuild'
+
+    # Rebuilds that ran to completion: the rollups of a source are complete over [start_time, end_time)
+    # once one of them finished, null bounds meaning the first or last reading
+    job_id = Column(UUID(as_uuid=True), nullable=False)
+    source = Column(String, nullable=False)
+    start_time = Column(DateTime)
+    end_time = Column(DateTime)
+    finished_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        PrimaryKeyConstraint('job_id', 'source'),
+    )
@@ -0,0 +1,99 @@
+import re
+from typing import NamedTuple, Optional
+
+from sqlalchemy import Float, Integer, cast, func, literal_column
+from sqlalchemy.sql.elements import ColumnElement
+
+# Calendar buckets, computed with date_trunc
+CALENDAR_UNITS = ("minute", "hour", "day", "week", "month", "year")
+
+# Fixed width buckets: a count and a unit, e.g. 10m, 3h, 1d
+_WIDTH_PATTERN = re.compile(r"^(\d+)([mhd])$")
+_WIDTH_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+AGGREGATES = ("min", "max", "avg", "sum", "count")
+
+
+class Bucket(NamedTuple):
+    """
+    A time bucket: a date_trunc unit (calendar buckets) or a fixed width in seconds,
+    aligned on the Unix epoch.
+    """
+    spec: str
+    unit: Optional[str] = None
+    width_s: Optional[int] = None
+
+    @property
+    def approx_seconds(self) -> float:
+        """Typical bucket length, to bound the number of buckets of a query."""
+        if self.width_s is not None:
+            return self.width_s
+        return {
+            "minute": 60, "hour": 3600, "day": 86400, "week": 7 * 86400,
+            "month": 28 * 86400, "year": 365 * 86400,
+        }[self.unit]
+
+    def is_multiple_of(self, seconds: int) -> bool:
+        """
+        Whether every bucket is made of whole periods of `seconds` (an hour or a day), so it can be
+        computed from rollups of that resolution.
+        """
+        if self.width_s is not None:
+            return self.width_s % seconds == 0
+        return self.approx_seconds >= seconds
+
+    def expression(self, time_column: ColumnElement) -> ColumnElement:
+        """
+        Start of the bucket containing `time_column`, a naive UTC timestamp (see
+        ReadingSource.utc_time), as a timestamp without time zone. Constants are inlined (the unit
+        is whitelisted, the width an int): the same expression is grouped on, and Postgres only
+        matches it if it has no bind parameters.
+        """
+        if self.unit is not None:
+            return func.date_trunc(literal_column(f"'{self.unit}'"), time_column)
+        # Naive UTC: bin on the epoch and convert back to naive UTC
+        width = literal_column(str(self.width_s))
+        binned = func.floor(func.extract("epoch", time_column) / width) * width
+        return func.timezone(literal_column("'UTC'"), func.to_timestamp(binned))
+
+
+def parse_bucket(spec: str) -> Bucket:
+    """
+    :param spec: a date_trunc unit (hour, day, ...) or a width such as 15m, 6h, 2d
+    :raises ValueError: on anything else
+    """
+    spec = spec.strip().lower()
+    if spec in CALENDAR_UNITS:
+        return Bucket(spec=spec, unit=spec)
+    match = _WIDTH_PATTERN.match(spec)
+    if match and int(match.group(1)) > 0:
+        return Bucket(spec=spec, width_s=int(match.group(1)) * _WIDTH_UNITS[match.group(2)])
+    raise ValueError(f"Invalid bucket {spec}: expected one of {', '.join(CALENDAR_UNITS)} or a width like 15m, 6h, 2d.")
+
+
+def aggregate_expressions(metric: ColumnElement, aggregates) -> list:
+    """Labelled SQL aggregates of `metric` over raw readings."""
+    expressions = {
+        "min": func.min(metric),
+        "max": func.max(metric),
+        "avg": cast(func.avg(metric), Float),
+        "sum": cast(func.sum(metric), Float),
+        "count": func.count(metric),
+    }
+    return [expressions[name].label(name) for name in aggregates]
+
+
+def rollup_aggregate_expressions(model, aggregates, metric_type) -> list:
+    """
+    Labelled SQL aggregates over rollup rows, each holding the min, max, sum and count of a bucket.
+    Rollups store every metric as a float: min and max are cast back to `metric_type`, so integer
+    metrics come out as they do from the raw readings.
+    """
+    expressions = {
+        "min": cast(func.min(model.min), metric_type),
+        "max": cast(func.max(model.max), metric_type),
+        "avg": cast(func.sum(model.sum) / func.nullif(func.sum(model.count), 0), Float),
+        "sum": func.sum(model.sum),
+        "count": cast(func.sum(model.count), Integer),
+    }
+    return [expressions[name].label(name) for name in aggregates]
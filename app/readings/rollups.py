@@ -0,0 +1,156 @@
+import asyncio
+import time
+import traceback
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import app.crud.rollups as db_service
+from app.config import settings
+from app.db.session import AsyncSessionLocal
+from app.logs.config_server_logs import server_logger
+from app.readings.sources import SOURCES
+
+_refresh_stats = {
+    "runs": 0,
+    "last_run_at": None,
+    "last_duration_ms": None,
+    "last_hours": 0,
+    "hours_total": 0,
+}
+
+
+async def refresh_dirty_batch(limit: int) -> int:
+    """
+    Recomputes the rollups of up to `limit` dirty hours in one transaction: the hourly rollups
+    of these hours from the raw readings, then the daily rollups of their days.
+
+    :return: number of dirty hours processed, 0 when there are none left
+    """
+    async with AsyncSessionLocal() as db:
+        dirty = await db_service.take_dirty_hours(db, limit)
+        hours_by_station: Dict[tuple, List[datetime]] = defaultdict(list)
+        for source, station, hour in dirty:
+            hours_by_station[(source, station)].append(hour)
+
+        for (name, station), hours in hours_by_station.items():
+            if name not in SOURCES:
+                continue
+            await db_service.refresh_hourly_rollups(db, name, SOURCES[name], station, hours)
+            days = sorted({hour.replace(hour=0) for hour in hours})
+            await db_service.refresh_daily_rollups(db, name, station, days)
+        await db.commit()
+    return len(dirty)
+
+
+async def refresh_dirty_rollups() -> dict:
+    """Processes the dirty hours in batches of ROLLUP_BATCH_HOURS until none are left."""
+    started = time.perf_counter()
+    _refresh_stats["last_run_at"] = datetime.now().isoformat()
+    hours = 0
+    while True:
+        processed = await refresh_dirty_batch(settings.ROLLUP_BATCH_HOURS)
+        hours += processed
+        if processed < settings.ROLLUP_BATCH_HOURS:
+            break
+    _refresh_stats.update({
+        "runs": _refresh_stats["runs"] + 1,
+        "last_duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "last_hours": hours,
+        "hours_total": _refresh_stats["hours_total"] + hours,
+    })
+    if hours:
+        server_logger.info("ROLLUPS -- Refreshed %d dirty hours in %s ms", hours, _refresh_stats["last_duration_ms"])
+    return dict(_refresh_stats)
+
+
+def last_refresh_at() -> Optional[str]:
+    """Start of the last refresh run of this process, None before the first one."""
+    return _refresh_stats["last_run_at"]
+
+
+async def rollup_stats() -> dict:
+    async with AsyncSessionLocal() as db:
+        dirty_hours = await db_service.count_dirty_hours(db)
+    return {**_refresh_stats, "dirty_hours": dirty_hours}
+
+
+class RebuildJob:
+    """Rebuild of the rollups of a time range from the raw readings; jobs live in process memory only."""
+
+    def __init__(self, sources: List[str], start_time: Optional[datetime], end_time: Optional[datetime]):
+        self.job_id = str(uuid.uuid4())
+        self.sources = sources
+        self.start_time = start_time
+        self.end_time = end_time
+        self.state = "pending"
+        self.hours_marked = 0
+        self.hours_done = 0
+        self.errors: List[str] = []
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def status(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.state,
+            "sources": self.sources,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "hours_marked": self.hours_marked,
+            "hours_done": self.hours_done,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "errors": self.errors,
+        }
+
+
+_jobs: Dict[str, RebuildJob] = {}
+
+
+def get_rebuild_job(job_id: str) -> Optional[RebuildJob]:
+    return _jobs.get(job_id)
+
+
+def start_rebuild_job(sources: List[str], start_time: Optional[datetime] = None,
+                      end_time: Optional[datetime] = None) -> RebuildJob:
+    job = RebuildJob(sources, start_time, end_time)
+    _jobs[job.job_id] = job
+    job.task = asyncio.create_task(run_rebuild_job(job), name=f"rollup-rebuild-{job.job_id}")
+    server_logger.info("ROLLUPS -- Rebuild job %s started for %s [%s, %s).",
+                       job.job_id, ", ".join(sources), start_time, end_time)
+    return job
+
+
+async def run_rebuild_job(job: RebuildJob):
+    """
+    Marks every hour with readings in the range as dirty, then drains the dirty hours like the
+    scheduled refresh does. Hours marked by the write paths meanwhile are processed too.
+    """
+    job.state = "running"
+    job.started_at = datetime.now()
+    try:
+        async with AsyncSessionLocal() as db:
+            for name in job.sources:
+                job.hours_marked += await db_service.mark_range_dirty(
+                    db, name, SOURCES[name], job.start_time, job.end_time
+                )
+        while True:
+            processed = await refresh_dirty_batch(settings.ROLLUP_BATCH_HOURS)
+            job.hours_done += processed
+            if processed == 0:
+                break
+        # Queries only read the rollups of ranges covered by a completed rebuild
+        async with AsyncSessionLocal() as db:
+            await db_service.record_rebuild(db, uuid.UUID(job.job_id), job.sources, job.start_time,
+                                            job.end_time, datetime.now())
+        job.state = "completed"
+    except Exception as e:
+        server_logger.error("".join(traceback.format_exception(None, e, e.__traceback__)))
+        job.errors.append(str(e))
+        job.state = "failed"
+    finally:
+        job.finished_at = datetime.now()
+    server_logger.info("ROLLUPS -- Rebuild job %s %s: %s", job.job_id, job.state, job.status())
@@ -0,0 +1,149 @@
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.readings.rollups as rollups_service
+import app.readings.service as readings_service
+from app.authentication import api_token
+from app.config import settings
+from app.db.session import get_db
+from app.logs.config_server_logs import server_logger
+from app.readings.buckets import AGGREGATES
+from app.readings.schemas import RollupRebuildRequest
+from app.readings.sources import SOURCES, ReadingSource
+
+router = APIRouter()
+
+# Page size bounds of the JSON format; ndjson and csv stream the whole range
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+
+
+class ReadingsFormat(str, Enum):
+    json = "json"
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+def _naive_utc(dt: datetime) -> datetime:
+    # The timestamp columns are naive: compare them with naive datetimes
+    return dt.astimezone(timezone.utc).replace(tzinfo=None) if dt.tzinfo else dt
+
+
+def _source(source: str, station: str, start: datetime, end: datetime) -> ReadingSource:
+    if source not in SOURCES:
+        raise HTTPException(status_code=404, detail=f"Unknown source {source}. Expected one of {', '.join(SOURCES)}.")
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start.")
+    if source == "davis" and not station.isdigit():
+        raise HTTPException(status_code=400, detail="Davis station must be a numeric station id.")
+    return SOURCES[source]
+
+
+@router.post("/rollups/rebuild", dependencies=[Depends(api_token)])
+async def start_rollup_rebuild(rebuild: RollupRebuildRequest):
+    """
+    Recomputes the hourly and daily rollups of a time range (all the history by default) from the
+    raw readings. Poll GET /readings/rollups/rebuild/{job_id} for progress.
+    """
+    if not settings.ROLLUPS_ENABLED:
+        raise HTTPException(status_code=400, detail="Rollups are disabled (ROLLUPS_ENABLED).")
+    job = rollups_service.start_rebuild_job(
+        rebuild.sources, _naive_utc(rebuild.start_time) if rebuild.start_time else None,
+        _naive_utc(rebuild.end_time) if rebuild.end_time else None,
+    )
+    return job.status()
+
+
+@router.get("/rollups/rebuild/{job_id}", dependencies=[Depends(api_token)])
+async def get_rollup_rebuild(job_id: str):
+    job = rollups_service.get_rebuild_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Rebuild job {job_id} not found.")
+    return job.status()
+
+
+@router.get("/rollups/stats", dependencies=[Depends(api_token)])
+async def get_rollup_stats():
+    """Dirty hours waiting for the refresh job and the last refresh run."""
+    try:
+        return await rollups_service.rollup_stats()
+    except Exception as e:
+        server_logger.error(f"ERROR CODE 500 - Failed to read rollup stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{source}", dependencies=[Depends(api_token)])
+async def get_readings(
+    source: str,
+    station: str,
+    start: datetime,
+    end: datetime,
+    format: ReadingsFormat = ReadingsFormat.json,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Readings of one station in [start, end), ordered by time.
+
+    json returns one page and the cursor of the next one. ndjson and csv stream the whole range
+    from a server-side cursor, for exports.
+    """
+    start, end = _naive_utc(start), _naive_utc(end)
+    reading_source = _source(source, station, start, end)
+
+    if format == ReadingsFormat.ndjson:
+        return StreamingResponse(
+            readings_service.stream_ndjson(reading_source, station, start, end),
+            media_type="application/x-ndjson",
+        )
+    if format == ReadingsFormat.csv:
+        return StreamingResponse(
+            readings_service.stream_csv(reading_source, station, start, end),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{source}_{station}.csv"'},
+        )
+
+    try:
+        return await readings_service.get_readings_page(db, reading_source, station, start, end, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        server_logger.error(f"ERROR CODE 500 - Failed to read {source} readings: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{source}/aggregate", dependencies=[Depends(api_token)])
+async def get_aggregates(
+    source: str,
+    station: str,
+    metric: str,
+    start: datetime,
+    end: datetime,
+    bucket: str = "hour",
+    aggregates: str = ",".join(AGGREGATES),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    min/max/avg/sum/count of one metric per time bucket, over [start, end).
+    `bucket` is a date_trunc unit (minute, hour, day, week, month, year) or a width such as 15m, 6h, 2d;
+    `aggregates` is a comma separated subset of min,max,avg,sum,count.
+    """
+    start, end = _naive_utc(start), _naive_utc(end)
+    _source(source, station, start, end)
+
+    try:
+        return await readings_service.aggregate_readings(
+            db, source, station, metric, bucket,
+            [name.strip() for name in aggregates.split(",") if name.strip()], start, end,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        server_logger.error(f"ERROR CODE 500 - Failed to aggregate {source} readings: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
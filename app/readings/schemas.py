@@ -0,0 +1,22 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+from typing_extensions import Self
+
+from app.readings.sources import SOURCES
+
+
+class RollupRebuildRequest(BaseModel):
+    sources: List[str] = Field(default_factory=lambda: list(SOURCES), description="Sources to rebuild, all by default")
+    start_time: Optional[datetime] = Field(default=None, description="Inclusive, from the first reading by default")
+    end_time: Optional[datetime] = Field(default=None, description="Exclusive, up to the last reading by default")
+
+    @model_validator(mode='after')
+    def check_request(self) -> Self:
+        unknown = [name for name in self.sources if name not in SOURCES]
+        if unknown:
+            raise ValueError(f"Unknown sources {', '.join(unknown)}. Expected some of {', '.join(SOURCES)}.")
+        if self.start_time is not None and self.end_time is not None and self.end_time <= self.start_time:
+            raise ValueError("end_time must be after start_time.")
+        return self
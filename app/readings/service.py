@@ -0,0 +1,173 @@
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Union
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.crud.readings as db_service
+import app.crud.rollups as rollups_db_service
+import app.readings.rollups as rollups_service
+from app.db.session import AsyncSessionLocal
+from app.config import settings
+from app.models.models import ReadingRollupDaily, ReadingRollupHourly
+from app.readings.buckets import AGGREGATES, Bucket, parse_bucket
+from app.readings.sources import SOURCES, ReadingSource
+
+# Upper bound on the buckets of one aggregate query
+MAX_BUCKETS = 10000
+
+# Rollup buckets, like the fixed width buckets, are aligned on the Unix epoch
+EPOCH = datetime(1970, 1, 1)
+
+
+def encode_cursor(last_key: Union[datetime, int]) -> str:
+    """Opaque cursor holding the keyset value (time or epoch) of the last row of a page."""
+    text = last_key.isoformat() if isinstance(last_key, datetime) else str(last_key)
+    return base64.urlsafe_b64encode(text.encode()).decode()
+
+
+def decode_cursor(cursor: str, source: ReadingSource) -> Union[datetime, int]:
+    """
+    :raises ValueError: if the cursor was not produced by encode_cursor for this source
+    """
+    try:
+        text = base64.urlsafe_b64decode(cursor.encode()).decode()
+        return int(text) if source.keyset.type.python_type is int else datetime.fromisoformat(text)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+async def get_readings_page(db: AsyncSession, source: ReadingSource, station: str, start: datetime,
+                            end: datetime, limit: int, cursor: Optional[str] = None) -> dict:
+    """
+    One page of readings. Pages follow each other with a keyset on the time column (the epoch ts
+    for Davis), so deep pages cost the same as the first one.
+
+    :param db:
+    :param source:
+    :param station: sensor serial number, Campbell station name, Davis station id or INSEE id
+    :param start: inclusive
+    :param end: exclusive
+    :param limit: page size
+    :param cursor: next_cursor of the previous page
+    :return: items and the cursor of the next page, None on the last page
+    """
+    after = decode_cursor(cursor, source) if cursor else None
+    items = await db_service.get_readings_page(db, source, station, start, end, limit, after)
+    next_cursor = None
+    if len(items) == limit:
+        next_cursor = encode_cursor(items[-1][source.keyset.key])
+    return {"items": items, "next_cursor": next_cursor}
+
+
+async def _stream_batches(source: ReadingSource, station: str, start: datetime,
+                          end: datetime) -> AsyncIterator[List[dict]]:
+    # The response is streamed after the request dependencies are closed: use a session of our own
+    async with AsyncSessionLocal() as db:
+        async for batch in db_service.stream_readings(db, source, station, start, end):
+            yield batch
+
+
+async def stream_ndjson(source: ReadingSource, station: str, start: datetime, end: datetime) -> AsyncIterator[str]:
+    async for batch in _stream_batches(source, station, start, end):
+        yield "".join(json.dumps(row, default=str) + "\n" for row in batch)
+
+
+async def stream_csv(source: ReadingSource, station: str, start: datetime, end: datetime) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=[column.key for column in source.columns])
+    writer.writeheader()
+    async for batch in _stream_batches(source, station, start, end):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _aligned(dt: datetime, seconds: int) -> bool:
+    return (dt - EPOCH).total_seconds() % seconds == 0
+
+
+def _rollup_model(bucket: Bucket, start: datetime, end: datetime):
+    """
+    The coarsest rollup table the buckets can be computed from exactly: the bucket and the range
+    bounds must fall on its hours or days. None when only the raw readings will do.
+    """
+    if not settings.ROLLUPS_ENABLED:
+        return None
+    for model, seconds in ((ReadingRollupDaily, 86400), (ReadingRollupHourly, 3600)):
+        if bucket.is_multiple_of(seconds) and _aligned(start, seconds) and _aligned(end, seconds):
+            return model
+    return None
+
+
+async def _rollup_freshness(db: AsyncSession, name: str, station: str, start: datetime, end: datetime) -> dict:
+    """
+    What the rollups of one station in [start, end) are worth: they can stand in for the raw readings
+    once a completed rebuild covers the range and no hour of it waits for a refresh.
+    """
+    rebuilt_at = await rollups_db_service.last_rebuild_covering(db, name, start, end)
+    dirty_hours = await rollups_db_service.count_dirty_hours(db, name, station, start, end)
+    return {
+        "rebuilt_at": rebuilt_at,
+        "refreshed_at": rollups_service.last_refresh_at(),
+        "dirty_hours": dirty_hours,
+        "usable": rebuilt_at is not None and dirty_hours == 0,
+    }
+
+
+async def aggregate_readings(db: AsyncSession, name: str, station: str, metric: str,
+                             bucket_spec: str, aggregates: List[str], start: datetime, end: datetime) -> dict:
+    """
+    Downsamples one metric into time buckets in SQL, so charts get one row per bucket instead
+    of the raw readings. Reads the daily or hourly rollups when they hold the answer and are up
+    to date over the range (see _rollup_freshness), the raw table otherwise.
+
+    :param db:
+    :param name: source name in SOURCES
+    :param station:
+    :param metric: a numeric column of the source
+    :param bucket_spec: a date_trunc unit (hour, day, ...) or a width such as 15m, 6h, 2d
+    :param aggregates: subset of min, max, avg, sum, count
+    :param start: inclusive
+    :param end: exclusive
+    :return: the buckets, what they were computed from and, when the range could be read from
+        the rollups, their freshness
+    :raises ValueError: on an unknown metric, aggregate or bucket, or too many buckets
+    """
+    source = SOURCES[name]
+    if metric not in source.metrics:
+        raise ValueError(f"Unknown metric {metric}. Expected one of {', '.join(source.metrics)}.")
+    unknown = [name for name in aggregates if name not in AGGREGATES]
+    if unknown or not aggregates:
+        raise ValueError(f"Invalid aggregates {', '.join(unknown)}. Expected some of {', '.join(AGGREGATES)}.")
+    bucket = parse_bucket(bucket_spec)
+    if (end - start).total_seconds() / bucket.approx_seconds > MAX_BUCKETS:
+        raise ValueError(f"More than {MAX_BUCKETS} {bucket.spec} buckets in range: use a coarser bucket.")
+
+    rollup_model = _rollup_model(bucket, start, end)
+    freshness = None
+    if rollup_model is not None:
+        freshness = await _rollup_freshness(db, name, station, start, end)
+        if not freshness["usable"]:
+            rollup_model = None
+    if rollup_model is not None:
+        buckets = await db_service.get_rollup_aggregates(
+            db, rollup_model, name, source, station, metric, bucket, aggregates, start, end
+        )
+        table = rollup_model.__tablename__
+    else:
+        buckets = await db_service.get_bucket_aggregates(db, source, station, metric, bucket, aggregates, start, end)
+        table = source.model.__tablename__
+    return {
+        "metric": metric,
+        "bucket": bucket.spec,
+        "table": table,
+        "rollup_freshness": freshness,
+        "buckets": buckets,
+    }
@@ -0,0 +1,131 @@
+import math
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import BigInteger, Column, Float, Integer, Select, String, cast, func, literal_column, select
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.models import (
+    BaraniHelixSensors,
+    BaraniWindSensors,
+    CampbellSensors,
+    DavisStation,
+    DavisVantagePro2,
+    MeteoFranceData,
+)
+
+
+def epoch_seconds(dt: datetime) -> int:
+    """Epoch of a naive UTC datetime, rounded up so that a range bound keeps its meaning."""
+    return math.ceil(dt.replace(tzinfo=timezone.utc).timestamp())
+
+
+# Numeric columns that are identifiers, positions or codes rather than measurements
+_NOT_METRICS = {"lsid", "ts", "tz_offset", "lat", "lon", "forecast_rule", "rain_storm_start_date"}
+
+
+class ReadingSource(NamedTuple):
+    """
+    A raw readings table exposed by the read API. Within one station, `time_column` is unique,
+    so it alone is the keyset for pagination, unless the source has an `epoch_column`.
+    Time bounds are naive UTC datetimes.
+    """
+    model: type
+    time_column: Column
+    station_filter: Callable[[str], ColumnElement]
+    station_column: ColumnElement
+    # (table, onclause) to join when the station is not a column of the readings table
+    station_join: Optional[Tuple[type, ColumnElement]] = None
+    # Unique epoch seconds of the reading, when time_column is not in UTC: ranges, the keyset and
+    # time buckets use it
+    epoch_column: Optional[Column] = None
+
+    @property
+    def keyset(self) -> Column:
+        """Column the readings are ordered and paginated on."""
+        return self.epoch_column if self.epoch_column is not None else self.time_column
+
+    @property
+    def utc_time(self) -> ColumnElement:
+        """Time of the reading as a naive UTC timestamp, the clock time buckets are computed on."""
+        if self.epoch_column is not None:
+            return func.timezone(literal_column("'UTC'"), func.to_timestamp(self.epoch_column))
+        return self.time_column
+
+    def time_range(self, start: Optional[datetime], end: Optional[datetime]) -> List[ColumnElement]:
+        """Conditions selecting the readings in [start, end), a None bound being open."""
+        if self.epoch_column is not None:
+            column, start, end = self.epoch_column, start and epoch_seconds(start), end and epoch_seconds(end)
+        else:
+            column = self.time_column
+        conditions = []
+        if start is not None:
+            conditions.append(column >= start)
+        if end is not None:
+            conditions.append(column < end)
+        return conditions
+
+    @property
+    def columns(self) -> List[Column]:
+        return list(self.model.__table__.columns)
+
+    @property
+    def metrics(self) -> List[str]:
+        """Numeric measurement columns, the ones that can be aggregated."""
+        return [
+            column.key for column in self.columns
+            if isinstance(column.type, (Float, Integer, BigInteger))
+            and not column.primary_key and not column.foreign_keys and column.key not in _NOT_METRICS
+        ]
+
+    def select_with_station(self, *columns) -> Select:
+        """SELECT of the station, as text, followed by `columns`."""
+        stmt = select(self.station_column.label("station"), *columns).select_from(self.model)
+        if self.station_join is not None:
+            stmt = stmt.join(*self.station_join)
+        return stmt
+
+
+def _davis_station(station: str) -> ColumnElement:
+    # davis_vantagepro2 has no station column: readings are linked through davis_station
+    return DavisVantagePro2.id.in_(
+        select(DavisStation.vantagepro2_reading).where(DavisStation.station_id == int(station))
+    )
+
+
+SOURCES: Dict[str, ReadingSource] = {
+    "barani_helix": ReadingSource(
+        model=BaraniHelixSensors,
+        time_column=BaraniHelixSensors.timestamp,
+        station_filter=lambda station: BaraniHelixSensors.serial_number == station,
+        station_column=BaraniHelixSensors.serial_number,
+    ),
+    "barani_wind": ReadingSource(
+        model=BaraniWindSensors,
+        time_column=BaraniWindSensors.timestamp,
+        station_filter=lambda station: BaraniWindSensors.serial_number == station,
+        station_column=BaraniWindSensors.serial_number,
+    ),
+    "campbell": ReadingSource(
+        model=CampbellSensors,
+        time_column=CampbellSensors.timestamp,
+        station_filter=lambda station: CampbellSensors.station_name == station,
+        station_column=CampbellSensors.station_name,
+    ),
+    "davis": ReadingSource(
+        model=DavisVantagePro2,
+        time_column=DavisVantagePro2.date,
+        station_filter=_davis_station,
+        station_column=cast(DavisStation.station_id, String),
+        station_join=(DavisStation, DavisStation.vantagepro2_reading == DavisVantagePro2.id),
+        # date is naive local time (fromtimestamp): shifted from UTC, and repeated during the DST
+        # fall-back hour. The epoch ts is neither.
+        epoch_column=DavisVantagePro2.ts,
+    ),
+    "meteofrance": ReadingSource(
+        model=MeteoFranceData,
+        time_column=MeteoFranceData.reference_time,
+        station_filter=lambda station: MeteoFranceData.geo_id_insee == station,
+        station_column=MeteoFranceData.geo_id_insee,
+    ),
+}
@@ -1,9 +1,12 @@
 import traceback
 
-import httpx
 from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from app.campbell.service import run_campbell_scraper
+from app.davis.service import poll_davis_current
+from app.meteofrance.poller import poll_meteofrance_stations, station_ids
+from app.readings.rollups import refresh_dirty_rollups
+from app.db.session import AsyncSessionLocal
 from app.logs.config_server_logs import server_logger
 from app.config import settings
 
@@ -17,30 +20,49 @@ async def scheduled_scraping_task():
     server_logger.info(f"Task done :  {data}")
 
 
-async def call_davis_route():
-    async with httpx.AsyncClient() as client:
-        headers = {
-            'x-api-key': settings.DAVIS_INTERNAL_API_KEY
-        }
-        try:
-            response = await client.get("http://localhost:8000/davis/receive_message/", headers=headers)
-            if response.status_code == 200:
-                server_logger.info("Successfully sent message to external API")
-            else:
-                server_logger.error(f"Failed to send message, status code: {response.status_code}")
-                server_logger.error(f"Response body: {response.text}")  # Logs the error response body
-        except Exception as e:
-                server_logger.error("An error occurred during the scheduled task:")
-                server_logger.error("".join(traceback.format_exception(None, e, e.__traceback__)))
-                server_logger.error(f"Error during Davis scheduled task: {e}")
+async def scheduled_davis_task():
+    """Polls the Davis current conditions in-process, with its own session."""
+    try:
+        async with AsyncSessionLocal() as db:
+            await poll_davis_current(db)
+    except Exception as e:
+        server_logger.error("An error occurred during the scheduled task:")
+        server_logger.error("".join(traceback.format_exception(None, e, e.__traceback__)))
+        server_logger.error(f"Error during Davis scheduled task: {e}")
+
+async def scheduled_meteofrance_task():
+    """Polls the MeteoFrance stations whose next 6-minute observation should be published by now."""
+    try:
+        await poll_meteofrance_stations(due_only=True)
+    except Exception as e:
+        server_logger.error("".join(traceback.format_exception(None, e, e.__traceback__)))
+        server_logger.error(f"Error during MeteoFrance scheduled task: {e}")
+
+async def scheduled_rollup_task():
+    """Recomputes the rollups of the hours written since the last run."""
+    try:
+        await refresh_dirty_rollups()
+    except Exception as e:
+        server_logger.error("".join(traceback.format_exception(None, e, e.__traceback__)))
+        server_logger.error(f"Error during rollup scheduled task: {e}")
 
 def start_scheduler():
     """Start the scheduler and add jobs."""
     if not scheduler.running:
         scheduler.add_job(scheduled_scraping_task, "interval", minutes=settings.SCRAPER_FREQ)
         server_logger.info("Campbell scraper task added to scheduler.")
-        scheduler.add_job(call_davis_route, "interval", minutes=settings.DAVIS_TRIGGER_FREQ)
-        server_logger.info("Davis route task added to scheduler.")
+        scheduler.add_job(scheduled_davis_task, "interval", minutes=settings.DAVIS_TRIGGER_FREQ,
+                          max_instances=1, coalesce=True)
+        server_logger.info("Davis poll task added to scheduler.")
+        if station_ids():
+            # Frequent cheap ticks; each station is only fetched when its schedule says it is due
+            scheduler.add_job(scheduled_meteofrance_task, "interval", seconds=settings.METEOFRANCE_TICK_S,
+                              max_instances=1, coalesce=True)
+            server_logger.info("MeteoFrance poll task added to scheduler.")
+        if settings.ROLLUPS_ENABLED:
+            scheduler.add_job(scheduled_rollup_task, "interval", seconds=settings.ROLLUP_REFRESH_S,
+                              max_instances=1, coalesce=True)
+            server_logger.info("Rollup refresh task added to scheduler.")
         # For debugging:
         # scheduler.add_job(scheduled_task, 'date', id='one_time_job', run_date=None)
 
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import os
+import time
+import traceback
+from typing import Any, Awaitable, Callable, List, Optional
+
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import app.crud.barani_sensors as barani_db_service
+import app.crud.davis_sensors as davis_db_service
+from app.config import settings
+from app.db.session import AsyncSessionLocal
+from app.logs.config_server_logs import server_logger
+
+FlushFunc = Callable[[AsyncSession, List[Any]], Awaitable[Any]]
+
+_STOP = object()
+
+
+class WriteBehindBuffer:
+    """
+    In-process queue in front of a bulk insert. Items are flushed to the DB in one call
+    every `flush_ms` milliseconds or as soon as `flush_rows` items are waiting, whichever comes first.
+
+    A failed flush is retried with exponential backoff before anything queued after it, up to
+    WRITE_BEHIND_RETRIES times; the batch is then spilled to a JSON lines file in
+    WRITE_BEHIND_DEAD_LETTER_DIR, so acknowledged readings are never just dropped.
+    """
+
+    def __init__(self, name: str, flush_func: FlushFunc, flush_ms: int, flush_rows: int, queue_size: int):
+        self.name = name
+        self._flush_func = flush_func
+        self._flush_interval = flush_ms / 1000
+        self._flush_rows = flush_rows
+        self._queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failed_rows = 0
+        self.retries = 0
+        self.dead_lettered_rows = 0
+        self.last_flush_size = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self._queue_size)
+        self._task = asyncio.create_task(self._run(), name=f"write-behind-{self.name}")
+        server_logger.info(f"WRITE-BEHIND -- {self.name} buffer started.")
+
+    async def put(self, item: Any):
+        if not self.running:
+            raise RuntimeError(f"Write-behind buffer '{self.name}' is not running.")
+        await self._queue.put(item)
+
+    async def stop(self):
+        """Flushes everything already queued, retries included, then stops the background task."""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        server_logger.info(f"WRITE-BEHIND -- {self.name} buffer drained and stopped.")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = loop.time() + self._flush_interval
+            stopping = False
+            while len(batch) < self._flush_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+            if stopping:
+                await self._drain()
+                return
+
+    async def _drain(self):
+        batch = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _STOP:
+                batch.append(item)
+            if len(batch) >= self._flush_rows:
+                await self._flush(batch)
+                batch = []
+        if batch:
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Any]):
+        """
+        Writes one batch, retrying in place: the consumer task does nothing else meanwhile,
+        so the batch stays ahead of everything queued after it.
+        """
+        start = time.perf_counter()
+        attempts = settings.WRITE_BEHIND_RETRIES + 1
+        for attempt in range(1, attempts + 1):
+            try:
+                async with AsyncSessionLocal() as db:
+                    await self._flush_func(db, batch)
+                self.flushed_rows += len(batch)
+                break
+            except Exception as e:
+                server_logger.error("WRITE-BEHIND -- %s flush of %d rows failed (attempt %d/%d): %s",
+                                    self.name, len(batch), attempt, attempts, e)
+                if attempt == attempts:
+                    server_logger.error("".join(traceback.format_exception(None, e, e.__traceback__)))
+                    self.failed_rows += len(batch)
+                    await self._dead_letter(batch)
+                    break
+                self.retries += 1
+                delay_ms = min(settings.WRITE_BEHIND_RETRY_BASE_MS * 2 ** (attempt - 1),
+                               settings.WRITE_BEHIND_RETRY_MAX_MS)
+                await asyncio.sleep(delay_ms / 1000)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.flushes += 1
+        self.last_flush_size = len(batch)
+        self.last_flush_ms = round(elapsed_ms, 2)
+        self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+
+    def dead_letter_path(self) -> str:
+        return os.path.join(settings.WRITE_BEHIND_DEAD_LETTER_DIR, f"{self.name}.jsonl")
+
+    async def _dead_letter(self, batch: List[Any]):
+        """Appends the batch to the dead letter file of the buffer, one item per line."""
+        lines = "".join(
+            json.dumps(item.model_dump(mode="json") if isinstance(item, BaseModel) else item, default=str) + "\n"
+            for item in batch
+        )
+        path = self.dead_letter_path()
+
+        def append():
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "a", encoding="utf-8") as file:
+                file.write(lines)
+
+        try:
+            await asyncio.to_thread(append)
+            self.dead_lettered_rows += len(batch)
+            server_logger.error("WRITE-BEHIND -- %s: %d rows spilled to %s", self.name, len(batch), path)
+        except Exception as e:
+            server_logger.error("WRITE-BEHIND -- %s: could not spill %d rows to %s: %s",
+                                self.name, len(batch), path, e)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "failed_rows": self.failed_rows,
+            "retries": self.retries,
+            "dead_lettered_rows": self.dead_lettered_rows,
+            "last_flush_size": self.last_flush_size,
+            "last_flush_ms": self.last_flush_ms,
+            "max_flush_ms": self.max_flush_ms,
+        }
+
+
+def _new_buffer(name: str, flush_func: FlushFunc) -> WriteBehindBuffer:
+    return WriteBehindBuffer(
+        name,
+        flush_func,
+        flush_ms=settings.WRITE_BEHIND_FLUSH_MS,
+        flush_rows=settings.WRITE_BEHIND_FLUSH_ROWS,
+        queue_size=settings.WRITE_BEHIND_QUEUE_SIZE,
+    )
+
+
+helix_buffer = _new_buffer("helix", barani_db_service.bulk_insert_barani_helix_readings)
+wind_buffer = _new_buffer("wind", barani_db_service.bulk_insert_barani_wind_readings)
+davis_buffer = _new_buffer("davis", davis_db_service.bulk_create_davis_sensors)
+
+buffers = (helix_buffer, wind_buffer, davis_buffer)
+
+
+def start_write_behind():
+    """Starts the buffers when write-behind mode is enabled in the settings."""
+    if not settings.WRITE_BEHIND_ENABLED:
+        return
+    for buffer in buffers:
+        buffer.start()
+
+
+async def stop_write_behind():
+    """Drains and stops every running buffer. Called on lifespan shutdown."""
+    for buffer in buffers:
+        await buffer.stop()
+
+
+def write_behind_stats() -> dict:
+    return {
+        "enabled": settings.WRITE_BEHIND_ENABLED,
+        "buffers": {buffer.name: buffer.stats() for buffer in buffers},
+    }
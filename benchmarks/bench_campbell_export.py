@@ -0,0 +1,115 @@
+"""
+Campbell export download: HTTP backend (konect_client) vs Selenium backend.
+
+By default the HTTP backend is timed against a local KonectGDS stub (login form, cookie session,
+CSV export of --rows rows) served on 127.0.0.1, so the figures are client side only: request
+round trips, body download and file write. The Selenium backend drives the real KonectGDS UI and
+cannot be stubbed; --live times both backends against the configured KONECTGDS_URL.
+
+    python -m benchmarks.bench_campbell_export --rows 1000 10000 100000
+    python -m benchmarks.bench_campbell_export --live --runs 3
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from app.campbell import konect_client
+from app.campbell import service as campbell_service
+from app.config import settings
+from app.entities.file_type import FileType
+from app.http_clients import close_http_clients
+
+
+def _csv_export(rows: int) -> bytes:
+    header = '"TIMESTAMP","RECORD","AirTemp_Avg","RH_Avg","WS_ms_Avg","WindDir","Rain_mm_Tot"\n'
+    lines = (f'"2024-05-01 {i // 60 % 24:02d}:{i % 60:02d}:00",{i},18.2,64.1,3.4,212,0\n' for i in range(rows))
+    return (header + "".join(lines)).encode()
+
+
+def _stub_handler(export: bytes):
+    class KonectStubHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: bytes = b"", headers: dict = None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path == settings.KONECTGDS_EXPORT_PATH:
+                if "session=ok" not in self.headers.get("Cookie", ""):
+                    return self._send(302, headers={"Location": settings.KONECTGDS_LOGIN_PATH})
+                return self._send(200, export, {"Content-Type": "text/csv"})
+            self._send(200, b"<html></html>")
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self._send(302, headers={"Location": "/", "Set-Cookie": "session=ok; Path=/"})
+
+    return KonectStubHandler
+
+
+async def _time_download(download, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        path, _ = await download(hourly=True)
+        timings.append(time.perf_counter() - started)
+        os.remove(path)
+    return timings
+
+
+def _report(label: str, timings: list):
+    print(f"{label:<32} median {statistics.median(timings) * 1000:9.1f} ms"
+          f"   min {min(timings) * 1000:9.1f} ms   runs {len(timings)}")
+
+
+async def bench_stub(rows_list: list, runs: int):
+    settings.SCRAPER_FILE_DEST = tempfile.mkdtemp(prefix="bench_campbell_")
+    for rows in rows_list:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _stub_handler(_csv_export(rows)))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        settings.KONECTGDS_URL = f"http://127.0.0.1:{server.server_port}"
+        try:
+            # First run logs in, the next ones reuse the session cookie
+            started = time.perf_counter()
+            path = await konect_client.download_campbell_export(True, FileType.CSV)
+            cold = time.perf_counter() - started
+            os.remove(path)
+            timings = await _time_download(campbell_service.download_with_http, runs)
+        finally:
+            await close_http_clients()
+            server.shutdown()
+        _report(f"http stub, {rows} rows, login", [cold])
+        _report(f"http stub, {rows} rows", timings)
+
+
+async def bench_live(runs: int):
+    _report("http (KonectGDS)", await _time_download(campbell_service.download_with_http, runs))
+    await close_http_clients()
+    _report("selenium (KonectGDS)", await _time_download(campbell_service.download_with_browser, runs))
+    await campbell_service.close_scraper_browser()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--live", action="store_true", help="time both backends against KONECTGDS_URL")
+    args = parser.parse_args()
+    asyncio.run(bench_live(args.runs) if args.live else bench_stub(args.rows, args.runs))
+
+
+if __name__ == "__main__":
+    main()
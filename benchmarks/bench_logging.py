@@ -0,0 +1,88 @@
+"""
+Server logging: queued (queued_logger, records written by a background thread) vs synchronous
+(the same rotating file handler called in the logging thread, as before the pipeline).
+
+Times what the caller, i.e. the event loop, pays per record, then the total including the
+writer draining its queue. Log files go to a temporary folder, usually a fast local disk:
+--slow-flush-us adds a sleep to every flush, to see what a slow or busy disk costs each side.
+
+    python -m benchmarks.bench_logging --records 10000 --json
+    python -m benchmarks.bench_logging --slow-flush-us 200
+"""
+import argparse
+import logging
+import statistics
+import tempfile
+import time
+
+from app.config import settings
+from app.logs import pipeline
+
+
+def _sync_logger(name: str) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.addHandler(pipeline._file_handler(f"{name}.log"))
+    logger.propagate = False
+    return logger
+
+
+def _log(logger: logging.Logger, records: int) -> float:
+    batch = {"rows": 250, "source": "barani_helix"}
+    started = time.perf_counter()
+    for i in range(records):
+        logger.info("HELIX -- Stored batch %d of %d rows from %s", i, batch["rows"], batch["source"])
+        logger.warning("HELIX -- Rejected batch item: %s", ["serial_number", "field required"])
+    return time.perf_counter() - started
+
+
+def _drain():
+    # Stops the listeners after their queues are empty, like the atexit hook
+    pipeline.stop_log_listeners()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=10000, help="logging calls per run, times two")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="JSON-line format instead of plain text")
+    parser.add_argument("--slow-flush-us", type=int, default=0, help="sleep added to every file flush")
+    args = parser.parse_args()
+
+    if args.slow_flush_us:
+        flush = pipeline.SizedTimedRotatingFileHandler.flush
+
+        def slow_flush(handler):
+            time.sleep(args.slow_flush_us / 1e6)
+            flush(handler)
+
+        pipeline.SizedTimedRotatingFileHandler.flush = slow_flush
+
+    settings.LOG_JSON = args.json
+    settings.LOG_MAX_BYTES = 0
+    pipeline.log_dir = tempfile.mkdtemp(prefix="bench_logging_")
+    calls = 2 * args.records
+
+    results = {"synchronous": ([], []), "queued": ([], [])}
+    for run in range(args.runs):
+        sync_logger = _sync_logger(f"bench_sync_{run}")
+        caller = _log(sync_logger, args.records)
+        results["synchronous"][0].append(caller)
+        results["synchronous"][1].append(caller)
+        for handler in sync_logger.handlers:
+            handler.close()
+
+        queued = pipeline.queued_logger(f"bench_queued_{run}", f"bench_queued_{run}.log")
+        started = time.perf_counter()
+        caller = _log(queued, args.records)
+        _drain()
+        results["queued"][0].append(caller)
+        results["queued"][1].append(time.perf_counter() - started)
+
+    for label, (caller, total) in results.items():
+        print(f"{label:<12} caller {statistics.median(caller) / calls * 1e6:7.2f} us/record"
+              f"   total {statistics.median(total) / calls * 1e6:7.2f} us/record   ({calls} records, {args.runs} runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+MeteoFrance "infrahoraire-6m" response parsing: the TypeAdapter (consume_meteofrance_message,
+validating the raw body in one pass) vs the former parser (response.json(), then one model per
+record built field by field with datetime.fromisoformat).
+
+Both parsers run on the same synthetic bodies and must return equal models.
+
+    python -m benchmarks.bench_meteofrance_parsing --records 100 1000 10000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from app.meteofrance.schemas import MeteoFranceInfrahoraireMessage
+from app.meteofrance.utils import consume_meteofrance_message
+
+
+def former_consume_meteofrance_message(content: bytes) -> List[MeteoFranceInfrahoraireMessage]:
+    """The parser consume_meteofrance_message replaced, with the response.json() it was given."""
+    message = json.loads(content)
+    data_list = []
+    for data in message:
+        data_list.append(MeteoFranceInfrahoraireMessage(
+            lat=data.get("lat"),
+            lon=data.get("lon"),
+            geo_id_insee=data.get("geo_id_insee"),
+            reference_time=datetime.fromisoformat(data.get("reference_time")),
+            insert_time=datetime.fromisoformat(data.get("insert_time")),
+            validity_time=datetime.fromisoformat(data.get("validity_time")),
+            t=data.get("t"),
+            td=data.get("td"),
+            u=data.get("u"),
+            dd=data.get("dd"),
+            ff=data.get("ff"),
+            dxi10=data.get("dxi10"),
+            fxi10=data.get("fxi10"),
+            rr_per=data.get("rr_per"),
+            t_10=data.get("t_10"),
+            t_20=data.get("t_20"),
+            t_50=data.get("t_50"),
+            t_100=data.get("t_100"),
+            vv=data.get("vv"),
+            etat_sol=data.get("etat_sol"),
+            sss=data.get("sss"),
+            insolh=data.get("insolh"),
+            ray_glo01=data.get("ray_glo01"),
+            pres=data.get("pres"),
+            pmer=data.get("pmer"),
+        ))
+    return data_list
+
+
+def response_body(records: int) -> bytes:
+    rand = random.Random(records)
+    start = datetime(2024, 5, 1)
+    body = []
+    for i in range(records):
+        reference_time = (start + timedelta(minutes=6 * i)).isoformat() + "Z"
+        body.append({
+            "lat": 41.92, "lon": 8.79, "geo_id_insee": "20004002",
+            "reference_time": reference_time, "insert_time": reference_time, "validity_time": reference_time,
+            "t": round(rand.uniform(270, 305), 1), "td": round(rand.uniform(265, 295), 1),
+            "u": rand.randint(20, 100), "dd": rand.randint(0, 359), "ff": round(rand.uniform(0, 20), 1),
+            "dxi10": rand.choice([None, rand.randint(0, 359)]), "fxi10": rand.choice([None, round(rand.uniform(0, 30), 1)]),
+            "rr_per": round(rand.uniform(0, 3), 1),
+            "t_10": 290.1, "t_20": 289.8, "t_50": 288.4, "t_100": 287.9,
+            "vv": rand.randint(1000, 50000), "etat_sol": rand.choice([None, "0", "1"]),
+            "sss": 0, "insolh": rand.randint(0, 6), "ray_glo01": rand.randint(0, 300000),
+            "pres": rand.randint(98000, 103000), "pmer": rand.randint(99000, 104000),
+        })
+    return json.dumps(body).encode()
+
+
+def _time(parse, content: bytes, runs: int) -> List[float]:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        parse(content)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _report(label: str, timings: List[float]):
+    print(f"{label:<32} median {statistics.median(timings) * 1000:9.2f} ms"
+          f"   min {min(timings) * 1000:9.2f} ms   runs {len(timings)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    for records in args.records:
+        content = response_body(records)
+        assert consume_meteofrance_message(content) == former_consume_meteofrance_message(content)
+        former = _time(former_consume_meteofrance_message, content, args.runs)
+        adapter = _time(consume_meteofrance_message, content, args.runs)
+        _report(f"former parser, {records} records", former)
+        _report(f"TypeAdapter, {records} records", adapter)
+        print(f"{'speedup':<32} x{statistics.median(former) / statistics.median(adapter):.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import asyncio
+import os
+
+import asyncpg.exceptions
+import pytest
+from asyncpg.exceptions import ForeignKeyViolationError
+from sqlalchemy.exc import IntegrityError
+
+import app.campbell.inbox as inbox
+from app.campbell.inbox import InboxWatcher
+
+
+@pytest.fixture
+def watcher(monkeypatch, tmp_path):
+    monkeypatch.setattr(inbox.settings, "CAMPBELL_INBOX_SETTLE_S", 0)
+    monkeypatch.setattr(inbox.settings, "CAMPBELL_INBOX_RETRY_BASE_S", 0.01)
+    monkeypatch.setattr(inbox.settings, "CAMPBELL_INBOX_RETRY_MAX_S", 0.05)
+    watcher = InboxWatcher(tmp_path / "inbox", tmp_path / "archive", tmp_path / "quarantine", concurrency=2)
+    for folder in (watcher.inbox_dir, watcher.archive_dir, watcher.quarantine_dir):
+        folder.mkdir()
+    watcher._semaphore = asyncio.Semaphore(2)
+    watcher._stopping = asyncio.Event()
+    return watcher
+
+
+def loader(monkeypatch, *errors):
+    """process_campbell_file raising `errors` in turn, then loading the file."""
+    remaining = list(errors)
+
+    async def process_campbell_file(file, file_type):
+        if remaining:
+            raise remaining.pop(0)
+        return {"inserted": 1}
+
+    monkeypatch.setattr(inbox, "process_campbell_file", process_campbell_file)
+
+
+def drop(watcher: InboxWatcher, name: str = "export.csv"):
+    path = watcher.inbox_dir / name
+    path.write_text('"TIMESTAMP"\n')
+    return path
+
+
+@pytest.mark.anyio
+async def test_database_error_leaves_the_file_in_the_inbox_and_retries(watcher, monkeypatch):
+    loader(monkeypatch, ConnectionError("database unavailable"), OSError("disk busy"))
+    path = drop(watcher)
+
+    await watcher._ingest(path)
+
+    assert not path.exists()
+    assert (watcher.archive_dir / path.name).exists()
+    assert (watcher.retries, watcher.loaded, watcher.quarantined) == (2, 1, 0)
+
+
+@pytest.mark.anyio
+async def test_invalid_file_is_quarantined(watcher, monkeypatch):
+    loader(monkeypatch, ValueError("time data 'x' does not match format"))
+    path = drop(watcher)
+
+    await watcher._ingest(path)
+
+    assert (watcher.quarantine_dir / path.name).exists()
+    assert (watcher.retries, watcher.loaded, watcher.quarantined) == (0, 0, 1)
+
+
+@pytest.mark.anyio
+async def test_value_rejected_by_the_copy_is_quarantined(watcher, monkeypatch):
+    loader(monkeypatch, asyncpg.exceptions.NumericValueOutOfRangeError("numeric field overflow"))
+    path = drop(watcher)
+
+    await watcher._ingest(path)
+
+    assert (watcher.quarantine_dir / path.name).exists()
+    assert (watcher.retries, watcher.loaded, watcher.quarantined) == (0, 0, 1)
+
+
+@pytest.mark.anyio
+async def test_integrity_error_is_retried_not_quarantined(watcher, monkeypatch):
+    missing_station = ForeignKeyViolationError('insert violates foreign key constraint "campbell_station_fk"')
+    loader(monkeypatch, IntegrityError("INSERT INTO campbell_capu_di_muru ...", None, missing_station))
+    path = drop(watcher)
+
+    await watcher._ingest(path)
+
+    assert (watcher.archive_dir / path.name).exists()
+    assert (watcher.retries, watcher.loaded, watcher.quarantined) == (1, 1, 0)
+
+
+@pytest.mark.anyio
+async def test_stop_leaves_a_file_waiting_for_retry_in_the_inbox(watcher, monkeypatch):
+    monkeypatch.setattr(inbox.settings, "CAMPBELL_INBOX_RETRY_BASE_S", 60)
+    monkeypatch.setattr(inbox.settings, "CAMPBELL_INBOX_RETRY_MAX_S", 60)
+    loader(monkeypatch, ConnectionError("database unavailable"))
+    path = drop(watcher)
+
+    ingest = asyncio.create_task(watcher._ingest(path))
+    await asyncio.sleep(0.05)
+    watcher._stopping.set()
+    await asyncio.wait_for(ingest, timeout=1)
+
+    assert path.exists()
+    assert path not in watcher._pending
+
+
+@pytest.mark.anyio
+async def test_file_that_cannot_be_moved_is_not_loaded_again(watcher, monkeypatch):
+    loader(monkeypatch)
+    path = drop(watcher)
+
+    def move(path, folder):
+        raise PermissionError("read-only inbox")
+
+    monkeypatch.setattr(watcher, "_move", move)
+    await watcher._ingest(path)
+    watcher._schedule({path})
+
+    assert watcher.loaded == 1
+    assert not watcher._pending
+    assert str(path) in watcher.stats()["unmovable"]
+
+    # A new file under the same name is loaded
+    path.write_text('"TIMESTAMP"\n"2024-05-01 10:00"\n')
+    os.utime(path, ns=(0, 10 ** 18))
+    watcher._schedule({path})
+    assert path in watcher._pending
+    await asyncio.gather(*watcher._ingests)
@@ -0,0 +1,42 @@
+from sqlalchemy.dialects import postgresql
+
+from app.crud.davis_sensors import davis_observation_statement
+from app.davis.alignment import align_historic_sensors
+from app.davis.schemas import DavisMessage
+
+
+def test_sample_without_barometer_is_kept():
+    vantages = [{"ts": 1000}, {"ts": 2000}]
+    gateways = [{"ts": 900}]
+    barometers = [{"ts": 1010}]
+
+    result = align_historic_sensors(vantages, gateways, barometers, barometer_tolerance=300)
+
+    assert [sample.vantagepro2["ts"] for sample in result.samples] == [1000, 2000]
+    assert result.samples[0].barometer == {"ts": 1010}
+    assert result.samples[1].barometer is None
+    assert result.missing_barometer == 1
+    assert result.missing_gateway == 0
+
+
+def test_samples_without_gateway_are_kept():
+    result = align_historic_sensors([{"ts": 1000}, {"ts": 2000}], [], [{"ts": 1000}, {"ts": 2000}])
+
+    assert len(result.samples) == 2
+    assert all(sample.gateway is None for sample in result.samples)
+    assert result.missing_gateway == 2
+
+
+def test_observation_statement_links_null_barometer_and_gateway():
+    message = DavisMessage.model_validate({
+        "station_id_uuid": "uuid",
+        "generated_at": 1000,
+        "station_id": 1,
+        "vantagePro_msg": {"lsid": 1, "sensor_type": 23, "data_structure_type": 24, "ts": 1000, "tz_offset": 0},
+    })
+
+    sql = str(davis_observation_statement(message).compile(dialect=postgresql.dialect()))
+
+    assert "davis_barometer" not in sql
+    assert "davis_gatewayquectel" not in sql
+    assert "INSERT INTO davis_station" in sql
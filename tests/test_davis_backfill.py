@@ -0,0 +1,102 @@
+import pytest
+
+import app.davis.backfill as backfill
+from app.davis.backfill import BackfillJob, is_covered, run_backfill_job, split_windows
+
+DAY = 86400
+
+
+def test_windows_fall_on_utc_days():
+    assert split_windows(DAY + 3600, 3 * DAY + 60) == [
+        (DAY + 3600, 2 * DAY), (2 * DAY, 3 * DAY), (3 * DAY, 3 * DAY + 60),
+    ]
+    assert split_windows(DAY, 3 * DAY) == [(DAY, 2 * DAY), (2 * DAY, 3 * DAY)]
+    assert split_windows(DAY + 10, DAY + 20) == [(DAY + 10, DAY + 20)]
+
+
+def test_overlapping_jobs_share_their_whole_days():
+    first = set(split_windows(DAY + 3600, 5 * DAY))
+    second = set(split_windows(2 * DAY + 7200, 6 * DAY))
+
+    assert {(2 * DAY, 3 * DAY), (3 * DAY, 4 * DAY), (4 * DAY, 5 * DAY)} <= first
+    assert {(3 * DAY, 4 * DAY), (4 * DAY, 5 * DAY)} <= second
+
+
+def test_window_is_covered_by_the_union_of_completed_windows():
+    # Windows of an older job, not aligned on days
+    completed = [(DAY - 500, 2 * DAY - 500), (2 * DAY - 500, 3 * DAY - 500)]
+
+    assert is_covered(DAY, 2 * DAY, completed)
+    assert is_covered(2 * DAY, 3 * DAY - 500, completed)
+    assert not is_covered(2 * DAY, 3 * DAY, completed)
+    assert not is_covered(DAY - 600, DAY, completed)
+    assert not is_covered(DAY, 2 * DAY, [(DAY, DAY + 10), (DAY + 20, 2 * DAY)])
+    assert not is_covered(DAY, 2 * DAY, [])
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+@pytest.fixture
+def backfill_calls(monkeypatch):
+    calls = {"fetched": [], "marked": []}
+
+    async def fetch_davis_historic(client, start, end):
+        calls["fetched"].append((start, end))
+        return {}
+
+    async def ingest_davis_historic(db, response_data):
+        return {"inserted": 2, "duplicates": 0, "missing_gateway": 1, "missing_barometer": 0}
+
+    async def mark_backfill_window_completed(db, start, end, counts):
+        calls["marked"].append((start, end))
+
+    async def get_completed_backfill_windows(db, start, end):
+        return [(DAY, 2 * DAY)]
+
+    monkeypatch.setattr(backfill, "AsyncSessionLocal", FakeSession)
+    monkeypatch.setattr(backfill, "get_http_client", lambda name: None)
+    monkeypatch.setattr(backfill.davis_service, "fetch_davis_historic", fetch_davis_historic)
+    monkeypatch.setattr(backfill.davis_service, "ingest_davis_historic", ingest_davis_historic)
+    monkeypatch.setattr(backfill.db_service, "mark_backfill_window_completed", mark_backfill_window_completed)
+    monkeypatch.setattr(backfill.db_service, "get_completed_backfill_windows", get_completed_backfill_windows)
+    return calls
+
+
+def table_ready(monkeypatch, ready: bool):
+    async def backfill_window_table_ready(db):
+        return ready
+
+    monkeypatch.setattr(backfill.db_service, "backfill_window_table_ready", backfill_window_table_ready)
+
+
+@pytest.mark.anyio
+async def test_backfill_runs_without_the_window_table(monkeypatch, backfill_calls):
+    table_ready(monkeypatch, False)
+    job = BackfillJob(DAY, 3 * DAY)
+
+    await run_backfill_job(job)
+
+    assert job.state == "completed"
+    assert job.status()["resume_tracking"] is False
+    assert backfill_calls["fetched"] == [(DAY, 2 * DAY), (2 * DAY, 3 * DAY)]
+    assert backfill_calls["marked"] == []
+    assert (job.rows_inserted, job.missing_gateway) == (4, 2)
+
+
+@pytest.mark.anyio
+async def test_backfill_skips_and_records_windows_with_the_table(monkeypatch, backfill_calls):
+    table_ready(monkeypatch, True)
+    job = BackfillJob(DAY, 3 * DAY)
+
+    await run_backfill_job(job)
+
+    assert job.state == "completed"
+    assert backfill_calls["fetched"] == [(2 * DAY, 3 * DAY)]
+    assert backfill_calls["marked"] == [(2 * DAY, 3 * DAY)]
+    assert job.windows_skipped == 1
@@ -0,0 +1,116 @@
+import math
+import random
+
+import metpy.calc as mpcalc
+import pytest
+from metpy.units import units
+
+import app.davis.conversions as conversions
+from app.davis.conversions import Converter
+
+
+# The pint/metpy conversions the arithmetic kernels replaced, as they were in app/davis/utils.py
+
+def reference_inhg_to_mmhg(pressure_in, to_round=False):
+    if pressure_in:
+        if to_round:
+            return round(float(pressure_in * 25.4))
+        return float(pressure_in * 25.4)
+    return None
+
+
+def reference_fahrenheit_to_celsius(temperature_f, to_round=False):
+    if temperature_f is None:
+        return None
+    elif to_round:
+        return round((temperature_f * units.degF).to(units.degC).magnitude)
+    elif type(temperature_f) is float:
+        return float((temperature_f * units.degF).to(units.degC).magnitude)
+    elif type(temperature_f) is int:
+        return round((temperature_f * units.degF).to(units.degC).magnitude)
+
+
+def reference_direction_to_angle(wind_dir_d):
+    if type(wind_dir_d) is int:
+        return wind_dir_d
+    elif type(wind_dir_d) is str:
+        return round(mpcalc.parse_angle(wind_dir_d).magnitude)
+    return None
+
+
+def reference_integer_to_angle(wind_dir):
+    if wind_dir is None:
+        return None
+    return reference_direction_to_angle(list(conversions.COMPASS_ANGLES)[wind_dir])
+
+
+def reference_mph_to_kmh(mph_val):
+    if mph_val:
+        return round((mph_val * units.mph).to(units.km / units.hour).magnitude)
+    return None
+
+
+def reference_in_to_mm(in_val):
+    if in_val:
+        return (in_val * units.inch).to(units.mm).magnitude
+    return None
+
+
+_random = random.Random(8)
+EDGE_CASES = [None, math.nan, 0, 0.0, -0.0, 1, -1, 0.5, -0.5]
+PRESSURES = EDGE_CASES + [28.0, 29.92, 30.5, -0.04, 0.06] + [round(_random.uniform(-1, 32), 3) for _ in range(500)]
+TEMPERATURES = EDGE_CASES + [-40, -40.0, 32, 32.0, 212, 98.6, 33.8] + \
+    [round(_random.uniform(-60, 140), 1) for _ in range(500)] + [_random.randint(-60, 140) for _ in range(200)]
+SPEEDS = EDGE_CASES + [_random.randint(0, 120) for _ in range(300)] + [round(_random.uniform(0, 120), 1) for _ in range(200)]
+LENGTHS = EDGE_CASES + [0.01, 0.1, 3] + [round(_random.uniform(0, 10), 2) for _ in range(500)] + list(range(20))
+DIRECTIONS = [None, 0, 90, 359] + list(conversions.COMPASS_ANGLES) + ["north", "nne", "Sw", "not a direction"]
+DIRECTION_CODES = [None] + list(range(16))
+
+# Every Converter of app/davis/conversions.py, with its reference and the inputs it is checked on
+CASES = {
+    "INHG_TO_MMHG": (reference_inhg_to_mmhg, PRESSURES),
+    "INHG_TO_MMHG_ROUNDED": (lambda value: reference_inhg_to_mmhg(value, to_round=True), PRESSURES),
+    "FAHRENHEIT_TO_CELSIUS": (reference_fahrenheit_to_celsius, TEMPERATURES),
+    "FAHRENHEIT_TO_CELSIUS_ROUNDED": (lambda value: reference_fahrenheit_to_celsius(value, to_round=True), TEMPERATURES),
+    "MPH_TO_KMH": (reference_mph_to_kmh, SPEEDS),
+    "IN_TO_MM": (reference_in_to_mm, LENGTHS),
+    "DIRECTION_TO_ANGLE": (reference_direction_to_angle, DIRECTIONS),
+    "INTEGER_TO_ANGLE": (reference_integer_to_angle, DIRECTION_CODES),
+}
+
+
+def outcome(convert, value):
+    """The converted value and its type, or the exception raised (round() of NaN)."""
+    try:
+        result = convert(value)
+    except Exception as e:
+        return "raises", type(e)
+    if isinstance(result, float) and math.isnan(result):
+        return "nan", float
+    return result, type(result)
+
+
+def test_every_converter_is_checked():
+    declared = {name for name, value in vars(conversions).items() if isinstance(value, Converter)}
+    assert declared == set(CASES)
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_scalar_matches_pint(name):
+    reference, values = CASES[name]
+    converter = getattr(conversions, name)
+    for value in values:
+        assert outcome(converter.scalar, value) == outcome(reference, value), value
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_column_matches_scalar(name):
+    reference, values = CASES[name]
+    converter = getattr(conversions, name)
+    converted = [value for value in values if outcome(reference, value)[0] != "raises"]
+    assert [outcome(lambda v: v, v) for v in converter.column(converted)] == \
+        [outcome(reference, value) for value in converted]
+    # Values the scalar form rejects fail the whole column the same way
+    for value in values:
+        if outcome(reference, value)[0] == "raises":
+            assert outcome(converter.column, [value]) == outcome(reference, value), value
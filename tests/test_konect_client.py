@@ -0,0 +1,97 @@
+from datetime import datetime
+
+import httpx
+import pytest
+
+import app.campbell.konect_client as konect_client
+from app.entities.file_type import FileType
+
+BASE_URL = "http://konectgds.test"
+CSV_EXPORT = b'"TIMESTAMP","AirTemp_Avg"\n"2024-05-01 10:00:00",18.2\n'
+
+
+class KonectStub:
+    """KonectGDS as the HTTP backend expects it: a cookie session, a login form and a CSV export."""
+
+    def __init__(self, password: str = "password"):
+        self.password = password
+        self.requests = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append((request.method, request.url.path, dict(request.url.params)))
+        logged_in = "session=ok" in request.headers.get("cookie", "")
+
+        if request.url.path == "/Account/Login":
+            if request.method == "GET":
+                return httpx.Response(200, text="<form>login</form>")
+            form = dict(httpx.QueryParams(request.content.decode()))
+            if form.get("PassportID") == "user" and form.get("Password") == self.password:
+                return httpx.Response(302, headers={"location": "/", "set-cookie": "session=ok; Path=/"})
+            return httpx.Response(302, headers={"location": "/Account/Login"})
+
+        if request.url.path == "/TableQuery/Export":
+            if not logged_in:
+                return httpx.Response(302, headers={"location": "/Account/Login?ReturnUrl=%2FTableQuery%2FExport"})
+            return httpx.Response(200, content=CSV_EXPORT, headers={"content-type": "text/csv"})
+
+        return httpx.Response(200, text="home")
+
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    def install(server: KonectStub):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(server.handler))
+        monkeypatch.setattr(konect_client, "get_http_client", lambda name: client)
+        return client
+
+    monkeypatch.setattr(konect_client.settings, "KONECTGDS_URL", BASE_URL)
+    monkeypatch.setattr(konect_client.settings, "KONECTGDS_USERNAME", "user")
+    monkeypatch.setattr(konect_client.settings, "KONECTGDS_PASSWORD", "password")
+    monkeypatch.setattr(konect_client.settings, "KONECTGDS_LOGIN_PATH", "/Account/Login")
+    monkeypatch.setattr(konect_client.settings, "KONECTGDS_EXPORT_PATH", "/TableQuery/Export")
+    monkeypatch.setattr(konect_client.settings, "SCRAPER_FILE_DEST", str(tmp_path))
+    return install
+
+
+@pytest.mark.anyio
+async def test_export_logs_in_then_writes_the_csv(stub):
+    server = KonectStub()
+    client = stub(server)
+
+    path = await konect_client.download_campbell_export(True, FileType.CSV, since=datetime(2024, 5, 1, 9))
+    await client.aclose()
+
+    with open(path, "rb") as file:
+        assert file.read() == CSV_EXPORT
+    methods_and_paths = [(method, path) for method, path, _ in server.requests]
+    assert methods_and_paths == [
+        ("GET", "/TableQuery/Export"), ("GET", "/Account/Login"),
+        ("POST", "/Account/Login"), ("GET", "/"),
+        ("GET", "/TableQuery/Export"),
+    ]
+    export_params = server.requests[-1][2]
+    assert export_params["query"] == konect_client.HOURLY_QUERY
+    assert export_params["format"] == "csv"
+    assert "from" in export_params and "to" in export_params
+
+
+@pytest.mark.anyio
+async def test_session_is_reused_by_the_next_export(stub):
+    server = KonectStub()
+    client = stub(server)
+
+    await konect_client.download_campbell_export(False, FileType.CSV)
+    server.requests.clear()
+    await konect_client.download_campbell_export(False, FileType.CSV)
+    await client.aclose()
+
+    assert [(method, path) for method, path, _ in server.requests] == [("GET", "/TableQuery/Export")]
+
+
+@pytest.mark.anyio
+async def test_rejected_login_raises(stub):
+    client = stub(KonectStub(password="another"))
+
+    with pytest.raises(konect_client.KonectLoginError):
+        await konect_client.download_campbell_export(True, FileType.CSV)
+    await client.aclose()
@@ -0,0 +1,27 @@
+import logging
+import queue
+
+from app.logs.pipeline import _DeferredQueueHandler
+
+
+def enqueue(msg, *args) -> logging.LogRecord:
+    log_queue = queue.SimpleQueue()
+    handler = _DeferredQueueHandler(log_queue)
+    handler.handle(logging.LogRecord("test", logging.INFO, __file__, 1, msg, args, None))
+    return log_queue.get_nowait()
+
+
+def test_mutable_arguments_are_formatted_when_logged():
+    batch = [1, 2]
+    record = enqueue("batch %s of %d rows", batch, 2)
+    batch.append(3)
+
+    assert record.getMessage() == "batch [1, 2] of 2 rows"
+    assert record.args is None
+
+
+def test_immutable_arguments_are_left_to_the_writer():
+    record = enqueue("HELIX -- Rejected %s after %.1f s", "SN-1", 0.5)
+
+    assert record.args == ("SN-1", 0.5)
+    assert record.getMessage() == "HELIX -- Rejected SN-1 after 0.5 s"
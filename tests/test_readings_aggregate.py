@@ -0,0 +1,85 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+import app.crud.readings as crud_readings
+import app.readings.service as readings_service
+from app.models.models import ReadingRollupDaily
+from app.readings.buckets import rollup_aggregate_expressions
+from app.readings.sources import SOURCES
+
+START = datetime(2024, 5, 1)
+END = datetime(2024, 5, 8)
+
+
+@pytest.fixture
+def rollup_state(monkeypatch):
+    state = {"rebuilt_at": datetime(2024, 6, 1), "dirty_hours": 0}
+
+    async def last_rebuild_covering(db, source, start, end):
+        return state["rebuilt_at"]
+
+    async def count_dirty_hours(db, source=None, station=None, start=None, end=None):
+        return state["dirty_hours"]
+
+    async def get_rollup_aggregates(*args):
+        return [{"from": "rollup"}]
+
+    async def get_bucket_aggregates(*args):
+        return [{"from": "raw"}]
+
+    monkeypatch.setattr(readings_service.settings, "ROLLUPS_ENABLED", True)
+    monkeypatch.setattr(readings_service.rollups_db_service, "last_rebuild_covering", last_rebuild_covering)
+    monkeypatch.setattr(readings_service.rollups_db_service, "count_dirty_hours", count_dirty_hours)
+    monkeypatch.setattr(crud_readings, "get_rollup_aggregates", get_rollup_aggregates)
+    monkeypatch.setattr(crud_readings, "get_bucket_aggregates", get_bucket_aggregates)
+    return state
+
+
+async def aggregate():
+    return await readings_service.aggregate_readings(None, "davis", "1", "temp_out", "day", ["min", "max"], START, END)
+
+
+@pytest.mark.anyio
+async def test_rebuilt_and_refreshed_range_reads_the_rollups(rollup_state):
+    result = await aggregate()
+
+    assert result["table"] == "reading_rollup_daily"
+    assert result["buckets"] == [{"from": "rollup"}]
+    assert result["rollup_freshness"]["rebuilt_at"] == datetime(2024, 6, 1)
+    assert result["rollup_freshness"]["usable"] is True
+
+
+@pytest.mark.anyio
+async def test_range_without_a_completed_rebuild_reads_the_raw_readings(rollup_state):
+    rollup_state["rebuilt_at"] = None
+
+    result = await aggregate()
+
+    assert result["table"] == "davis_vantagepro2"
+    assert result["buckets"] == [{"from": "raw"}]
+    assert result["rollup_freshness"]["usable"] is False
+
+
+@pytest.mark.anyio
+async def test_range_with_dirty_hours_reads_the_raw_readings(rollup_state):
+    rollup_state["dirty_hours"] = 3
+
+    result = await aggregate()
+
+    assert result["table"] == "davis_vantagepro2"
+    assert result["rollup_freshness"]["dirty_hours"] == 3
+
+
+def test_rollup_min_and_max_keep_the_metric_type():
+    source = SOURCES["davis"]
+    columns = source.model.__table__.columns
+    integer_metric = next(metric for metric in source.metrics if columns[metric].type.python_type is int)
+
+    expressions = rollup_aggregate_expressions(ReadingRollupDaily, ["min", "max"], columns[integer_metric].type)
+    sql = str(select(*expressions).compile(dialect=postgresql.dialect()))
+
+    assert "CAST(min(reading_rollup_daily.min) AS INTEGER)" in sql
+    assert "CAST(max(reading_rollup_daily.max) AS INTEGER)" in sql
@@ -0,0 +1,95 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+import app.readings.service as readings_service
+from app.readings.buckets import Bucket, aggregate_expressions, parse_bucket
+from app.readings.sources import SOURCES
+
+
+def compile_sql(*columns) -> str:
+    return str(select(*columns).compile(dialect=postgresql.dialect()))
+
+
+@pytest.mark.parametrize("spec, bucket", [
+    ("hour", Bucket(spec="hour", unit="hour")),
+    (" Day ", Bucket(spec="day", unit="day")),
+    ("15m", Bucket(spec="15m", width_s=900)),
+    ("6h", Bucket(spec="6h", width_s=21600)),
+    ("2d", Bucket(spec="2d", width_s=172800)),
+])
+def test_parse_bucket(spec, bucket):
+    assert parse_bucket(spec) == bucket
+
+
+@pytest.mark.parametrize("spec", ["0m", "0d", "15", "m", "15s", "-1h", "1.5h", "fortnight", ""])
+def test_parse_bucket_rejects(spec):
+    with pytest.raises(ValueError):
+        parse_bucket(spec)
+
+
+def test_is_multiple_of():
+    assert parse_bucket("2h").is_multiple_of(3600)
+    assert not parse_bucket("90m").is_multiple_of(3600)
+    assert parse_bucket("2d").is_multiple_of(86400)
+    assert not parse_bucket("6h").is_multiple_of(86400)
+    assert parse_bucket("day").is_multiple_of(86400)
+    assert parse_bucket("month").is_multiple_of(86400)
+    assert not parse_bucket("minute").is_multiple_of(3600)
+
+
+def test_calendar_bucket_is_an_inlined_date_trunc():
+    time_column = SOURCES["barani_helix"].utc_time
+    sql = compile_sql(parse_bucket("week").expression(time_column))
+
+    assert sql.startswith("SELECT date_trunc('week', barani_helix_sensors.timestamp)")
+    assert "%(" not in sql
+
+
+def test_fixed_width_bucket_is_binned_on_the_epoch():
+    time_column = SOURCES["barani_helix"].utc_time
+    sql = compile_sql(parse_bucket("15m").expression(time_column))
+
+    assert ("timezone('UTC', to_timestamp(floor(EXTRACT(epoch FROM barani_helix_sensors.timestamp) "
+            "/ CAST(900 AS NUMERIC)) * 900))"
+            in sql)
+    assert "%(" not in sql
+
+
+def test_davis_is_bucketed_on_ts_in_utc():
+    # davis_vantagepro2.date is local time: buckets are computed from the epoch instead
+    sql = compile_sql(parse_bucket("hour").expression(SOURCES["davis"].utc_time))
+
+    assert "date_trunc('hour', timezone('UTC', to_timestamp(davis_vantagepro2.ts)))" in sql
+    assert "davis_vantagepro2.date" not in sql
+
+
+def test_aggregate_expressions():
+    metric = SOURCES["barani_helix"].model.__table__.columns["temperature"]
+    sql = compile_sql(*aggregate_expressions(metric, ["min", "avg", "count"]))
+
+    assert "min(barani_helix_sensors.temperature) AS min" in sql
+    assert "CAST(avg(barani_helix_sensors.temperature) AS FLOAT) AS avg" in sql
+    assert "count(barani_helix_sensors.temperature) AS count" in sql
+
+
+@pytest.mark.anyio
+async def test_too_many_buckets_are_refused():
+    start, end = datetime(2024, 1, 1), datetime(2024, 3, 1)
+
+    # 60 days of minutes is 86400 buckets, over MAX_BUCKETS
+    with pytest.raises(ValueError, match="buckets in range"):
+        await readings_service.aggregate_readings(None, "barani_helix", "SN", "temperature", "minute",
+                                                  ["avg"], start, end)
+
+
+@pytest.mark.anyio
+async def test_unknown_metric_and_aggregate_are_refused():
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 2)
+
+    with pytest.raises(ValueError, match="Unknown metric"):
+        await readings_service.aggregate_readings(None, "barani_helix", "SN", "timestamp", "hour", ["avg"], start, end)
+    with pytest.raises(ValueError, match="Invalid aggregates"):
+        await readings_service.aggregate_readings(None, "barani_helix", "SN", "temperature", "hour", ["p99"], start, end)
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+import app.crud.readings as crud_readings
+import app.readings.service as readings_service
+from app.readings.router import _naive_utc
+from app.readings.sources import SOURCES
+
+START = datetime(2024, 10, 27)
+END = datetime(2024, 10, 28)
+# Europe/Paris falls back at 03:00 local: both readings are stored with date 02:30
+FALL_BACK_ROWS = [
+    {"ts": 1729989000, "date": datetime(2024, 10, 27, 2, 30)},
+    {"ts": 1729992600, "date": datetime(2024, 10, 27, 2, 30)},
+]
+
+
+class KeysetSession:
+    """Applies the keyset of a readings query to FALL_BACK_ROWS, the way the database would."""
+
+    async def execute(self, stmt):
+        # ts_1 and ts_2 are the range bounds, ts_3 the cursor
+        after = stmt.compile().params.get("ts_3")
+        rows = [row for row in FALL_BACK_ROWS if after is None or row["ts"] > after][:stmt._limit]
+        return FakeResult(rows)
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def mappings(self):
+        return self.rows
+
+
+def test_davis_readings_are_paginated_on_ts():
+    stmt = crud_readings.readings_query(SOURCES["davis"], "1", START, END, after=1729989000)
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+    assert "davis_vantagepro2.ts > " in sql
+    assert sql.endswith("ORDER BY davis_vantagepro2.ts")
+
+
+def test_davis_range_is_filtered_on_ts():
+    stmt = crud_readings.readings_query(SOURCES["davis"], "1", START, END)
+    compiled = stmt.compile(dialect=postgresql.dialect())
+    sql = str(compiled)
+
+    assert "davis_vantagepro2.ts >= %(ts_1)s AND davis_vantagepro2.ts < %(ts_2)s" in sql
+    assert "davis_vantagepro2.date" not in sql.split("WHERE")[1]
+    # The bounds are naive UTC: 2024-10-27T00:00Z and 2024-10-28T00:00Z
+    assert (compiled.params["ts_1"], compiled.params["ts_2"]) == (1729987200, 1730073600)
+
+
+def test_aware_bounds_select_the_same_davis_readings():
+    # What the router does with ?start=2024-10-27T02:00:00+02:00
+    start = _naive_utc(datetime(2024, 10, 27, 2, tzinfo=timezone(timedelta(hours=2))))
+    compiled = crud_readings.readings_query(SOURCES["davis"], "1", start, END).compile()
+
+    assert compiled.params["ts_1"] == 1729987200
+
+
+def test_cursor_round_trips_with_the_keyset_type():
+    davis, helix = SOURCES["davis"], SOURCES["barani_helix"]
+
+    assert readings_service.decode_cursor(readings_service.encode_cursor(1729989000), davis) == 1729989000
+    assert readings_service.decode_cursor(readings_service.encode_cursor(START), helix) == START
+    with pytest.raises(ValueError):
+        readings_service.decode_cursor(readings_service.encode_cursor(START), davis)
+
+
+@pytest.mark.anyio
+async def test_readings_sharing_a_local_date_are_all_paged():
+    db, source = KeysetSession(), SOURCES["davis"]
+
+    first = await readings_service.get_readings_page(db, source, "1", START, END, 1)
+    second = await readings_service.get_readings_page(db, source, "1", START, END, 1, first["next_cursor"])
+
+    assert first["items"] + second["items"] == FALL_BACK_ROWS
@@ -0,0 +1,120 @@
+import logging
+
+import pytest
+
+import app.logs.request_logging as request_logging
+from app.logs.request_logging import RequestLogMiddleware
+
+CHUNKS = [b'{"readings": [', b'{"t": 18.2}, ' * 20, b'{"t": 18.4}]}']
+
+
+class RecordingLogger:
+    def __init__(self):
+        self.records = []
+
+    def isEnabledFor(self, level):
+        return True
+
+    def log(self, level, msg, *args):
+        self.records.append((level, msg % args))
+
+
+@pytest.fixture
+def logger(monkeypatch):
+    logger = RecordingLogger()
+    monkeypatch.setattr(request_logging, "server_logger", logger)
+    monkeypatch.setattr(request_logging.settings, "LOG_BODY_MAX_BYTES", 32)
+    monkeypatch.setattr(request_logging.settings, "LOG_REQUEST_SAMPLE_RATE", 1.0)
+    return logger
+
+
+def chunked_receive(chunks):
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": index < len(chunks) - 1}
+        for index, chunk in enumerate(chunks)
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    return receive
+
+
+def app_reading_the_body(status: int = 200, fail: bool = False):
+    """ASGI app that reads the whole body, like a route with a body parameter, then answers."""
+    received = bytearray()
+
+    async def app(scope, receive, send):
+        more_body = True
+        while more_body:
+            message = await receive()
+            received.extend(message["body"])
+            more_body = message["more_body"]
+        if fail:
+            raise RuntimeError("handler crashed")
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    return app, received
+
+
+async def call(app, chunks=CHUNKS):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/barani/helix/batch"}
+    await RequestLogMiddleware(app)(scope, chunked_receive(chunks), send)
+    return sent
+
+
+@pytest.mark.anyio
+async def test_body_is_teed_across_chunks_and_truncated(logger):
+    app, received = app_reading_the_body()
+
+    sent = await call(app)
+
+    body = b"".join(CHUNKS)
+    assert bytes(received) == body
+    assert sent[0]["status"] == 200
+    [(level, message)] = logger.records
+    assert level == logging.INFO
+    assert message.startswith("POST /barani/helix/batch -> 200 in ")
+    assert message.endswith(f"body {len(body)} bytes: {body[:32].decode()}...")
+
+
+@pytest.mark.anyio
+async def test_short_body_is_logged_whole(logger):
+    app, _ = app_reading_the_body()
+
+    await call(app, [b'{"a": ', b'1}'])
+
+    [(_, message)] = logger.records
+    assert message.endswith('body 8 bytes: {"a": 1}')
+
+
+@pytest.mark.anyio
+async def test_failures_are_always_logged(logger, monkeypatch):
+    monkeypatch.setattr(request_logging.settings, "LOG_REQUEST_SAMPLE_RATE", 0.0)
+
+    await call(app_reading_the_body(status=422)[0])
+    with pytest.raises(RuntimeError):
+        await call(app_reading_the_body(fail=True)[0])
+
+    assert [level for level, _ in logger.records] == [logging.WARNING, logging.WARNING]
+    assert " -> 422 in " in logger.records[0][1]
+    # An exception before the response starts is logged as a 500
+    assert " -> 500 in " in logger.records[1][1]
+
+
+@pytest.mark.anyio
+async def test_successful_requests_are_sampled(logger, monkeypatch):
+    monkeypatch.setattr(request_logging.settings, "LOG_REQUEST_SAMPLE_RATE", 0.25)
+    draws = iter([0.1, 0.5, 0.3, 0.2])
+    monkeypatch.setattr(request_logging.random, "random", lambda: next(draws))
+
+    for _ in range(4):
+        await call(app_reading_the_body()[0])
+
+    assert len(logger.records) == 2
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+import app.tasks.write_behind as write_behind
+from app.tasks.write_behind import WriteBehindBuffer
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch, tmp_path):
+    monkeypatch.setattr(write_behind, "AsyncSessionLocal", FakeSession)
+    monkeypatch.setattr(write_behind.settings, "WRITE_BEHIND_RETRIES", 3)
+    monkeypatch.setattr(write_behind.settings, "WRITE_BEHIND_RETRY_BASE_MS", 1)
+    monkeypatch.setattr(write_behind.settings, "WRITE_BEHIND_RETRY_MAX_MS", 5)
+    monkeypatch.setattr(write_behind.settings, "WRITE_BEHIND_DEAD_LETTER_DIR", str(tmp_path))
+
+
+def failing_flush(failures: int):
+    written = []
+    calls = {"count": 0}
+
+    async def flush(db, batch):
+        calls["count"] += 1
+        if calls["count"] <= failures:
+            raise ConnectionError("database unavailable")
+        written.extend(batch)
+
+    return flush, written
+
+
+@pytest.mark.anyio
+async def test_failed_flush_is_retried_before_later_rows():
+    flush, written = failing_flush(failures=1)
+    buffer = WriteBehindBuffer("test", flush, flush_ms=10, flush_rows=2, queue_size=100)
+    buffer.start()
+    for row in range(5):
+        await buffer.put({"row": row})
+    await buffer.stop()
+
+    assert written == [{"row": row} for row in range(5)]
+    assert buffer.flushed_rows == 5
+    assert buffer.retries == 1
+    assert buffer.failed_rows == 0
+    assert buffer.dead_lettered_rows == 0
+
+
+@pytest.mark.anyio
+async def test_batch_is_spilled_to_disk_after_the_last_retry():
+    flush, written = failing_flush(failures=100)
+    buffer = WriteBehindBuffer("test", flush, flush_ms=10, flush_rows=10, queue_size=100)
+    buffer.start()
+    await buffer.put({"row": 1})
+    await buffer.stop()
+
+    assert written == []
+    assert buffer.retries == 3
+    assert buffer.dead_lettered_rows == 1
+    with open(buffer.dead_letter_path(), encoding="utf-8") as file:
+        assert [json.loads(line) for line in file] == [{"row": 1}]